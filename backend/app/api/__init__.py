@@ -1,7 +1,7 @@
 """API routers."""
 from fastapi import APIRouter
 
-from app.api import documents, health, query, users
+from app.api import admin, documents, health, query, users
 
 # Create main router
 api_router = APIRouter()
@@ -11,5 +11,6 @@ api_router.include_router(health.router)
 api_router.include_router(users.router)
 api_router.include_router(documents.router)
 api_router.include_router(query.router)
+api_router.include_router(admin.router)
 
 __all__ = ["api_router"]
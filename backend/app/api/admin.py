@@ -0,0 +1,50 @@
+"""Administrative endpoints for index management."""
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal, get_db
+from app.services.vector_index import INDEX_TYPES, VectorIndexService, ensure_tenant_index_task
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def _rebuild_vector_index(index_type: Optional[str]) -> None:
+    """Rebuild the vector index in the background with its own session."""
+    db = SessionLocal()
+    try:
+        VectorIndexService(db).rebuild_index(index_type)
+    except Exception as e:
+        logger.error(f"Failed to rebuild vector index: {str(e)}")
+    finally:
+        db.close()
+
+
+@router.get("/vector-index")
+def vector_index_status(db: Session = Depends(get_db)):
+    """Report ANN index existence, validity and build progress."""
+    try:
+        return VectorIndexService(db).index_status()
+    except Exception as e:
+        logger.error(f"Failed to read vector index status: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to read vector index status")
+
+
+@router.post("/vector-index/rebuild", status_code=202)
+def rebuild_vector_index(background_tasks: BackgroundTasks, index_type: Optional[str] = None):
+    """Start a concurrent rebuild of the ANN index (HNSW or IVFFlat)."""
+    if index_type is not None and index_type not in INDEX_TYPES:
+        raise HTTPException(status_code=400, detail=f"index_type must be one of {INDEX_TYPES}")
+
+    background_tasks.add_task(_rebuild_vector_index, index_type)
+    return {"message": "Vector index rebuild started", "index_type": index_type}
+
+
+@router.post("/vector-index/tenants/{user_id}", status_code=202)
+def build_tenant_index(user_id: int, background_tasks: BackgroundTasks):
+    """Start building a partial ANN index covering one user's chunks."""
+    background_tasks.add_task(ensure_tenant_index_task, user_id, True)
+    return {"message": "Tenant index build started", "user_id": user_id}
@@ -1,89 +1,187 @@
 """Document management endpoints."""
 import logging
-from io import BytesIO
+import os
+import zipfile
 
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
 from sqlalchemy.orm import Session
 
+from app.core.config import get_settings
 from app.core.database import get_db
-from app.models import Document, User
-from app.schemas import DocumentResponse, DocumentUploadResponse
-from app.services.document_parser import extract_text_from_file
+from app.models import Document, IngestionJob, User
+from app.schemas import BulkIngestResponse, DocumentResponse, IngestionJobResponse
+from app.services.bulk_ingest import count_zip_files, iter_zip_files
+from app.services.document_parser import is_supported_file
 from app.services.document_service import DocumentService
-from app.services.embedding_service import EmbeddingService
+from app.services.ingestion_queue import IngestionQueue, QueueFullError
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/documents", tags=["documents"])
 
 
-@router.post("/upload", response_model=DocumentUploadResponse)
+def _queue_new_document(
+    db: Session,
+    queue: IngestionQueue,
+    user_id: int,
+    filename: str,
+    spool_path: str,
+    file_size: int,
+    content_hash: str,
+) -> IngestionJob:
+    """Create the document record for a spooled file and queue it for ingestion."""
+    document = None
+    try:
+        document = DocumentService(db).create_document(
+            user_id=user_id,
+            filename=filename,
+            file_size=file_size,
+            content_hash=content_hash,
+        )
+        return queue.enqueue(user_id, document.id, filename, spool_path)
+    except Exception as e:
+        logger.error(f"Failed to queue document: {str(e)}")
+        db.rollback()
+        # Without a job nothing would ever ingest it; don't leave it pending
+        if document is not None:
+            try:
+                DocumentService(db).delete_document(document.id)
+            except Exception as cleanup_error:
+                logger.error(f"Failed to remove unqueued document {document.id}: {str(cleanup_error)}")
+        os.remove(spool_path)
+        raise HTTPException(status_code=500, detail="Failed to queue document for processing")
+
+
+@router.post("/upload", response_model=IngestionJobResponse, status_code=202)
 async def upload_document(
     user_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)
 ):
-    """Upload and process a document with embedding pipeline.
+    """Upload a document and queue it for parsing and embedding.
     
-    Supports: PDF, DOCX, TXT files.
+    Supports: PDF, DOCX, TXT files. Returns immediately with a job ID;
+    poll ``/documents/jobs/{job_id}`` for progress.
     """
     # Verify user exists
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Read file content
+    if not is_supported_file(file.filename):
+        raise HTTPException(status_code=400, detail=f"Unsupported file format: {file.filename}")
+
+    queue = IngestionQueue(db)
     try:
-        file_content = await file.read()
+        queue.ensure_capacity()
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    # Stream the upload to disk without buffering it in memory
+    try:
+        spool_path, file_size, content_hash = await queue.spool_upload(file)
     except Exception as e:
         logger.error(f"Failed to read file: {str(e)}")
         raise HTTPException(status_code=400, detail="Failed to read uploaded file")
 
-    # Create document service
-    doc_service = DocumentService(db)
+    # Create document record and queue it for ingestion
+    return _queue_new_document(db, queue, user_id, file.filename, spool_path, file_size, content_hash)
+
+
+@router.put("/{doc_id}", response_model=IngestionJobResponse, status_code=202)
+async def update_document(
+    doc_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)
+):
+    """Upload a new version of a document and queue it for re-indexing.
     
-    # Create document record
+    Chunks whose content is unchanged keep their embeddings; only new or
+    edited chunks are embedded again.
+    """
+    document = DocumentService(db).get_document(doc_id)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    if not is_supported_file(file.filename):
+        raise HTTPException(status_code=400, detail=f"Unsupported file format: {file.filename}")
+
+    queue = IngestionQueue(db)
     try:
-        document = doc_service.create_document(
-            user_id=user_id,
-            filename=file.filename,
-            file_size=len(file_content),
-        )
+        queue.ensure_capacity()
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    try:
+        spool_path, _, _ = await queue.spool_upload(file)
     except Exception as e:
-        logger.error(f"Failed to create document: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to create document record")
+        logger.error(f"Failed to read file: {str(e)}")
+        raise HTTPException(status_code=400, detail="Failed to read uploaded file")
 
-    # Extract text from file
     try:
-        extracted_text = extract_text_from_file(file.filename, file_content)
-    except ValueError as e:
-        logger.error(f"Unsupported file format: {str(e)}")
-        doc_service.delete_document(document.id)
-        raise HTTPException(status_code=400, detail=str(e))
+        job = queue.enqueue(document.user_id, doc_id, file.filename, spool_path, operation="update")
     except Exception as e:
-        logger.error(f"Failed to extract text: {str(e)}")
-        doc_service.delete_document(document.id)
-        raise HTTPException(status_code=500, detail="Failed to extract text from document")
+        logger.error(f"Failed to queue document update: {str(e)}")
+        os.remove(spool_path)
+        raise HTTPException(status_code=500, detail="Failed to queue document for processing")
+
+    return job
+
+
+@router.post("/bulk", response_model=BulkIngestResponse, status_code=202)
+async def bulk_upload_documents(
+    user_id: int,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+):
+    """Upload a zip archive of documents and queue each of them for ingestion.
+    
+    Supported files (PDF, DOCX, TXT) anywhere in the archive are queued as
+    one ingestion job each, exactly like single uploads; everything else is
+    skipped. Poll ``/documents/jobs/{job_id}`` for each job's progress.
+    """
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
 
-    # Generate embeddings
+    if not file.filename.lower().endswith(".zip"):
+        raise HTTPException(status_code=400, detail="Bulk upload expects a .zip archive")
+
+    queue = IngestionQueue(db)
     try:
-        embedding_service = EmbeddingService(db)
-        chunk_count = embedding_service.embed_document(document.id, extracted_text)
-        logger.info(f"Created {chunk_count} chunks for document {document.id}")
-    except ValueError as e:
-        logger.error(f"Invalid configuration: {str(e)}")
-        doc_service.delete_document(document.id)
-        raise HTTPException(status_code=500, detail="Embedding service not configured")
+        archive_path, _, _ = await queue.spool_upload(file)
     except Exception as e:
-        logger.error(f"Failed to generate embeddings: {str(e)}")
-        doc_service.delete_document(document.id)
-        raise HTTPException(status_code=500, detail=f"Failed to process document: {str(e)}")
-
-    return DocumentUploadResponse(
-        id=document.id,
-        filename=document.filename,
-        total_chunks=chunk_count,
-        message=f"Document processed successfully with {chunk_count} chunks",
+        logger.error(f"Failed to read file: {str(e)}")
+        raise HTTPException(status_code=400, detail="Failed to read uploaded file")
+
+    # Members are spooled as individual files; the archive itself isn't kept
+    try:
+        try:
+            queue.ensure_capacity(count_zip_files(archive_path))
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail="Uploaded file is not a valid zip archive")
+        except QueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+
+        jobs = []
+        for name, content in iter_zip_files(archive_path, get_settings().bulk_max_file_bytes):
+            spool_path, file_size, content_hash = queue.spool_bytes(name, content)
+            jobs.append(_queue_new_document(db, queue, user_id, name, spool_path, file_size, content_hash))
+    finally:
+        os.remove(archive_path)
+
+    return BulkIngestResponse(
+        filename=file.filename,
+        files_queued=len(jobs),
+        message="Archive queued for ingestion",
+        jobs=jobs,
     )
 
 
+@router.get("/jobs/{job_id}", response_model=IngestionJobResponse)
+def get_ingestion_job(job_id: int, db: Session = Depends(get_db)):
+    """Get ingestion job status and embedding progress."""
+    job = IngestionQueue(db).get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
 @router.get("/{user_id}", response_model=list[DocumentResponse])
 def list_user_documents(user_id: int, db: Session = Depends(get_db)):
     """Get all documents for a user."""
@@ -107,10 +205,6 @@ def get_document(doc_id: int, db: Session = Depends(get_db)):
 @router.delete("/{doc_id}")
 def delete_document(doc_id: int, db: Session = Depends(get_db)):
     """Delete a document and its chunks."""
-    document = db.query(Document).filter(Document.id == doc_id).first()
-    if not document:
+    if not DocumentService(db).delete_document(doc_id):
         raise HTTPException(status_code=404, detail="Document not found")
-
-    db.delete(document)
-    db.commit()
     return {"message": "Document deleted successfully"}
@@ -1,5 +1,11 @@
 """Health check and utility endpoints."""
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db
+from app.services.answer_cache import get_answer_cache
+from app.services.document_service import get_dedup_stats
+from app.services.embedding_cache import get_cache_stats, get_query_embedding_cache
 
 router = APIRouter(tags=["health"])
 
@@ -8,3 +14,24 @@ router = APIRouter(tags=["health"])
 async def health_check():
     """Health check endpoint."""
     return {"status": "ok", "service": "ingatini-api"}
+
+
+@router.get("/health/embedding-cache")
+async def embedding_cache_stats():
+    """Embedding cache hit/miss counters for this process."""
+    return {
+        "documents": get_cache_stats(),
+        "queries": get_query_embedding_cache().stats(),
+    }
+
+
+@router.get("/health/dedup")
+def document_dedup_stats(db: Session = Depends(get_db)):
+    """Embedding work skipped by whole-document deduplication, across all ingestion workers."""
+    return get_dedup_stats(db)
+
+
+@router.get("/health/answer-cache")
+async def answer_cache_stats():
+    """Semantic answer cache hit/miss counters for this process."""
+    return get_answer_cache().stats()
@@ -1,43 +1,71 @@
 """Query/retrieval endpoints for RAG."""
+import json
 import logging
-from typing import List, Optional
+import time
+from typing import AsyncIterator, List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.schemas import QueryRequest, QueryResponse
-from app.services.rag_service import RAGService
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal, get_async_db
+from app.schemas import BatchQueryRequest, BatchQueryResponse, QueryRequest, QueryResponse
+from app.services.async_rag_service import AsyncRAGService
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/query", tags=["query"])
 
 
+def get_rag_service(db: AsyncSession = Depends(get_async_db)) -> AsyncRAGService:
+    """Dependency for a RAG service on the request's session; model clients are process-wide."""
+    return AsyncRAGService(db)
+
+
 @router.post("/", response_model=QueryResponse)
 async def query_documents(
     query: QueryRequest,
     document_ids: Optional[List[int]] = None,
     top_k: int = 5,
-    db: Session = Depends(get_db),
+    similarity_threshold: Optional[float] = Query(
+        None, ge=-1, le=1, description="Minimum similarity score for retrieved chunks"
+    ),
+    ef_search: Optional[int] = Query(None, ge=1, description="HNSW ef_search override"),
+    probes: Optional[int] = Query(None, ge=1, description="IVFFlat probes override"),
+    mode: Optional[Literal["vector", "hybrid"]] = Query(
+        None, description="Retrieval mode: vector only, or vector + full-text with RRF"
+    ),
+    diversify: Optional[bool] = Query(
+        None, description="Re-select chunks with MMR and merge adjacent chunks"
+    ),
+    rag_service: AsyncRAGService = Depends(get_rag_service),
 ):
     """Query documents using RAG pipeline.
     
     Performs vector similarity search and generates LLM-augmented responses.
     """
+    start = time.perf_counter()
     try:
-        rag_service = RAGService(db)
-        result = rag_service.query_documents(
+        result = await rag_service.query_documents(
             user_id=query.user_id,
             query_text=query.query_text,
             document_ids=document_ids,
             top_k=top_k,
+            similarity_threshold=similarity_threshold,
+            ef_search=ef_search,
+            probes=probes,
+            mode=mode,
+            diversify=diversify,
         )
         
         return QueryResponse(
             query_text=result["query"],
             response=result["response"],
             retrieved_chunks=result["retrieved_chunks"],
-            response_time_ms=0.0,  # TODO: Add timing
+            response_time_ms=(time.perf_counter() - start) * 1000,
+            prompt_tokens=result["prompt_tokens"],
+            cached=result["cached"],
         )
     except ValueError as e:
         logger.error(f"Query error: {str(e)}")
@@ -50,12 +78,154 @@ async def query_documents(
         raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
 
 
+def _sse(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+@router.post("/stream")
+async def query_documents_stream(
+    query: QueryRequest,
+    document_ids: Optional[List[int]] = None,
+    top_k: int = 5,
+    similarity_threshold: Optional[float] = Query(
+        None, ge=-1, le=1, description="Minimum similarity score for retrieved chunks"
+    ),
+    ef_search: Optional[int] = Query(None, ge=1, description="HNSW ef_search override"),
+    probes: Optional[int] = Query(None, ge=1, description="IVFFlat probes override"),
+    mode: Optional[Literal["vector", "hybrid"]] = Query(
+        None, description="Retrieval mode: vector only, or vector + full-text with RRF"
+    ),
+    diversify: Optional[bool] = Query(
+        None, description="Re-select chunks with MMR and merge adjacent chunks"
+    ),
+):
+    """Query documents and stream the answer as server-sent events.
+    
+    Sends a ``chunks`` event with the retrieved chunks as soon as retrieval
+    finishes, a ``token`` event for each piece of the LLM answer as it is
+    generated, and finally ``done`` with timings (or ``error``).
+    """
+    start = time.perf_counter()
+    # The stream outlives the request's dependencies, so it owns its session
+    db = AsyncSessionLocal()
+    try:
+        rag_service = AsyncRAGService(db)
+        retrieved_chunks = await rag_service.retrieve(
+            user_id=query.user_id,
+            query_text=query.query_text,
+            document_ids=document_ids,
+            top_k=top_k,
+            similarity_threshold=similarity_threshold,
+            ef_search=ef_search,
+            probes=probes,
+            mode=mode,
+            diversify=diversify,
+        )
+    except ValueError as e:
+        await db.close()
+        logger.error(f"Query error: {str(e)}")
+        raise HTTPException(status_code=404, detail=str(e))
+    except ImportError as e:
+        await db.close()
+        logger.error(f"Configuration error: {str(e)}")
+        raise HTTPException(status_code=500, detail="RAG service not configured")
+    except Exception as e:
+        await db.close()
+        logger.error(f"Query failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
+
+    async def events() -> AsyncIterator[str]:
+        first_token_ms = None
+        try:
+            async for event, data in rag_service.stream_answer(query.user_id, query.query_text, retrieved_chunks):
+                if event == "token" and first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - start) * 1000
+                elif event == "done":
+                    data = {
+                        **data,
+                        "time_to_first_token_ms": first_token_ms,
+                        "response_time_ms": (time.perf_counter() - start) * 1000,
+                    }
+                    logger.info(
+                        f"Streamed answer for user {query.user_id}: first token after "
+                        f"{first_token_ms or 0:.0f}ms, done after {data['response_time_ms']:.0f}ms"
+                    )
+                yield _sse(event, data)
+        except Exception as e:
+            logger.error(f"Query stream failed: {str(e)}")
+            yield _sse("error", {"detail": f"Query failed: {str(e)}"})
+        finally:
+            await db.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/batch", response_model=BatchQueryResponse)
+async def query_documents_batch(
+    batch: BatchQueryRequest,
+    ef_search: Optional[int] = Query(None, ge=1, description="HNSW ef_search override"),
+    probes: Optional[int] = Query(None, ge=1, description="IVFFlat probes override"),
+    rag_service: AsyncRAGService = Depends(get_rag_service),
+):
+    """Answer many queries in one call.
+    
+    Embeds all questions together, retrieves chunks for every question in a
+    single SQL round trip and generates answers with bounded concurrency.
+    """
+    max_size = get_settings().batch_query_max_size
+    if len(batch.queries) > max_size:
+        raise HTTPException(status_code=400, detail=f"At most {max_size} queries per batch")
+    if any(not q.strip() or len(q) > 2000 for q in batch.queries):
+        raise HTTPException(status_code=400, detail="Each query must be 1-2000 characters")
+
+    start = time.perf_counter()
+    try:
+        results = await rag_service.query_documents_batch(
+            user_id=batch.user_id,
+            query_texts=batch.queries,
+            document_ids=batch.document_ids,
+            top_k=batch.top_k,
+            similarity_threshold=batch.similarity_threshold,
+            ef_search=ef_search,
+            probes=probes,
+        )
+    except ValueError as e:
+        logger.error(f"Batch query error: {str(e)}")
+        raise HTTPException(status_code=404, detail=str(e))
+    except ImportError as e:
+        logger.error(f"Configuration error: {str(e)}")
+        raise HTTPException(status_code=500, detail="RAG service not configured")
+    except Exception as e:
+        logger.error(f"Batch query failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch query failed: {str(e)}")
+
+    return BatchQueryResponse(
+        results=[
+            QueryResponse(
+                query_text=result["query"],
+                response=result["response"],
+                retrieved_chunks=result["retrieved_chunks"],
+                response_time_ms=result["response_time_ms"],
+                prompt_tokens=result["prompt_tokens"],
+            )
+            for result in results
+        ],
+        response_time_ms=(time.perf_counter() - start) * 1000,
+    )
+
+
 @router.get("/history/{user_id}")
-async def get_query_history(user_id: int, limit: int = 10, db: Session = Depends(get_db)):
+async def get_query_history(
+    user_id: int, limit: int = 10, rag_service: AsyncRAGService = Depends(get_rag_service)
+):
     """Get query history for a user."""
     try:
-        rag_service = RAGService(db)
-        history = rag_service.get_query_history(user_id, limit=limit)
+        history = await rag_service.get_query_history(user_id, limit=limit)
         return {"user_id": user_id, "history": history}
     except Exception as e:
         logger.error(f"Failed to retrieve history: {str(e)}")
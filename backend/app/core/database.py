@@ -1,13 +1,20 @@
 """Database connection and session management."""
-from sqlalchemy import create_engine
+import logging
+import time
+
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 from sqlalchemy.pool import QueuePool
 
 from app.core.config import get_settings
 
+logger = logging.getLogger(__name__)
+
 settings = get_settings()
 
-# Create database engine
+# Create database engine; no connection is made until first use
 engine = create_engine(
     settings.database_url,
     poolclass=QueuePool,
@@ -19,6 +26,17 @@ engine = create_engine(
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine (asyncpg) for the query path, against the same database
+async_engine = create_async_engine(
+    make_url(settings.database_url).set(drivername="postgresql+asyncpg"),
+    pool_size=settings.async_db_pool_size,
+    max_overflow=settings.async_db_max_overflow,
+    echo=settings.debug,
+)
+
+# Objects stay readable after commit; async sessions cannot lazy-load
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Base class for models
 Base = declarative_base()
 
@@ -30,3 +48,57 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Dependency for getting an async database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def wait_for_db(retries: int, delay: float) -> None:
+    """Block until the database accepts connections, retrying ``retries`` times."""
+    for attempt in range(retries + 1):
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return
+        except OperationalError as e:
+            if attempt >= retries:
+                raise
+            logger.warning(f"Database not reachable ({str(e).splitlines()[0]}); retrying in {delay:.0f}s")
+            time.sleep(delay)
+
+
+def init_db(build_vector_index: bool = True) -> None:
+    """
+    Create missing tables and indexes.
+
+    Run explicitly, once per deploy (``python init_db.py``) or from the API
+    startup hook, never at import time: importing the app must not need a
+    reachable database.
+
+    Args:
+        build_vector_index: Wait for the ANN index build; the API passes
+            False and builds it in the background instead
+    """
+    # Imported here: models register their tables on Base when imported
+    import app.models  # noqa: F401
+    from app.core.migrations import upgrade_schema
+    from app.services.vector_index import (
+        backfill_chunk_user_ids,
+        ensure_vector_index,
+        ensure_vector_index_in_background,
+    )
+
+    wait_for_db(settings.db_connect_retries, settings.db_connect_retry_delay_seconds)
+    Base.metadata.create_all(bind=engine)
+    # create_all never alters existing tables; add columns from newer releases
+    upgrade_schema(engine)
+
+    # Scope pre-existing chunks to their owner and create the ANN index
+    backfill_chunk_user_ids(engine)
+    if build_vector_index:
+        ensure_vector_index(engine)
+    else:
+        ensure_vector_index_in_background(engine)
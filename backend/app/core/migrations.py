@@ -0,0 +1,73 @@
+"""Idempotent schema upgrades for databases created by an older release.
+
+``Base.metadata.create_all`` only creates missing tables. Columns and
+indexes added to existing tables are applied here, before anything reads
+them. Every statement is safe to run on an up-to-date schema.
+"""
+import logging
+from typing import List, Optional, Tuple
+
+from sqlalchemy import inspect, text
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# (table, column, column definition, backfill run once when the column is added)
+COLUMN_UPGRADES: List[Tuple[str, str, str, Optional[str]]] = [
+    ("users", "corpus_version", "INTEGER", None),
+    ("documents", "content_hash", "VARCHAR(64)", None),
+    # Documents from before the ingestion checkpoint were fully ingested
+    ("documents", "ingest_status", "VARCHAR(20)", "UPDATE documents SET ingest_status = 'completed'"),
+    ("documents", "chunks_committed", "INTEGER", "UPDATE documents SET chunks_committed = total_chunks"),
+    # Filled in by ``backfill_chunk_user_ids``
+    ("chunks", "user_id", "INTEGER REFERENCES users (id)", None),
+    (
+        "chunks",
+        "content_tsv",
+        "TSVECTOR GENERATED ALWAYS AS (to_tsvector('{text_search_config}', content)) STORED",
+        None,
+    ),
+    ("ingestion_jobs", "operation", "VARCHAR(20) NOT NULL DEFAULT 'ingest'", None),
+    ("ingestion_jobs", "available_at", "TIMESTAMP WITHOUT TIME ZONE", None),
+    ("ingestion_jobs", "heartbeat_at", "TIMESTAMP WITHOUT TIME ZONE", None),
+]
+
+INDEX_UPGRADES: List[str] = [
+    "CREATE INDEX IF NOT EXISTS ix_documents_content_hash ON documents (content_hash)",
+    "CREATE INDEX IF NOT EXISTS ix_chunks_content_tsv ON chunks USING gin (content_tsv)",
+    "CREATE INDEX IF NOT EXISTS ix_chunks_user_document ON chunks (user_id, document_id)",
+]
+
+
+def upgrade_schema(engine) -> List[str]:
+    """
+    Add columns and indexes missing from tables that already existed.
+
+    Runs in one transaction after ``create_all``.
+
+    Returns:
+        ``table.column`` names that were added
+    """
+    text_search_config = get_settings().text_search_config
+    added: List[str] = []
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        tables = set(inspector.get_table_names())
+        for table, column, definition, backfill in COLUMN_UPGRADES:
+            if table not in tables:
+                continue
+            if column in {c["name"] for c in inspector.get_columns(table)}:
+                continue
+            definition = definition.format(text_search_config=text_search_config)
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {definition}"))
+            if backfill:
+                conn.execute(text(backfill))
+            added.append(f"{table}.{column}")
+
+        for statement in INDEX_UPGRADES:
+            conn.execute(text(statement))
+
+    if added:
+        logger.info(f"Upgraded schema: added {', '.join(added)}")
+    return added
@@ -1,4 +1,12 @@
 """Export database models."""
-from app.models.models import Chunk, Document, QueryLog, User
+from app.models.models import (
+    Chunk,
+    DedupStats,
+    Document,
+    EmbeddingCacheEntry,
+    IngestionJob,
+    QueryLog,
+    User,
+)
 
-__all__ = ["User", "Document", "Chunk", "QueryLog"]
+__all__ = ["User", "Document", "Chunk", "EmbeddingCacheEntry", "DedupStats", "IngestionJob", "QueryLog"]
@@ -3,11 +3,27 @@ from datetime import datetime
 from typing import Optional
 
 from pgvector.sqlalchemy import Vector
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String, Text, func
-from sqlalchemy.orm import relationship
-
+from sqlalchemy import (
+    Column,
+    Computed,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    func,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
+
+from app.core.config import get_settings
 from app.core.database import Base
 
+TEXT_SEARCH_CONFIG = get_settings().text_search_config
+
 
 class User(Base):
     """User data model."""
@@ -17,6 +33,7 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(255), unique=True, index=True)
     email = Column(String(255), unique=True, index=True)
+    corpus_version = Column(Integer, default=0)  # Bumped whenever the user's searchable chunks change
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -37,8 +54,11 @@ class Document(Base):
     filename = Column(String(255), nullable=False)
     file_path = Column(String(512), nullable=True)
     file_size = Column(Integer, nullable=True)  # in bytes
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the uploaded file
     content_type = Column(String(100), nullable=True)
     total_chunks = Column(Integer, default=0)
+    ingest_status = Column(String(20), default="pending")  # "pending", "processing" or "completed"
+    chunks_committed = Column(Integer, default=0)  # Ingestion checkpoint: next chunk_index to embed
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -54,14 +74,26 @@ class Chunk(Base):
     """Text chunk extracted from documents with embeddings."""
 
     __tablename__ = "chunks"
+    __table_args__ = (
+        Index("ix_chunks_content_tsv", "content_tsv", postgresql_using="gin"),
+        Index("ix_chunks_user_document", "user_id", "document_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Denormalized owner for tenant scoping
     chunk_index = Column(Integer, nullable=False)  # Order of chunk in document
     content = Column(Text, nullable=False)
     token_count = Column(Integer, nullable=True)  # Approximate token count
     embedding = Column(Vector(768), nullable=True)  # Gemini embedding-001
     embedding_model = Column(String(100), default="text-embedding-3-small")
+    # Full-text search vector, generated by Postgres from content at insert time
+    content_tsv = deferred(
+        Column(
+            TSVECTOR,
+            Computed(f"to_tsvector('{TEXT_SEARCH_CONFIG}', content)", persisted=True),
+        )
+    )
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     # Relationships
@@ -71,6 +103,67 @@ class Chunk(Base):
         return f"<Chunk(id={self.id}, document_id={self.document_id})>"
 
 
+class EmbeddingCacheEntry(Base):
+    """Content-addressed cache of embeddings keyed by model and text hash."""
+
+    __tablename__ = "embedding_cache"
+    __table_args__ = (
+        UniqueConstraint("embedding_model", "text_hash", name="uq_embedding_cache_model_hash"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    embedding_model = Column(String(100), nullable=False)
+    text_hash = Column(String(64), nullable=False)  # SHA-256 of normalized text
+    embedding = Column(Vector(768), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_used_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<EmbeddingCacheEntry(id={self.id}, model={self.embedding_model})>"
+
+
+class DedupStats(Base):
+    """Fleet-wide counters of embedding work skipped by whole-document dedup (a single row)."""
+
+    __tablename__ = "dedup_stats"
+
+    id = Column(Integer, primary_key=True)
+    documents = Column(Integer, default=0, nullable=False)
+    chunks = Column(Integer, default=0, nullable=False)
+    tokens = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<DedupStats(documents={self.documents})>"
+
+
+class IngestionJob(Base):
+    """Queued document ingestion (parse + embed), processed by background workers."""
+
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="SET NULL"), nullable=True)
+    filename = Column(String(255), nullable=False)
+    spool_path = Column(String(512), nullable=False)  # Uploaded file awaiting processing
+    operation = Column(String(20), default="ingest", nullable=False)  # "ingest" or "update"
+    status = Column(String(20), default="queued", nullable=False, index=True)
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=True)  # Retry backoff
+    chunks_total = Column(Integer, default=0)
+    chunks_embedded = Column(Integer, default=0)
+    attempts = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)  # Touched by the worker while the job runs
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<IngestionJob(id={self.id}, status={self.status})>"
+
+
 class QueryLog(Base):
     """Log of user queries for analytics and debugging."""
 
@@ -1,9 +1,13 @@
 """Export schemas."""
 from app.schemas.schemas import (
+    BatchQueryRequest,
+    BatchQueryResponse,
+    BulkIngestResponse,
     ChunkResponse,
     DocumentCreate,
     DocumentResponse,
     DocumentUploadResponse,
+    IngestionJobResponse,
     QueryLogResponse,
     QueryRequest,
     QueryResponse,
@@ -17,8 +21,12 @@ __all__ = [
     "DocumentCreate",
     "DocumentResponse",
     "DocumentUploadResponse",
+    "IngestionJobResponse",
+    "BulkIngestResponse",
     "ChunkResponse",
     "QueryRequest",
     "QueryResponse",
+    "BatchQueryRequest",
+    "BatchQueryResponse",
     "QueryLogResponse",
 ]
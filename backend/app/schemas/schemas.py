@@ -10,7 +10,7 @@ class UserBase(BaseModel):
     """Base user schema."""
 
     username: str = Field(..., min_length=3, max_length=255)
-    email: str = Field(..., regex=r"^[^\s@]+@[^\s@]+\.[^\s@]+$")
+    email: str = Field(..., pattern=r"^[^\s@]+@[^\s@]+\.[^\s@]+$")
 
 
 class UserCreate(UserBase):
@@ -50,7 +50,10 @@ class DocumentResponse(DocumentBase):
     user_id: int
     file_size: Optional[int] = None
     content_type: Optional[str] = None
+    content_hash: Optional[str] = None
     total_chunks: int
+    ingest_status: Optional[str] = None
+    chunks_committed: Optional[int] = None
     created_at: datetime
     updated_at: datetime
 
@@ -67,6 +70,7 @@ class ChunkResponse(BaseModel):
     chunk_index: int
     content: str
     token_count: Optional[int] = None
+    score: Optional[float] = None  # Similarity to the query, when retrieved by search
     created_at: datetime
 
     class Config:
@@ -88,11 +92,30 @@ class QueryResponse(BaseModel):
     response: str
     retrieved_chunks: list[ChunkResponse]
     response_time_ms: float
+    prompt_tokens: int = 0
+    cached: bool = False
 
     class Config:
         from_attributes = True
 
 
+class BatchQueryRequest(BaseModel):
+    """Schema for a batch of queries from one user."""
+
+    user_id: int
+    queries: list[str] = Field(..., min_length=1)
+    document_ids: Optional[list[int]] = None
+    top_k: int = Field(5, ge=1)
+    similarity_threshold: Optional[float] = Field(None, ge=-1, le=1)
+
+
+class BatchQueryResponse(BaseModel):
+    """Schema for batch query response."""
+
+    results: list[QueryResponse]
+    response_time_ms: float
+
+
 class QueryLogResponse(BaseModel):
     """Schema for query log."""
 
@@ -108,6 +131,38 @@ class QueryLogResponse(BaseModel):
         from_attributes = True
 
 
+# Ingestion Job Schemas
+class IngestionJobResponse(BaseModel):
+    """Schema for an ingestion job and its progress."""
+
+    id: int
+    user_id: int
+    document_id: Optional[int] = None
+    filename: str
+    operation: str
+    status: str
+    chunks_total: int
+    chunks_embedded: int
+    attempts: int
+    error: Optional[str] = None
+    created_at: datetime
+    available_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class BulkIngestResponse(BaseModel):
+    """Schema for an accepted bulk ingest archive."""
+
+    filename: str
+    files_queued: int
+    message: str
+    jobs: list[IngestionJobResponse] = []
+
+
 # Upload Response
 class DocumentUploadResponse(BaseModel):
     """Schema for document upload response."""
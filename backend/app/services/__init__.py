@@ -1,8 +1,16 @@
 """Business logic services."""
+from app.services.async_embedding_service import AsyncEmbeddingService
+from app.services.async_rag_service import AsyncRAGService
 from app.services.base import BaseService
 from app.services.document_service import DocumentService
 from app.services.embedding_service import EmbeddingService
-from app.services.rag_service import RAGService
 from app.services.user_service import UserService
 
-__all__ = ["BaseService", "UserService", "DocumentService", "EmbeddingService", "RAGService"]
+__all__ = [
+    "BaseService",
+    "UserService",
+    "DocumentService",
+    "EmbeddingService",
+    "AsyncEmbeddingService",
+    "AsyncRAGService",
+]
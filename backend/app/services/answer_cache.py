@@ -0,0 +1,188 @@
+"""Semantic cache of RAG answers, keyed by query embedding and corpus version."""
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import func, update
+
+from app.core.config import get_settings
+from app.models import User
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def bump_corpus_version(db, user_id: int) -> None:
+    """
+    Mark a user's searchable chunks as changed, in the caller's transaction.
+
+    Cached answers are tied to the corpus version they were generated
+    against, so committing this together with the chunk change invalidates
+    them in every API process at once.
+    """
+    db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(corpus_version=func.coalesce(User.corpus_version, 0) + 1)
+    )
+
+
+class _Entry(NamedTuple):
+    bucket: tuple
+    vector: "np.ndarray"
+    result: dict
+
+
+class SemanticAnswerCache:
+    """In-process LRU cache of generated answers, matched by query similarity.
+
+    Entries are grouped into buckets of ``(user, corpus version, retrieval
+    scope)``. A lookup embeds nothing itself: it compares the query
+    embedding with every entry in its bucket and returns the closest answer
+    if it lies within ``max_distance`` cosine distance. Buckets for older
+    corpus versions of a user are dropped as soon as a newer version is seen.
+    A user's corpus version is only remembered while they have entries, so
+    the cache's size stays bounded by ``max_entries``.
+    """
+
+    def __init__(self, max_entries: int, max_distance: float):
+        """Initialize an empty cache with the given bounds."""
+        if np is None:
+            raise ImportError("numpy is required for the answer cache. Install with: pip install numpy")
+
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._buckets: Dict[tuple, List[int]] = {}
+        self._versions: Dict[int, int] = {}  # Newest corpus version per user with entries
+        self._user_entries: Dict[int, int] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> "np.ndarray":
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def get(
+        self, user_id: int, corpus_version: int, scope: Hashable, query_embedding: Sequence[float]
+    ) -> Optional[dict]:
+        """Return the cached answer closest to the query, or None if none is close enough."""
+        query = self._normalize(query_embedding)
+        with self._lock:
+            self._observe_version(user_id, corpus_version)
+            entry_ids = self._buckets.get((user_id, corpus_version, scope))
+            if not entry_ids:
+                self.misses += 1
+                return None
+
+            similarities = np.stack([self._entries[i].vector for i in entry_ids]) @ query
+            best = int(np.argmax(similarities))
+            if 1.0 - float(similarities[best]) > self.max_distance:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(entry_ids[best])
+            self.hits += 1
+            return dict(self._entries[entry_ids[best]].result)
+
+    def put(
+        self,
+        user_id: int,
+        corpus_version: int,
+        scope: Hashable,
+        query_embedding: Sequence[float],
+        result: dict,
+    ) -> None:
+        """Store an answer, evicting least-recently-used entries as needed."""
+        if self.max_entries <= 0:
+            return
+        vector = self._normalize(query_embedding)
+        with self._lock:
+            self._observe_version(user_id, corpus_version)
+            # Generated against a corpus that has since changed
+            if corpus_version < self._versions.get(user_id, corpus_version):
+                return
+
+            self._versions[user_id] = corpus_version
+            bucket = (user_id, corpus_version, scope)
+            entry_id = next(self._ids)
+            self._entries[entry_id] = _Entry(bucket, vector, dict(result))
+            self._buckets.setdefault(bucket, []).append(entry_id)
+            self._user_entries[user_id] = self._user_entries.get(user_id, 0) + 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self._versions.clear()
+            self._user_entries.clear()
+
+    def stats(self) -> dict:
+        """Return size and hit/miss/eviction counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "users": len(self._versions),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _observe_version(self, user_id: int, corpus_version: int) -> None:
+        """Drop a user's entries for older corpus versions once a newer one shows up."""
+        known = self._versions.get(user_id)
+        if known is None or corpus_version <= known:
+            return
+        # All of the user's entries are at most ``known``, so this empties the user
+        stale = [bucket for bucket in self._buckets if bucket[0] == user_id]
+        for bucket in stale:
+            for entry_id in list(self._buckets[bucket]):
+                self._remove(entry_id)
+                self.invalidations += 1
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        entry_ids = self._buckets[entry.bucket]
+        entry_ids.remove(entry_id)
+        if not entry_ids:
+            del self._buckets[entry.bucket]
+
+        user_id = entry.bucket[0]
+        self._user_entries[user_id] -= 1
+        if not self._user_entries[user_id]:
+            # Nothing left to invalidate, so the version needn't be remembered
+            del self._user_entries[user_id]
+            del self._versions[user_id]
+
+
+_answer_cache: Optional[SemanticAnswerCache] = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    """Get the process-wide semantic answer cache."""
+    global _answer_cache
+    if _answer_cache is None:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                settings = get_settings()
+                _answer_cache = SemanticAnswerCache(
+                    max_entries=settings.answer_cache_max_entries,
+                    max_distance=settings.answer_cache_max_distance,
+                )
+    return _answer_cache
@@ -0,0 +1,335 @@
+"""Async query embedding and retrieval, for request handlers on the event loop."""
+import asyncio
+import logging
+import random
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models import Chunk
+from app.services.embedding_cache import get_query_embedding_cache
+from app.services.embedding_service import (
+    RETRIEVAL_MODES,
+    batch_vector_search_statement,
+    chunks_by_id_statement,
+    diversify_results,
+    hybrid_search_statement,
+    lexical_ids_statement,
+    order_hits,
+    reciprocal_rank_fusion,
+    vector_search_statement,
+)
+from app.services.gemini import get_genai, transient_errors
+from app.services.vector_index import search_params_statement
+from app.services.vector_store import get_vector_store
+
+logger = logging.getLogger(__name__)
+
+
+async def embed_content(model: str, texts: List[str]) -> dict:
+    """Call the Gemini embedding API without blocking the event loop."""
+    if not get_settings().gemini_api_key:
+        raise ValueError("GEMINI_API_KEY not configured")
+
+    genai = get_genai()
+    if hasattr(genai, "embed_content_async"):
+        return await genai.embed_content_async(model=model, content=texts)
+    # SDKs without an async embedding call: keep the blocking call off the loop
+    return await asyncio.to_thread(genai.embed_content, model=model, content=texts)
+
+
+class AsyncEmbeddingService:
+    """
+    Query embedding and similarity search on an ``AsyncSession``.
+
+    Awaits the database and the Gemini API instead of blocking the event
+    loop, so one worker can serve many queries at once. The search
+    statements are built in ``embedding_service``; ingestion runs on the
+    sync ``EmbeddingService``.
+    """
+
+    def __init__(self, db: AsyncSession):
+        """Initialize async embedding service."""
+        self.db = db
+        self.settings = get_settings()
+
+    async def _with_retries(self, call: Callable):
+        """Await an embedding API call, retrying transient failures with jittered backoff."""
+        attempt = 0
+        while True:
+            try:
+                return await call()
+            except transient_errors() as e:
+                attempt += 1
+                if attempt > self.settings.embedding_max_retries:
+                    raise
+                delay = min(
+                    self.settings.embedding_retry_max_delay_seconds,
+                    self.settings.embedding_retry_base_delay_seconds * 2 ** (attempt - 1),
+                ) * random.uniform(0.5, 1.0)
+                logger.warning(f"Embedding request failed ({str(e)}); retry {attempt} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _embed_content(self, texts: List[str]) -> dict:
+        return await embed_content(self.settings.gemini_embedding_model, texts)
+
+    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for a batch of texts in a single API request.
+
+        Returns:
+            List of embedding vectors, in the same order as ``texts``
+        """
+        if not texts:
+            return []
+
+        try:
+            result = await self._with_retries(lambda: self._embed_content(texts))
+            embeddings = result['embedding']
+        except Exception as e:
+            raise ValueError(f"Failed to generate embeddings: {str(e)}")
+
+        if len(embeddings) != len(texts):
+            raise ValueError(
+                f"Embedding API returned {len(embeddings)} vectors for {len(texts)} texts"
+            )
+        return embeddings
+
+    async def embed_queries(self, query_texts: List[str]) -> List[List[float]]:
+        """
+        Embed search queries, batching all query-cache misses into one call.
+
+        Only the in-process query cache is consulted; the persistent
+        embedding cache serves ingestion, where repeats are common.
+
+        Returns:
+            Embedding vectors, in the same order as ``query_texts``
+        """
+        model = self.settings.gemini_embedding_model
+        query_cache = get_query_embedding_cache()
+
+        embeddings = [query_cache.get(model, query_text) for query_text in query_texts]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            fresh = await self.generate_embeddings([query_texts[i] for i in missing])
+            for i, embedding in zip(missing, fresh):
+                embeddings[i] = embedding
+                query_cache.put(model, query_texts[i], embedding)
+        return embeddings
+
+    async def embed_query(self, query_text: str) -> List[float]:
+        """Embed a search query, checking the in-process query cache first."""
+        return (await self.embed_queries([query_text]))[0]
+
+    async def _apply_search_params(self, ef_search: Optional[int], probes: Optional[int]) -> None:
+        """
+        Set per-query recall knobs for the current transaction.
+
+        Uses ``set_config(..., is_local => true)`` so the values only apply
+        to the transaction running the similarity search.
+        """
+        statement = search_params_statement(ef_search=ef_search, probes=probes)
+        if statement is not None:
+            await self.db.execute(*statement)
+
+    async def search_similar_chunks(
+        self,
+        query_text: str,
+        user_id: Optional[int] = None,
+        document_ids: Optional[List[int]] = None,
+        top_k: int = 5,
+        similarity_threshold: Optional[float] = 0.5,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        mode: Optional[str] = None,
+        diversify: Optional[bool] = None,
+    ) -> List[Tuple[Chunk, float]]:
+        """
+        Search for chunks similar to query using vector similarity.
+
+        In ``hybrid`` mode a full-text search over chunk content runs next to
+        the vector search and the two rankings are merged with reciprocal
+        rank fusion; scores are then RRF scores rather than similarities.
+
+        With ``diversify``, ``top_k * mmr_fetch_multiplier`` candidates are
+        fetched and re-selected with Maximal Marginal Relevance, and hits on
+        adjacent chunks of the same document are merged into one passage.
+
+        Args:
+            query_text: Query text
+            user_id: Owner of the chunks; scopes the search to that tenant
+            document_ids: Filter by document IDs
+            top_k: Number of top results to return
+            similarity_threshold: Minimum similarity score (0-1)
+            ef_search: HNSW candidate list size for this query
+            probes: IVFFlat lists probed for this query
+            mode: ``vector`` or ``hybrid`` (defaults to settings)
+            diversify: Apply MMR re-selection and adjacent merging (defaults to settings)
+
+        Returns:
+            List of ``(chunk, score)`` pairs, most similar first. Chunks are
+            loaded without their embedding column; merged passages are
+            ``MergedChunk`` objects.
+        """
+        mode = mode or self.settings.retrieval_mode
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unsupported retrieval mode: {mode}")
+
+        diversify = self.settings.mmr_enabled if diversify is None else diversify
+        fetch_k = top_k * max(1, self.settings.mmr_fetch_multiplier) if diversify else top_k
+
+        query_embedding = await self.embed_query(query_text)
+
+        if self.settings.vector_backend == "numpy":
+            results = await self._search_numpy(
+                user_id, query_text, query_embedding, document_ids, fetch_k, similarity_threshold, mode
+            )
+        else:
+            # Tune ANN recall for this transaction
+            await self._apply_search_params(ef_search, probes)
+
+            if mode == "hybrid":
+                statement = hybrid_search_statement(
+                    query_text,
+                    query_embedding,
+                    user_id,
+                    document_ids,
+                    fetch_k,
+                    similarity_threshold,
+                    candidates=max(fetch_k, self.settings.hybrid_candidates),
+                    rrf_k=self.settings.rrf_k,
+                    text_search_config=self.settings.text_search_config,
+                )
+            else:
+                statement = vector_search_statement(
+                    query_embedding, user_id, document_ids, fetch_k, similarity_threshold
+                )
+            rows = (await self.db.execute(statement)).all()
+            results = [(chunk, float(chunk_score)) for chunk, chunk_score in rows]
+
+        if diversify:
+            results = await self._diversify(query_embedding, results, top_k)
+        return results
+
+    async def _diversify(
+        self,
+        query_embedding: List[float],
+        results: List[Tuple[Chunk, float]],
+        top_k: int,
+    ) -> List[Tuple[Chunk, float]]:
+        """Re-select ``top_k`` diverse candidates with MMR, then merge adjacent chunks."""
+        embeddings = {}
+        if len(results) > top_k:
+            rows = await self.db.execute(
+                select(Chunk.id, Chunk.embedding).where(Chunk.id.in_([chunk.id for chunk, _ in results]))
+            )
+            embeddings = {row.id: row.embedding for row in rows}
+        return diversify_results(query_embedding, results, embeddings, top_k, self.settings.mmr_lambda)
+
+    async def search_similar_chunks_batch(
+        self,
+        query_texts: List[str],
+        user_id: int,
+        document_ids: Optional[List[int]] = None,
+        top_k: int = 5,
+        similarity_threshold: Optional[float] = 0.5,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> List[List[Tuple[Chunk, float]]]:
+        """
+        Vector search for many queries in one embedding call and one statement.
+
+        With pgvector, the top-k for every query is fetched in a single
+        statement via a LATERAL join over a VALUES list of query vectors.
+
+        Returns:
+            One list of ``(chunk, score)`` pairs per query, in input order
+        """
+        query_embeddings = await self.embed_queries(query_texts)
+
+        if self.settings.vector_backend == "numpy":
+            return [
+                await self._search_numpy(
+                    user_id, query_text, embedding, document_ids, top_k, similarity_threshold, "vector"
+                )
+                for query_text, embedding in zip(query_texts, query_embeddings)
+            ]
+
+        await self._apply_search_params(ef_search, probes)
+        rows = await self.db.execute(
+            batch_vector_search_statement(
+                query_embeddings, user_id, document_ids, top_k, similarity_threshold
+            )
+        )
+
+        results: List[List[Tuple[Chunk, float]]] = [[] for _ in query_texts]
+        for query_index, chunk, chunk_score in rows:
+            results[query_index].append((chunk, float(chunk_score)))
+        return results
+
+    async def _search_numpy(
+        self,
+        user_id: Optional[int],
+        query_text: str,
+        query_embedding: List[float],
+        document_ids: Optional[List[int]],
+        top_k: int,
+        similarity_threshold: Optional[float],
+        mode: str,
+    ) -> List[Tuple[Chunk, float]]:
+        """Search the user's NumPy matrix on a worker thread, then load matching chunks."""
+        if user_id is None:
+            raise ValueError("user_id is required for the numpy vector backend")
+
+        store = get_vector_store()
+        if not store.has_user(user_id):
+            await self._sync_vector_store(user_id)
+
+        candidates = max(top_k, self.settings.hybrid_candidates) if mode == "hybrid" else top_k
+        hits = await asyncio.to_thread(
+            store.search,
+            user_id,
+            query_embedding,
+            top_k=candidates,
+            document_ids=document_ids,
+            similarity_threshold=similarity_threshold,
+        )
+
+        if mode == "hybrid":
+            lexical_ids = (
+                await self.db.execute(
+                    lexical_ids_statement(
+                        query_text, user_id, document_ids, candidates, self.settings.text_search_config
+                    )
+                )
+            ).scalars().all()
+            hits = reciprocal_rank_fusion(
+                [[chunk_id for chunk_id, _ in hits], lexical_ids], k=self.settings.rrf_k
+            )[:top_k]
+
+        if not hits:
+            return []
+
+        chunks = (
+            await self.db.execute(chunks_by_id_statement([chunk_id for chunk_id, _ in hits]))
+        ).scalars().all()
+        return order_hits(hits, chunks)
+
+    async def _sync_vector_store(self, user_id: int) -> None:
+        """Build a user's NumPy vector matrix from the chunks in Postgres."""
+        rows = (
+            await self.db.execute(
+                select(Chunk.id, Chunk.document_id, Chunk.embedding)
+                .where(Chunk.user_id == user_id, Chunk.embedding.isnot(None))
+                .order_by(Chunk.id)
+            )
+        ).all()
+        await asyncio.to_thread(
+            get_vector_store().replace_user,
+            user_id,
+            chunk_ids=[row.id for row in rows],
+            document_ids=[row.document_id for row in rows],
+            embeddings=[row.embedding for row in rows],
+        )
@@ -0,0 +1,387 @@
+"""RAG query service: retrieval and generation without blocking the event loop."""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models import Chunk, QueryLog, User
+from app.services.answer_cache import get_answer_cache
+from app.services.async_embedding_service import AsyncEmbeddingService
+from app.services.gemini import get_llm
+from app.services.rag_service import (
+    LLM_ERROR_PREFIX,
+    NO_RESULTS_RESPONSE,
+    answer_cache_scope,
+    build_prompt,
+    serialize_chunks,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRAGService:
+    """
+    Service for RAG-based Q&A using Google Gemini, on an ``AsyncSession``.
+
+    Read transactions are ended after the user check and as soon as
+    retrieval finishes, so no pooled connection is held while waiting on the
+    embedding API or the LLM and hundreds of queries can wait on Gemini with
+    only a few connections in use.
+    """
+
+    def __init__(self, db: AsyncSession):
+        """Initialize async RAG service.
+
+        Cheap enough to build per request: the Gemini clients are
+        process-wide and only needed once a query is embedded or answered,
+        so reading query history works without a configured API key.
+        """
+        self.db = db
+        self.settings = get_settings()
+        self.embedding_service = AsyncEmbeddingService(db)
+
+    async def _release_connection(self) -> None:
+        """End the read transaction so its connection goes back to the pool.
+
+        Commit rather than rollback: with ``expire_on_commit=False`` the
+        loaded chunks stay readable, whereas a rollback would expire them.
+        """
+        await self.db.commit()
+
+    async def _check_user(self, user_id: int) -> int:
+        """Return the user's corpus version; raises ValueError for an unknown user.
+
+        The connection is released before returning: every caller embeds
+        the query next, and must not hold a pooled connection while it
+        waits on Gemini.
+        """
+        row = (await self.db.execute(select(User.corpus_version).where(User.id == user_id))).first()
+        await self._release_connection()
+        if row is None:
+            raise ValueError(f"User {user_id} not found")
+        return row.corpus_version or 0
+
+    async def retrieve(
+        self,
+        user_id: int,
+        query_text: str,
+        document_ids: Optional[List[int]] = None,
+        top_k: int = 5,
+        similarity_threshold: Optional[float] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        mode: Optional[str] = None,
+        diversify: Optional[bool] = None,
+    ) -> List[Tuple[Chunk, float]]:
+        """
+        Verify the user and retrieve the chunks a query is answered from.
+
+        Takes the retrieval arguments of ``query_documents``.
+
+        Returns:
+            List of ``(chunk, score)`` pairs, best first
+        """
+        await self._check_user(user_id)
+        return await self._search(
+            user_id=user_id,
+            query_text=query_text,
+            document_ids=document_ids,
+            top_k=top_k,
+            similarity_threshold=similarity_threshold,
+            ef_search=ef_search,
+            probes=probes,
+            mode=mode,
+            diversify=diversify,
+        )
+
+    async def _search(
+        self,
+        user_id: int,
+        query_text: str,
+        document_ids: Optional[List[int]],
+        top_k: int,
+        similarity_threshold: Optional[float],
+        ef_search: Optional[int],
+        probes: Optional[int],
+        mode: Optional[str],
+        diversify: Optional[bool],
+    ) -> List[Tuple[Chunk, float]]:
+        retrieved_chunks = await self.embedding_service.search_similar_chunks(
+            query_text=query_text,
+            user_id=user_id,
+            document_ids=document_ids,
+            top_k=top_k,
+            similarity_threshold=(
+                similarity_threshold
+                if similarity_threshold is not None
+                else self.settings.similarity_threshold
+            ),
+            ef_search=ef_search,
+            probes=probes,
+            mode=mode,
+            diversify=diversify,
+        )
+        await self._release_connection()
+        return retrieved_chunks
+
+    async def query_documents(
+        self,
+        user_id: int,
+        query_text: str,
+        document_ids: Optional[List[int]] = None,
+        top_k: int = 5,
+        similarity_threshold: Optional[float] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        mode: Optional[str] = None,
+        diversify: Optional[bool] = None,
+    ) -> dict:
+        """
+        Query documents using RAG pipeline.
+
+        Steps:
+        1. Verify user exists
+        2. Return a cached answer to a near-identical earlier query, if any
+        3. Retrieve relevant chunks using vector search
+        4. Augment with LLM for final response
+        5. Log the query
+
+        Args:
+            user_id: User ID
+            query_text: Query text
+            document_ids: Filter to specific documents
+            top_k: Number of chunks to retrieve
+            similarity_threshold: Minimum similarity score (defaults to settings)
+            ef_search: HNSW recall knob for the vector search
+            probes: IVFFlat recall knob for the vector search
+            mode: Retrieval mode, ``vector`` or ``hybrid`` (defaults to settings)
+            diversify: MMR re-selection and adjacent-chunk merging (defaults to settings)
+
+        Returns:
+            Dict with query, response, retrieved chunks and whether the
+            answer came from the answer cache
+        """
+        corpus_version = await self._check_user(user_id)
+
+        answer_cache = get_answer_cache() if self.settings.answer_cache_enabled else None
+        scope = answer_cache_scope(document_ids, top_k, similarity_threshold, ef_search, probes, mode, diversify)
+        if answer_cache is not None:
+            # Retrieval below reuses this from the query embedding cache
+            query_embedding = await self.embedding_service.embed_query(query_text)
+            cached = answer_cache.get(user_id, corpus_version, scope, query_embedding)
+            if cached is not None:
+                await self._log_query(user_id, query_text, cached["response"], cached["chunk_count"])
+                return {"query": query_text, **cached, "prompt_tokens": 0, "cached": True}
+
+        retrieved_chunks = await self._search(
+            user_id=user_id,
+            query_text=query_text,
+            document_ids=document_ids,
+            top_k=top_k,
+            similarity_threshold=similarity_threshold,
+            ef_search=ef_search,
+            probes=probes,
+            mode=mode,
+            diversify=diversify,
+        )
+
+        response, chunks_data, prompt_tokens = await self._answer(query_text, retrieved_chunks)
+        await self._log_query(user_id, query_text, response, len(retrieved_chunks))
+
+        result = {
+            "response": response,
+            "retrieved_chunks": chunks_data,
+            "chunk_count": len(retrieved_chunks),
+        }
+        if answer_cache is not None and not response.startswith(LLM_ERROR_PREFIX):
+            answer_cache.put(user_id, corpus_version, scope, query_embedding, result)
+        return {"query": query_text, **result, "prompt_tokens": prompt_tokens, "cached": False}
+
+    async def stream_answer(
+        self,
+        user_id: int,
+        query_text: str,
+        retrieved_chunks: List[Tuple[Chunk, float]],
+    ) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Stream the answer to a query as ``(event, data)`` pairs.
+
+        Yields a ``chunks`` event with the retrieved chunks first, then one
+        ``token`` event per piece of text the LLM streams back, then ``done``
+        with the prompt token count (or ``error`` if generation fails part
+        way). The query is logged once generation finishes; a stream
+        abandoned by the client is not.
+        """
+        yield "chunks", {
+            "query": query_text,
+            "retrieved_chunks": serialize_chunks(retrieved_chunks),
+            "chunk_count": len(retrieved_chunks),
+        }
+
+        if not retrieved_chunks:
+            logger.warning(f"No similar chunks found for query: {query_text}")
+            yield "token", {"text": NO_RESULTS_RESPONSE}
+            await self._log_query(user_id, query_text, NO_RESULTS_RESPONSE, 0)
+            yield "done", {"chunk_count": 0, "prompt_tokens": 0}
+            return
+
+        pieces: List[str] = []
+        prompt, prompt_tokens = build_prompt(query_text, retrieved_chunks)
+        try:
+            response = await get_llm().generate_content_async(prompt, stream=True)
+            async for part in response:
+                try:
+                    text = part.text
+                except ValueError:
+                    # A streamed part without text, e.g. a safety-blocked candidate
+                    continue
+                if text:
+                    pieces.append(text)
+                    yield "token", {"text": text}
+        except Exception as e:
+            logger.error(f"Failed to generate LLM response: {str(e)}")
+            await self._log_query(user_id, query_text, f"{LLM_ERROR_PREFIX}{str(e)}", len(retrieved_chunks))
+            yield "error", {"detail": f"{LLM_ERROR_PREFIX}{str(e)}"}
+            return
+
+        await self._log_query(user_id, query_text, "".join(pieces), len(retrieved_chunks))
+        yield "done", {"chunk_count": len(retrieved_chunks), "prompt_tokens": prompt_tokens}
+
+    async def query_documents_batch(
+        self,
+        user_id: int,
+        query_texts: List[str],
+        document_ids: Optional[List[int]] = None,
+        top_k: int = 5,
+        similarity_threshold: Optional[float] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> List[dict]:
+        """
+        Answer many queries for one user with shared lookups and round trips.
+
+        The user is checked once, all queries are embedded in one batched
+        request, retrieval for every query runs as a single SQL statement,
+        LLM generation runs with bounded concurrency and the query logs are
+        written in one bulk insert.
+
+        Returns:
+            One result dict per query, in input order. Its
+            ``response_time_ms`` runs from the start of the batch until that
+            query's answer was generated.
+        """
+        start = time.perf_counter()
+        await self._check_user(user_id)
+        retrieved = await self.embedding_service.search_similar_chunks_batch(
+            query_texts=query_texts,
+            user_id=user_id,
+            document_ids=document_ids,
+            top_k=top_k,
+            similarity_threshold=(
+                similarity_threshold
+                if similarity_threshold is not None
+                else self.settings.similarity_threshold
+            ),
+            ef_search=ef_search,
+            probes=probes,
+        )
+        await self._release_connection()
+
+        semaphore = asyncio.Semaphore(max(1, self.settings.llm_max_concurrency))
+
+        async def answer(query_text: str, chunks: List[Tuple[Chunk, float]]) -> Tuple[str, List[dict], int, float]:
+            async with semaphore:
+                response, chunks_data, prompt_tokens = await self._answer(query_text, chunks)
+            return response, chunks_data, prompt_tokens, (time.perf_counter() - start) * 1000
+
+        answers = await asyncio.gather(*(answer(q, chunks) for q, chunks in zip(query_texts, retrieved)))
+
+        await self.db.execute(
+            insert(QueryLog),
+            [
+                {
+                    "user_id": user_id,
+                    "query_text": query_text,
+                    "response": response[:500],  # Store first 500 chars
+                    "retrieved_chunks_count": len(chunks),
+                    "created_at": datetime.utcnow(),
+                }
+                for query_text, chunks, (response, _, _, _) in zip(query_texts, retrieved, answers)
+            ],
+        )
+        await self.db.commit()
+
+        return [
+            {
+                "query": query_text,
+                "response": response,
+                "retrieved_chunks": chunks_data,
+                "chunk_count": len(chunks),
+                "prompt_tokens": prompt_tokens,
+                "response_time_ms": response_time_ms,
+            }
+            for query_text, chunks, (response, chunks_data, prompt_tokens, response_time_ms) in zip(
+                query_texts, retrieved, answers
+            )
+        ]
+
+    async def _answer(
+        self, query_text: str, retrieved_chunks: List[Tuple[Chunk, float]]
+    ) -> Tuple[str, List[dict], int]:
+        """
+        Generate the LLM response for retrieved chunks.
+
+        Returns:
+            Tuple of (response, serialized chunks, estimated prompt tokens)
+        """
+        if not retrieved_chunks:
+            logger.warning(f"No similar chunks found for query: {query_text}")
+            return NO_RESULTS_RESPONSE, [], 0
+
+        prompt, prompt_tokens = build_prompt(query_text, retrieved_chunks)
+        try:
+            llm_response = await get_llm().generate_content_async(prompt)
+            response = llm_response.text
+        except Exception as e:
+            logger.error(f"Failed to generate LLM response: {str(e)}")
+            response = f"{LLM_ERROR_PREFIX}{str(e)}"
+
+        return response, serialize_chunks(retrieved_chunks), prompt_tokens
+
+    async def _log_query(self, user_id: int, query_text: str, response: str, chunk_count: int) -> None:
+        """Record a query in the user's history."""
+        self.db.add(
+            QueryLog(
+                user_id=user_id,
+                query_text=query_text,
+                response=response[:500],  # Store first 500 chars
+                retrieved_chunks_count=chunk_count,
+            )
+        )
+        await self.db.commit()
+
+    async def get_query_history(self, user_id: int, limit: int = 10) -> List[dict]:
+        """Get query history for a user."""
+        logs = (
+            await self.db.execute(
+                select(QueryLog)
+                .where(QueryLog.user_id == user_id)
+                .order_by(QueryLog.created_at.desc())
+                .limit(limit)
+            )
+        ).scalars().all()
+        return [
+            {
+                "id": log.id,
+                "query": log.query_text,
+                "response": log.response,
+                "chunks_count": log.retrieved_chunks_count,
+                "created_at": log.created_at.isoformat(),
+            }
+            for log in logs
+        ]
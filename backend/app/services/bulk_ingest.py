@@ -0,0 +1,325 @@
+"""Bulk corpus ingestion from directories and zip archives."""
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.models import Document
+from app.services.answer_cache import bump_corpus_version
+from app.services.chunk_writer import ChunkRow, ChunkWriter
+from app.services.document_parser import is_supported_file
+from app.services.document_service import DocumentService
+from app.services.embedding_service import EmbeddingService
+from app.services.parse_pool import get_parse_pool
+from app.services.text_processor import get_token_estimator, iter_token_chunks
+from app.services.vector_index import VectorIndexService
+from app.services.vector_store import get_vector_store
+
+logger = logging.getLogger(__name__)
+
+# Queue sentinel telling a stage worker that its upstream stage is done
+_STOP = object()
+
+# (filename, file content)
+SourceFile = Tuple[str, bytes]
+
+
+@dataclass
+class BulkIngestStats:
+    """Counters and throughput for one bulk ingest run."""
+
+    files_seen: int = 0
+    files_ingested: int = 0
+    files_failed: int = 0
+    chunks: int = 0
+    elapsed_seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files_ingested / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def record_failure(self, filename: str, error: Exception) -> None:
+        with self._lock:
+            self.files_failed += 1
+            self.errors.append(f"{filename}: {error}")
+
+    def record_success(self, chunk_count: int) -> None:
+        with self._lock:
+            self.files_ingested += 1
+            self.chunks += chunk_count
+
+    def summary(self) -> str:
+        """One-line human readable summary."""
+        return (
+            f"{self.files_ingested}/{self.files_seen} files, {self.chunks} chunks "
+            f"({self.files_failed} failed) in {self.elapsed_seconds:.1f}s: "
+            f"{self.files_per_second:.2f} files/s, {self.chunks_per_second:.1f} chunks/s"
+        )
+
+
+def iter_directory_files(directory: str, max_file_bytes: int) -> Iterator[SourceFile]:
+    """Walk a directory tree, yielding supported files under the size limit."""
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            path = Path(root) / name
+            if name.startswith(".") or not is_supported_file(name):
+                continue
+            if path.stat().st_size > max_file_bytes:
+                logger.warning(f"Skipping {path}: larger than {max_file_bytes} bytes")
+                continue
+            yield str(path.relative_to(directory)), path.read_bytes()
+
+
+def iter_zip_files(archive_path: str, max_file_bytes: int) -> Iterator[SourceFile]:
+    """Read supported members of a zip archive, yielding them one at a time."""
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in archive.infolist():
+            name = info.filename
+            basename = Path(name).name
+            if info.is_dir() or name.startswith("__MACOSX/") or basename.startswith("."):
+                continue
+            if not is_supported_file(basename):
+                continue
+            # file_size comes from the archive header; cap the actual read too
+            if info.file_size > max_file_bytes:
+                logger.warning(f"Skipping {name}: larger than {max_file_bytes} bytes")
+                continue
+            with archive.open(info) as member:
+                content = member.read(max_file_bytes + 1)
+            if len(content) > max_file_bytes:
+                logger.warning(f"Skipping {name}: larger than {max_file_bytes} bytes")
+                continue
+            yield name, content
+
+
+def count_zip_files(archive_path: str) -> int:
+    """Number of supported members in a zip archive."""
+    with zipfile.ZipFile(archive_path) as archive:
+        return sum(
+            1
+            for info in archive.infolist()
+            if not info.is_dir()
+            and not info.filename.startswith("__MACOSX/")
+            and not Path(info.filename).name.startswith(".")
+            and is_supported_file(Path(info.filename).name)
+        )
+
+
+@dataclass
+class _Item:
+    """A file moving through the pipeline."""
+
+    filename: str
+    file_size: int
+    content: Optional[bytes] = None
+    content_hash: Optional[str] = None
+    text: Optional[str] = None
+    chunks: Optional[List[str]] = None
+    embeddings: Optional[List[List[float]]] = None
+
+
+class BulkIngestPipeline:
+    """
+    Ingest many files for one user through a staged pipeline.
+
+    ``parse -> chunk -> embed -> insert`` stages run in their own threads and
+    are connected by bounded queues, so a slow stage applies backpressure
+    instead of letting parsed text pile up in memory. Parsing is handed to
+    the parse process pool; embedding uses the embedding cache and API
+    batching of ``EmbeddingService.embed_texts``. Each file is inserted as a
+    Document with its chunks in a single transaction.
+    """
+
+    def __init__(
+        self,
+        user_id: int,
+        parse_workers: Optional[int] = None,
+        chunk_workers: Optional[int] = None,
+        embed_workers: Optional[int] = None,
+        insert_workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+    ):
+        """Initialize pipeline; unset stage sizes come from settings."""
+        self.settings = get_settings()
+        self.user_id = user_id
+        self.estimate_tokens = get_token_estimator(self.settings.chunk_token_estimator)
+        self.stage_workers = {
+            "parse": parse_workers or self.settings.bulk_parse_workers,
+            "chunk": chunk_workers or self.settings.bulk_chunk_workers,
+            "embed": embed_workers or self.settings.bulk_embed_workers,
+            "insert": insert_workers or self.settings.bulk_insert_workers,
+        }
+        self.queue_size = queue_size or self.settings.bulk_queue_size
+        self.stats = BulkIngestStats()
+
+    def run(self, files: Iterator[SourceFile]) -> BulkIngestStats:
+        """Push every file through the pipeline and wait for it to drain."""
+        stages = [
+            ("parse", self._parse),
+            ("chunk", self._chunk),
+            ("embed", self._embed),
+            ("insert", self._insert),
+        ]
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in stages]
+
+        started = time.perf_counter()
+        threads: List[List[threading.Thread]] = []
+        for i, (name, handler) in enumerate(stages):
+            stage_threads = [
+                threading.Thread(
+                    target=self._stage_loop,
+                    args=(handler, queues[i], queues[i + 1] if i + 1 < len(stages) else None),
+                    name=f"bulk-{name}-{n}",
+                    daemon=True,
+                )
+                for n in range(max(1, self.stage_workers[name]))
+            ]
+            for thread in stage_threads:
+                thread.start()
+            threads.append(stage_threads)
+
+        try:
+            for filename, content in files:
+                self.stats.files_seen += 1
+                queues[0].put(_Item(filename=filename, file_size=len(content), content=content))
+        finally:
+            # Stop each stage once the one before it has drained
+            for i, stage_threads in enumerate(threads):
+                for _ in stage_threads:
+                    queues[i].put(_STOP)
+                for thread in stage_threads:
+                    thread.join()
+
+        self.stats.elapsed_seconds = time.perf_counter() - started
+
+        if self.stats.files_ingested:
+            self._after_ingest()
+        logger.info(f"Bulk ingest for user {self.user_id}: {self.stats.summary()}")
+        return self.stats
+
+    def _stage_loop(self, handler: Callable, inbox: queue.Queue, outbox: Optional[queue.Queue]) -> None:
+        # Each stage thread keeps its own session; sessions are not thread-safe
+        db = SessionLocal()
+        state = {"db": db}
+        try:
+            while True:
+                item = inbox.get()
+                if item is _STOP:
+                    return
+                try:
+                    result = handler(item, state)
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Bulk ingest of {item.filename} failed: {str(e)}")
+                    self.stats.record_failure(item.filename, e)
+                    continue
+                if outbox is not None and result is not None:
+                    outbox.put(result)
+        finally:
+            db.close()
+
+    def _parse(self, item: _Item, state: dict) -> Optional[_Item]:
+        item.content_hash = hashlib.sha256(item.content).hexdigest()
+        documents = DocumentService(state["db"])
+        source = documents.find_duplicate(self.user_id, item.content_hash)
+        if source is not None:
+            # Already processed for this user: copy its chunks instead of re-embedding
+            document = documents.create_document(
+                user_id=self.user_id,
+                filename=Path(item.filename).name,
+                file_path=item.filename,
+                file_size=item.file_size,
+                content_hash=item.content_hash,
+            )
+            try:
+                self.stats.record_success(documents.clone_chunks(source, document))
+            except Exception:
+                state["db"].rollback()
+                documents.delete_document(document.id)
+                raise
+            return None
+
+        item.text = get_parse_pool().extract_text(item.filename, item.content)
+        item.content = None
+        return item
+
+    def _chunk(self, item: _Item, state: dict) -> Optional[_Item]:
+        item.chunks = list(
+            iter_token_chunks(
+                [item.text],
+                max_tokens=self.settings.chunk_max_tokens,
+                overlap_tokens=self.settings.chunk_overlap_tokens,
+                estimator=self.estimate_tokens,
+            )
+        )
+        item.text = None
+        if not item.chunks:
+            self.stats.record_failure(item.filename, ValueError("No text extracted"))
+            return None
+        return item
+
+    def _embed(self, item: _Item, state: dict) -> _Item:
+        if "embedder" not in state:
+            state["embedder"] = EmbeddingService(state["db"])
+        item.embeddings = state["embedder"].embed_texts(item.chunks)
+        return item
+
+    def _insert(self, item: _Item, state: dict) -> None:
+        db = state["db"]
+        document = Document(
+            user_id=self.user_id,
+            filename=Path(item.filename).name,
+            file_path=item.filename,
+            file_size=item.file_size,
+            content_hash=item.content_hash,
+            total_chunks=len(item.chunks),
+            chunks_committed=len(item.chunks),
+            ingest_status="completed",
+        )
+        db.add(document)
+        db.flush()
+
+        chunk_ids = ChunkWriter(db).write(
+            [
+                ChunkRow(
+                    document_id=document.id,
+                    user_id=self.user_id,
+                    chunk_index=index,
+                    content=chunk_text,
+                    token_count=self.estimate_tokens(chunk_text),
+                    embedding=embedding,
+                    embedding_model=self.settings.gemini_embedding_model,
+                )
+                for index, (chunk_text, embedding) in enumerate(zip(item.chunks, item.embeddings))
+            ]
+        )
+        bump_corpus_version(db, self.user_id)
+        db.commit()
+
+        if self.settings.vector_backend == "numpy":
+            get_vector_store().add(self.user_id, document.id, chunk_ids, item.embeddings)
+        self.stats.record_success(len(chunk_ids))
+
+    def _after_ingest(self) -> None:
+        db = SessionLocal()
+        try:
+            VectorIndexService(db).ensure_tenant_index(self.user_id)
+        except Exception as e:
+            logger.error(f"Failed to build tenant index for user {self.user_id}: {str(e)}")
+        finally:
+            db.close()
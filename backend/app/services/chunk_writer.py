@@ -0,0 +1,170 @@
+"""Bulk writers for chunk rows: binary COPY, multi-row INSERT or ORM."""
+import io
+import struct
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models import Chunk
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CHUNK_INSERT_METHODS = ("copy", "executemany", "orm")
+
+COPY_COLUMNS = (
+    "id",
+    "document_id",
+    "user_id",
+    "chunk_index",
+    "content",
+    "token_count",
+    "embedding",
+    "embedding_model",
+    "created_at",
+)
+
+_COPY_SQL = f"COPY chunks ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT binary)"
+_COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+_COPY_TRAILER = struct.pack(">h", -1)
+_PG_EPOCH = datetime(2000, 1, 1)
+
+_NULL = struct.pack(">i", -1)
+_INT4 = struct.Struct(">ii")
+_TIMESTAMP = struct.Struct(">iq")
+
+
+class ChunkRow(NamedTuple):
+    """Column values for one new chunk."""
+
+    document_id: int
+    user_id: Optional[int]
+    chunk_index: int
+    content: str
+    token_count: Optional[int]
+    embedding: Optional[Sequence[float]]
+    embedding_model: str
+
+
+def _int4(value: Optional[int]) -> bytes:
+    return _NULL if value is None else _INT4.pack(4, value)
+
+
+def _text(value: Optional[str]) -> bytes:
+    if value is None:
+        return _NULL
+    data = value.encode("utf-8")
+    return struct.pack(">i", len(data)) + data
+
+
+def _vector(value: Optional[Sequence[float]]) -> bytes:
+    """pgvector binary format: int16 dim, int16 unused, dim big-endian float4s."""
+    if value is None:
+        return _NULL
+    if np is not None:
+        data = np.asarray(value, dtype=">f4").tobytes()
+        dim = len(data) // 4
+    else:
+        dim = len(value)
+        data = struct.pack(f">{dim}f", *value)
+    return struct.pack(">ihh", 4 + len(data), dim, 0) + data
+
+
+def encode_copy_binary(ids: Sequence[int], rows: Sequence[ChunkRow], created_at: datetime) -> bytes:
+    """Encode chunk rows in PostgreSQL's binary COPY format, columns as ``COPY_COLUMNS``."""
+    delta = created_at - _PG_EPOCH
+    timestamp = _TIMESTAMP.pack(8, (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds)
+    field_count = struct.pack(">h", len(COPY_COLUMNS))
+
+    buffer = io.BytesIO()
+    buffer.write(_COPY_HEADER)
+    for chunk_id, row in zip(ids, rows):
+        buffer.write(field_count)
+        buffer.write(_int4(chunk_id))
+        buffer.write(_int4(row.document_id))
+        buffer.write(_int4(row.user_id))
+        buffer.write(_int4(row.chunk_index))
+        buffer.write(_text(row.content))
+        buffer.write(_int4(row.token_count))
+        buffer.write(_vector(row.embedding))
+        buffer.write(_text(row.embedding_model))
+        buffer.write(timestamp)
+    buffer.write(_COPY_TRAILER)
+    return buffer.getvalue()
+
+
+class ChunkWriter:
+    """
+    Insert chunk rows in bulk within the session's current transaction.
+
+    ``copy`` streams rows through ``COPY ... FROM STDIN`` in binary format,
+    skipping SQL parsing and per-row ORM bookkeeping. ``executemany`` sends
+    multi-row INSERTs through SQLAlchemy Core. ``orm`` is the original
+    one-``Chunk``-object-per-row path. IDs are reserved from the sequence up
+    front so every method can return them without ``RETURNING``.
+    """
+
+    def __init__(self, db: Session, method: Optional[str] = None):
+        """Initialize writer; ``method`` defaults to the configured insert method."""
+        self.db = db
+        self.method = method or get_settings().chunk_insert_method
+        if self.method not in CHUNK_INSERT_METHODS:
+            raise ValueError(f"Unsupported chunk insert method: {self.method}")
+
+    def write(self, rows: Sequence[ChunkRow]) -> List[int]:
+        """
+        Insert rows without committing.
+
+        Returns:
+            IDs of the new chunks, in the order of ``rows``
+        """
+        if not rows:
+            return []
+        if self.method == "orm":
+            return self._write_orm(rows)
+
+        # Pending ORM objects (e.g. the parent Document) must exist first
+        self.db.flush()
+        ids = self._reserve_ids(len(rows))
+        created_at = datetime.utcnow()
+        if self.method == "copy" and self._copy(ids, rows, created_at):
+            return ids
+        self._executemany(ids, rows, created_at)
+        return ids
+
+    def _reserve_ids(self, count: int) -> List[int]:
+        return self.db.execute(
+            text("SELECT nextval(pg_get_serial_sequence('chunks', 'id')) FROM generate_series(1, :count)"),
+            {"count": count},
+        ).scalars().all()
+
+    def _copy(self, ids: List[int], rows: Sequence[ChunkRow], created_at: datetime) -> bool:
+        """Run a binary COPY on the session's connection; False if the driver can't."""
+        cursor = self.db.connection().connection.cursor()
+        try:
+            if not hasattr(cursor, "copy_expert"):
+                return False
+            cursor.copy_expert(_COPY_SQL, io.BytesIO(encode_copy_binary(ids, rows, created_at)))
+            return True
+        finally:
+            cursor.close()
+
+    def _executemany(self, ids: List[int], rows: Sequence[ChunkRow], created_at: datetime) -> None:
+        self.db.execute(
+            insert(Chunk.__table__),
+            [
+                {"id": chunk_id, **row._asdict(), "created_at": created_at}
+                for chunk_id, row in zip(ids, rows)
+            ],
+        )
+
+    def _write_orm(self, rows: Sequence[ChunkRow]) -> List[int]:
+        records = [Chunk(**row._asdict()) for row in rows]
+        self.db.add_all(records)
+        self.db.flush()
+        return [record.id for record in records]
@@ -0,0 +1,107 @@
+"""Pack retrieved chunks into a token-budgeted LLM context."""
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from app.services.diversification import merge_adjacent_chunks
+from app.services.text_processor import TokenEstimator, estimate_tokens
+
+# Budgets below this are too small to be worth a truncated passage
+_MIN_TRUNCATED_TOKENS = 32
+
+
+@dataclass
+class PackedContext:
+    """The context section of a prompt and what went into it."""
+
+    context: str
+    passages: List[Tuple[object, float]]  # ``(chunk, score)`` pairs, best first
+    token_count: int
+    truncated: bool  # Whether passages were cut or left out to fit the budget
+
+
+def format_passage(chunk, content: Optional[str] = None) -> str:
+    """Render one passage with the source label the LLM cites."""
+    content = chunk.content if content is None else content
+    return f"[Document {chunk.document_id}, Chunk {chunk.chunk_index}]:\n{content}"
+
+
+def _truncate(chunk, max_tokens: int, estimator: TokenEstimator) -> str:
+    """
+    Render ``chunk`` cut between words so the whole block fits ``max_tokens``.
+
+    The block is measured as a whole rather than word by word: estimators
+    like ``len // 4`` count short words as zero on their own. The cut point
+    is binary searched, since the estimate only grows as words are added.
+    """
+    words = chunk.content.split(" ")
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimator(format_passage(chunk, " ".join(words[:middle]))) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return format_passage(chunk, " ".join(words[:low]))
+
+
+def pack_context(
+    retrieved_chunks: List[Tuple[object, float]],
+    max_tokens: Optional[int] = None,
+    estimator: Optional[TokenEstimator] = None,
+) -> PackedContext:
+    """
+    Build the prompt context from retrieved chunks within a token budget.
+
+    Adjacent and overlapping chunks of a document are merged into one
+    passage with their repeated overlap removed, and passages whose text is
+    contained in a better-scoring one (e.g. from a cloned document) are
+    dropped.
+    Passages are then added best score first until the budget is used up;
+    the first one that does not fit is truncated between words if enough
+    budget is left for it to be useful.
+
+    Args:
+        retrieved_chunks: ``(chunk, score)`` pairs from retrieval
+        max_tokens: Token budget for the context; None or 0 for no limit
+        estimator: Token estimator; defaults to ``estimate_tokens``
+
+    Returns:
+        PackedContext with the context text and its estimated token count
+    """
+    estimator = estimator or estimate_tokens
+    passages = sorted(merge_adjacent_chunks(retrieved_chunks), key=lambda pair: pair[1], reverse=True)
+
+    blocks: List[str] = []
+    packed: List[Tuple[object, float]] = []
+    kept_texts: List[str] = []
+    token_count = 0
+    truncated = False
+    for chunk, score in passages:
+        text = " ".join(chunk.content.split())
+        if any(text in kept for kept in kept_texts):
+            continue
+        kept_texts.append(text)
+
+        block = format_passage(chunk)
+        # Blocks are joined by a blank line, which adds no tokens
+        tokens = estimator(block)
+        if max_tokens and token_count + tokens > max_tokens:
+            truncated = True
+            remaining = max_tokens - token_count - estimator(format_passage(chunk, ""))
+            if remaining >= _MIN_TRUNCATED_TOKENS:
+                block = _truncate(chunk, max_tokens - token_count, estimator)
+                blocks.append(block)
+                packed.append((chunk, score))
+                token_count += estimator(block)
+            break
+
+        blocks.append(block)
+        packed.append((chunk, score))
+        token_count += tokens
+
+    return PackedContext(
+        context="\n\n".join(blocks),
+        passages=packed,
+        token_count=token_count,
+        truncated=truncated,
+    )
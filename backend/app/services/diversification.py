@@ -0,0 +1,161 @@
+"""Result diversification: Maximal Marginal Relevance and adjacent-chunk merging."""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from app.services.text_processor import estimate_tokens
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+@dataclass
+class MergedChunk:
+    """A run of adjacent chunks from one document, merged into a single passage.
+
+    Exposes the same attributes as ``Chunk`` that retrieval results are read by.
+    """
+
+    id: int
+    document_id: int
+    chunk_index: int
+    content: str
+    token_count: Optional[int]
+    created_at: datetime
+    chunk_ids: List[int]
+
+
+def mmr_select(
+    query_embedding: Sequence[float],
+    candidate_embeddings: Sequence[Sequence[float]],
+    k: int,
+    lambda_mult: float = 0.5,
+) -> List[int]:
+    """
+    Pick ``k`` candidates by Maximal Marginal Relevance.
+
+    Each step picks the candidate maximizing
+    ``lambda * sim(query, c) - (1 - lambda) * max(sim(c, selected))``
+    using cosine similarity. The redundancy term is updated with one
+    matrix-vector product per step.
+
+    Returns:
+        Indices into ``candidate_embeddings``, in selection order
+    """
+    if np is None:
+        raise ImportError("numpy is required for MMR diversification. Install with: pip install numpy")
+
+    n = len(candidate_embeddings)
+    k = min(k, n)
+    if k <= 0:
+        return []
+
+    matrix = np.asarray(candidate_embeddings, dtype=np.float32)
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query /= max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = matrix @ query
+    redundancy = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    selected: List[int] = []
+
+    for _ in range(k):
+        if selected:
+            mmr = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        else:
+            mmr = relevance.copy()
+        mmr[~available] = -np.inf
+        best = int(np.argmax(mmr))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, matrix @ matrix[best])
+
+    return selected
+
+
+def _strip_overlap(previous: str, following: str, max_overlap: int = 200, min_overlap: int = 20) -> str:
+    """Drop the prefix of ``following`` that repeats the end of ``previous``.
+
+    ``max_overlap`` covers the sentences ``iter_token_chunks`` repeats between
+    chunks. Shorter matches only count when they end on a word boundary, so a
+    coincidental one-word match isn't mistaken for overlap.
+    """
+    for size in range(min(len(previous), len(following), max_overlap), 0, -1):
+        if previous.endswith(following[:size]) and (size >= min_overlap or following[size:size + 1] in ("", " ")):
+            return following[size:]
+    return " " + following
+
+
+def _last_index(chunk) -> int:
+    """The last ``chunk_index`` a hit covers; merged passages span several."""
+    return chunk.chunk_index + len(getattr(chunk, "chunk_ids", None) or [chunk.id]) - 1
+
+
+def merge_adjacent_chunks(results: List[Tuple[object, float]]) -> List[Tuple[object, float]]:
+    """
+    Merge hits with consecutive or overlapping ``chunk_index`` ranges from the same document.
+
+    Overlapping text between neighbouring chunks is included once, and a hit
+    whose range is already covered is dropped, so merging merged passages
+    again is a no-op. A merged passage keeps the best score of its parts and
+    takes the rank of its best-ranked part.
+
+    Returns:
+        List of ``(chunk, score)`` pairs; unmerged chunks are passed through
+    """
+    if len(results) <= 1:
+        return results
+
+    rank = {id(chunk): position for position, (chunk, _) in enumerate(results)}
+    # Widest range first among hits starting at the same chunk
+    ordered = sorted(results, key=lambda pair: (pair[0].document_id, pair[0].chunk_index, -_last_index(pair[0])))
+
+    runs: List[List[Tuple[object, float]]] = []
+    run_end = -1  # Last chunk_index covered by the current run
+    for chunk, score in ordered:
+        if runs and runs[-1][0][0].document_id == chunk.document_id and chunk.chunk_index <= run_end + 1:
+            runs[-1].append((chunk, score))
+        else:
+            runs.append([(chunk, score)])
+        run_end = max(run_end, _last_index(chunk)) if len(runs[-1]) > 1 else _last_index(chunk)
+
+    merged: List[Tuple[int, object, float]] = []
+    for run in runs:
+        best_rank = min(rank[id(chunk)] for chunk, _ in run)
+        best_score = max(score for _, score in run)
+        if len(run) == 1:
+            merged.append((best_rank, run[0][0], best_score))
+            continue
+
+        first = run[0][0]
+        content = first.content
+        chunk_ids = list(getattr(first, "chunk_ids", None) or [first.id])
+        covered = _last_index(first)
+        for chunk, _ in run[1:]:
+            if _last_index(chunk) <= covered:
+                continue
+            content += _strip_overlap(content, chunk.content)
+            chunk_ids.extend(getattr(chunk, "chunk_ids", None) or [chunk.id])
+            covered = _last_index(chunk)
+        content = " ".join(content.split())
+        merged.append(
+            (
+                best_rank,
+                MergedChunk(
+                    id=first.id,
+                    document_id=first.document_id,
+                    chunk_index=first.chunk_index,
+                    content=content,
+                    token_count=estimate_tokens(content),
+                    created_at=first.created_at,
+                    chunk_ids=chunk_ids,
+                ),
+                best_score,
+            )
+        )
+
+    merged.sort(key=lambda item: item[0])
+    return [(chunk, score) for _, chunk, score in merged]
@@ -1,72 +1,135 @@
 """Document parsing utilities for various file formats."""
+import codecs
 import io
-from typing import Optional
+import os
+from typing import BinaryIO, Iterator, Optional, Union
 
-try:
-    from pypdf import PdfReader
-except ImportError:
-    PdfReader = None
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
 
-try:
-    from docx import Document as DocxDocument
-except ImportError:
-    DocxDocument = None
+# Parsers accept raw bytes, a path to a file on disk, or a binary stream
+FileSource = Union[bytes, str, os.PathLike, BinaryIO]
 
+TXT_READ_SIZE = 64 * 1024
 
-def extract_text_from_pdf(file_content: bytes) -> Optional[str]:
-    """Extract text from PDF file."""
-    if PdfReader is None:
+
+def is_supported_file(filename: str) -> bool:
+    """Check whether the file extension is one we can extract text from."""
+    return filename.lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+def get_pdf_reader():
+    """Import ``pypdf.PdfReader`` on first use; pypdf is slow to import."""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
         raise ImportError("pypdf is required for PDF support. Install with: pip install pypdf")
-    
+    return PdfReader
+
+
+def get_docx_document():
+    """Import ``docx.Document`` on first use; python-docx pulls in lxml."""
     try:
-        pdf_reader = PdfReader(io.BytesIO(file_content))
-        text = ""
+        from docx import Document as DocxDocument
+    except ImportError:
+        raise ImportError("python-docx is required for DOCX support. Install with: pip install python-docx")
+    return DocxDocument
+
+
+def _as_stream(source: FileSource):
+    """Wrap bytes in a stream; paths and streams are passed through."""
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return source
+
+
+def iter_text_from_pdf(source: FileSource) -> Iterator[str]:
+    """Yield text from a PDF one page at a time."""
+    PdfReader = get_pdf_reader()
+
+    try:
+        pdf_reader = PdfReader(_as_stream(source))
         for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+            yield (page.extract_text() or "") + "\n"
     except Exception as e:
         raise ValueError(f"Failed to extract PDF: {str(e)}")
 
 
-def extract_text_from_docx(file_content: bytes) -> Optional[str]:
-    """Extract text from DOCX file."""
-    if DocxDocument is None:
-        raise ImportError("python-docx is required for DOCX support. Install with: pip install python-docx")
-    
+def iter_text_from_docx(source: FileSource) -> Iterator[str]:
+    """Yield text from a DOCX one paragraph at a time."""
+    DocxDocument = get_docx_document()
+
     try:
-        doc = DocxDocument(io.BytesIO(file_content))
-        text = ""
+        doc = DocxDocument(_as_stream(source))
         for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text
+            yield paragraph.text + "\n"
     except Exception as e:
         raise ValueError(f"Failed to extract DOCX: {str(e)}")
 
 
-def extract_text_from_txt(file_content: bytes) -> str:
-    """Extract text from TXT file."""
+def iter_text_from_txt(source: FileSource) -> Iterator[str]:
+    """Yield decoded text from a TXT file in fixed-size blocks."""
     try:
-        return file_content.decode('utf-8', errors='ignore')
+        if isinstance(source, (bytes, bytearray)):
+            yield source.decode('utf-8', errors='ignore')
+            return
+
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        stream = open(source, "rb") if isinstance(source, (str, os.PathLike)) else source
+        try:
+            while True:
+                block = stream.read(TXT_READ_SIZE)
+                if not block:
+                    break
+                yield decoder.decode(block)
+            yield decoder.decode(b"", final=True)
+        finally:
+            if stream is not source:
+                stream.close()
     except Exception as e:
         raise ValueError(f"Failed to extract TXT: {str(e)}")
 
 
-def extract_text_from_file(filename: str, file_content: bytes) -> str:
+def iter_text_from_file(filename: str, source: FileSource) -> Iterator[str]:
     """
-    Extract text from file based on file extension.
-    
-    Supported formats:
-    - .pdf (requires pypdf)
-    - .docx (requires python-docx)
-    - .txt (always supported)
+    Yield text from a file incrementally, based on file extension.
+
+    PDFs yield per page, DOCX per paragraph and TXT per block, so the whole
+    document text never has to be held in memory at once.
     """
     filename_lower = filename.lower()
-    
+
     if filename_lower.endswith('.pdf'):
-        return extract_text_from_pdf(file_content)
+        return iter_text_from_pdf(source)
     elif filename_lower.endswith('.docx'):
-        return extract_text_from_docx(file_content)
+        return iter_text_from_docx(source)
     elif filename_lower.endswith('.txt'):
-        return extract_text_from_txt(file_content)
+        return iter_text_from_txt(source)
     else:
         raise ValueError(f"Unsupported file format: {filename}")
+
+
+def extract_text_from_pdf(file_content: bytes) -> Optional[str]:
+    """Extract text from PDF file."""
+    return "".join(iter_text_from_pdf(file_content))
+
+
+def extract_text_from_docx(file_content: bytes) -> Optional[str]:
+    """Extract text from DOCX file."""
+    return "".join(iter_text_from_docx(file_content))
+
+
+def extract_text_from_txt(file_content: bytes) -> str:
+    """Extract text from TXT file."""
+    return "".join(iter_text_from_txt(file_content))
+
+
+def extract_text_from_file(filename: str, file_content: bytes) -> str:
+    """
+    Extract text from file based on file extension.
+
+    Supported formats:
+    - .pdf (requires pypdf)
+    - .docx (requires python-docx)
+    - .txt (always supported)
+    """
+    return "".join(iter_text_from_file(filename, file_content))
@@ -1,6 +1,47 @@
 """Document management service."""
-from app.models import Document
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import get_settings
+from app.models import Chunk, DedupStats, Document
+from app.services.answer_cache import bump_corpus_version
 from app.services.base import BaseService
+from app.services.vector_store import get_vector_store
+
+# The single counter row in ``dedup_stats``
+_DEDUP_STATS_ID = 1
+
+
+def get_dedup_stats(db) -> dict:
+    """Return counters of embedding work skipped by document dedup, across all workers."""
+    stats = db.query(DedupStats).filter(DedupStats.id == _DEDUP_STATS_ID).first()
+    return {
+        "documents_deduplicated": stats.documents if stats else 0,
+        "chunks_reused": stats.chunks if stats else 0,
+        "embedding_tokens_saved": stats.tokens if stats else 0,
+    }
+
+
+def _record_dedup(db, chunks: int, tokens: int) -> None:
+    """Add a cloned document to the counters, in the caller's transaction."""
+    table = DedupStats.__table__
+    statement = insert(table).values(
+        id=_DEDUP_STATS_ID, documents=1, chunks=chunks, tokens=tokens, updated_at=datetime.utcnow()
+    )
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[table.c.id],
+            set_={
+                "documents": table.c.documents + 1,
+                "chunks": table.c.chunks + statement.excluded.chunks,
+                "tokens": table.c.tokens + statement.excluded.tokens,
+                "updated_at": statement.excluded.updated_at,
+            },
+        )
+    )
 
 
 class DocumentService(BaseService):
@@ -15,7 +56,12 @@ class DocumentService(BaseService):
         return self.db.query(Document).filter(Document.user_id == user_id).all()
 
     def create_document(
-        self, user_id: int, filename: str, file_path: str = None, file_size: int = None
+        self,
+        user_id: int,
+        filename: str,
+        file_path: str = None,
+        file_size: int = None,
+        content_hash: str = None,
     ) -> Document:
         """Create a new document record."""
         document = Document(
@@ -23,6 +69,7 @@ class DocumentService(BaseService):
             filename=filename,
             file_path=file_path,
             file_size=file_size,
+            content_hash=content_hash,
         )
         self.db.add(document)
         return self.commit_and_refresh(document)
@@ -31,8 +78,12 @@ class DocumentService(BaseService):
         """Delete a document and its chunks."""
         document = self.get_document(doc_id)
         if document:
+            user_id = document.user_id
             self.db.delete(document)
+            bump_corpus_version(self.db, user_id)
             self.db.commit()
+            if get_settings().vector_backend == "numpy":
+                get_vector_store().remove_document(user_id, doc_id)
             return True
         return False
 
@@ -43,3 +94,66 @@ class DocumentService(BaseService):
             document.total_chunks = chunk_count
             return self.commit_and_refresh(document)
         return None
+
+    def find_duplicate(self, user_id: int, content_hash: str, exclude_id: int = None) -> Optional[Document]:
+        """
+        Find an already-processed document of the user with identical file content.
+
+        Only the user's own documents are matched: cloning another tenant's
+        chunks would copy their data and reveal that they uploaded the file.
+        """
+        query = self.db.query(Document).filter(
+            Document.user_id == user_id,
+            Document.content_hash == content_hash,
+            Document.ingest_status == "completed",
+            Document.total_chunks > 0,
+        )
+        if exclude_id is not None:
+            query = query.filter(Document.id != exclude_id)
+        return query.order_by(Document.id).first()
+
+    def clone_chunks(self, source: Document, target: Document) -> int:
+        """
+        Copy a processed document's chunks and embeddings onto another document.
+
+        Rows are copied with ``INSERT ... SELECT`` inside Postgres, so nothing
+        is re-parsed or re-embedded.
+
+        Returns:
+            Number of chunks cloned
+        """
+        rows = self.db.execute(
+            text(
+                """
+                INSERT INTO chunks
+                    (document_id, user_id, chunk_index, content, token_count,
+                     embedding, embedding_model, created_at)
+                SELECT :target_id, :user_id, chunk_index, content, token_count,
+                       embedding, embedding_model, now() AT TIME ZONE 'utc'
+                FROM chunks
+                WHERE document_id = :source_id
+                ORDER BY chunk_index
+                RETURNING id, token_count
+                """
+            ),
+            {"target_id": target.id, "user_id": target.user_id, "source_id": source.id},
+        ).all()
+        target.total_chunks = len(rows)
+        target.chunks_committed = len(rows)
+        target.ingest_status = "completed"
+        bump_corpus_version(self.db, target.user_id)
+        _record_dedup(self.db, len(rows), sum(row.token_count or 0 for row in rows))
+        self.db.commit()
+
+        if get_settings().vector_backend == "numpy":
+            vectors = (
+                self.db.query(Chunk.id, Chunk.embedding)
+                .filter(Chunk.document_id == target.id, Chunk.embedding.isnot(None))
+                .order_by(Chunk.id)
+                .all()
+            )
+            get_vector_store().add(
+                target.user_id, target.id, [row.id for row in vectors], [row.embedding for row in vectors]
+            )
+
+        return len(rows)
@@ -0,0 +1,241 @@
+"""Persistent, content-addressed cache for text embeddings."""
+import hashlib
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import get_settings
+from app.models import EmbeddingCacheEntry
+from app.services.base import BaseService
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+# When this process last checked the cache size (``time.monotonic()``)
+_evict_lock = threading.Lock()
+_last_evict_check: Optional[float] = None
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text before hashing so whitespace-only edits share an entry."""
+    return " ".join(text.split())
+
+
+def text_hash(text: str) -> str:
+    """SHA-256 hex digest of the normalized text."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def get_cache_stats() -> dict:
+    """Return process-wide hit/miss counters for the embedding cache."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def _record(hits: int = 0, misses: int = 0, evictions: int = 0) -> None:
+    with _stats_lock:
+        _stats["hits"] += hits
+        _stats["misses"] += misses
+        _stats["evictions"] += evictions
+
+
+class EmbeddingCache(BaseService):
+    """Embedding cache stored in the ``embedding_cache`` table.
+
+    Entries are keyed by ``(embedding_model, sha256(normalized text))`` and
+    evicted least-recently-used first once ``max_entries`` is exceeded.
+    Checking the size counts the whole table, so writes do it at most once
+    per ``evict_interval_seconds`` in each process; the table may briefly
+    hold more than ``max_entries`` in between.
+    """
+
+    def __init__(self, db, max_entries: int, evict_interval_seconds: float = 0.0):
+        """Initialize cache with database session and size bound."""
+        super().__init__(db)
+        self.max_entries = max_entries
+        self.evict_interval_seconds = evict_interval_seconds
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        """Look up embeddings by text hash, returning only the hits."""
+        unique_hashes = list(set(hashes))
+        if not unique_hashes:
+            return {}
+
+        entries = (
+            self.db.query(EmbeddingCacheEntry)
+            .filter(
+                EmbeddingCacheEntry.embedding_model == model,
+                EmbeddingCacheEntry.text_hash.in_(unique_hashes),
+            )
+            .all()
+        )
+        found = {entry.text_hash: list(entry.embedding) for entry in entries}
+
+        if found:
+            self.db.query(EmbeddingCacheEntry).filter(
+                EmbeddingCacheEntry.id.in_([entry.id for entry in entries])
+            ).update({EmbeddingCacheEntry.last_used_at: datetime.utcnow()}, synchronize_session=False)
+
+        _record(hits=len(found), misses=len(unique_hashes) - len(found))
+        return found
+
+    def put_many(self, model: str, embeddings: Dict[str, List[float]]) -> None:
+        """Store embeddings by text hash and periodically evict old entries if over capacity."""
+        if not embeddings:
+            return
+
+        now = datetime.utcnow()
+        stmt = insert(EmbeddingCacheEntry).values(
+            [
+                {
+                    "embedding_model": model,
+                    "text_hash": key,
+                    "embedding": embedding,
+                    "created_at": now,
+                    "last_used_at": now,
+                }
+                for key, embedding in embeddings.items()
+            ]
+        )
+        self.db.execute(
+            stmt.on_conflict_do_nothing(index_elements=["embedding_model", "text_hash"])
+        )
+        if self._eviction_due():
+            self.evict()
+
+    def _eviction_due(self) -> bool:
+        """Whether this process should check the cache size now."""
+        global _last_evict_check
+        now = time.monotonic()
+        with _evict_lock:
+            if _last_evict_check is not None and now - _last_evict_check < self.evict_interval_seconds:
+                return False
+            _last_evict_check = now
+            return True
+
+    def evict(self) -> int:
+        """Delete least-recently-used entries beyond ``max_entries``."""
+        total = self.db.query(func.count(EmbeddingCacheEntry.id)).scalar() or 0
+        excess = total - self.max_entries
+        if excess <= 0:
+            return 0
+
+        stale_ids = (
+            select(EmbeddingCacheEntry.id)
+            .order_by(EmbeddingCacheEntry.last_used_at.asc())
+            .limit(excess)
+        )
+        deleted = (
+            self.db.query(EmbeddingCacheEntry)
+            .filter(EmbeddingCacheEntry.id.in_(stale_ids))
+            .delete(synchronize_session=False)
+        )
+        _record(evictions=deleted)
+        return deleted
+
+
+class QueryEmbeddingLRU:
+    """In-process LRU/TTL cache of query embeddings.
+
+    Keys are the embedding model plus the query normalized on whitespace and
+    case. The cache is bounded both by entry count and by approximate bytes.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        """Initialize an empty cache with the given bounds."""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(model: str, query_text: str) -> tuple:
+        return model, normalize_text(query_text).lower()
+
+    @staticmethod
+    def _entry_size(key: tuple, vector: array) -> int:
+        return vector.itemsize * len(vector) + len(key[0]) + len(key[1])
+
+    def get(self, model: str, query_text: str) -> Optional[List[float]]:
+        """Return a cached embedding, or None if missing or expired."""
+        key = self._key(model, query_text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] > self.ttl_seconds:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0].tolist()
+
+    def put(self, model: str, query_text: str, embedding: List[float]) -> None:
+        """Store an embedding, evicting least-recently-used entries as needed."""
+        key = self._key(model, query_text)
+        vector = array("f", embedding)
+        size = self._entry_size(key, vector)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (vector, time.monotonic())
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Return size and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _remove(self, key: tuple) -> None:
+        vector, _ = self._entries.pop(key)
+        self._bytes -= self._entry_size(key, vector)
+
+
+_query_cache: Optional[QueryEmbeddingLRU] = None
+_query_cache_lock = threading.Lock()
+
+
+def get_query_embedding_cache() -> QueryEmbeddingLRU:
+    """Get the process-wide query embedding cache."""
+    global _query_cache
+    if _query_cache is None:
+        with _query_cache_lock:
+            if _query_cache is None:
+                settings = get_settings()
+                _query_cache = QueryEmbeddingLRU(
+                    max_entries=settings.query_embedding_cache_max_entries,
+                    max_bytes=settings.query_embedding_cache_max_bytes,
+                    ttl_seconds=settings.query_embedding_cache_ttl_seconds,
+                )
+    return _query_cache
@@ -1,16 +1,268 @@
 """Embedding service for generating and storing vector embeddings."""
-from typing import List, Optional
+import logging
+import random
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
-from sqlalchemy.orm import Session
+from sqlalchemy import (
+    Float,
+    Integer,
+    bindparam,
+    cast,
+    column,
+    func,
+    literal,
+    select,
+    true,
+    union_all,
+    update,
+    values,
+)
+from sqlalchemy.orm import Session, load_only
 
 from app.core.config import get_settings
 from app.models import Chunk, Document
-from app.services.text_processor import estimate_tokens, split_into_chunks
+from app.services.answer_cache import bump_corpus_version
+from app.services.chunk_writer import ChunkRow, ChunkWriter
+from app.services.diversification import merge_adjacent_chunks, mmr_select
+from app.services.embedding_cache import EmbeddingCache, text_hash
+from app.services.gemini import get_genai, transient_errors
+from app.services.text_processor import get_token_estimator, iter_token_chunks
+from app.services.vector_index import distance_operator, similarity_expression
+from app.services.vector_store import get_vector_store
 
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
+logger = logging.getLogger(__name__)
+
+RETRIEVAL_MODES = ("vector", "hybrid")
+
+# Columns returned by similarity search; the embedding itself is never loaded
+_RESULT_COLUMNS = (
+    Chunk.id,
+    Chunk.document_id,
+    Chunk.chunk_index,
+    Chunk.content,
+    Chunk.token_count,
+    Chunk.created_at,
+)
+
+
+def _batched(iterable: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Yield lists of up to ``size`` items from ``iterable``."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Merge several ranked ID lists with reciprocal rank fusion.
+    
+    Each ID scores ``sum(1 / (k + rank))`` over the rankings it appears in.
+    
+    Returns:
+        List of ``(id, score)`` pairs, highest score first
+    """
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+
+
+def vector_search_statement(
+    query_embedding: List[float],
+    user_id: Optional[int],
+    document_ids: Optional[List[int]],
+    top_k: int,
+    similarity_threshold: Optional[float],
+):
+    """Nearest-neighbour search in pgvector, selecting ``(Chunk, score)`` rows."""
+    # Compute distance and similarity score in SQL
+    # Note: the operator matches the index opclass so the ANN index is used
+    distance = Chunk.embedding.op(distance_operator(), return_type=Float)(query_embedding)
+    score = similarity_expression(distance)
+    
+    # Select only the columns the response needs; the embedding stays in the DB
+    stmt = select(Chunk, score.label("score")).options(load_only(*_RESULT_COLUMNS)).order_by(distance)
+    
+    # Only touch the tenant's rows (served by the per-user partial index if one exists)
+    if user_id is not None:
+        stmt = stmt.where(Chunk.user_id == user_id)
+    
+    # Drop chunks below the similarity threshold on the server
+    if similarity_threshold is not None:
+        stmt = stmt.where(score >= similarity_threshold)
+    
+    # Filter by documents if specified
+    if document_ids:
+        stmt = stmt.where(Chunk.document_id.in_(document_ids))
+    
+    # Get top k results
+    return stmt.limit(top_k)
+
+
+def batch_vector_search_statement(
+    query_embeddings: List[List[float]],
+    user_id: int,
+    document_ids: Optional[List[int]],
+    top_k: int,
+    similarity_threshold: Optional[float],
+):
+    """Top-k for many query vectors in one statement, selecting ``(query_index, Chunk, score)`` rows."""
+    # pgvector adds no bind cast, so without one Postgres types the column as text
+    vector_type = Chunk.embedding.type
+    queries = values(
+        column("query_index", Integer),
+        column("embedding", vector_type),
+        name="queries",
+    ).data(
+        [
+            (index, cast(literal(embedding, vector_type), vector_type))
+            for index, embedding in enumerate(query_embeddings)
+        ]
+    )
+    
+    distance = Chunk.embedding.op(distance_operator(), return_type=Float)(queries.c.embedding)
+    score = similarity_expression(distance)
+    hits = select(Chunk.id.label("chunk_id"), score.label("score")).where(Chunk.user_id == user_id)
+    if similarity_threshold is not None:
+        hits = hits.where(score >= similarity_threshold)
+    if document_ids:
+        hits = hits.where(Chunk.document_id.in_(document_ids))
+    # Correlate only the query vector; the outer chunks join must not leak in
+    hits = hits.order_by(distance).limit(top_k).correlate(queries).lateral("hits")
+    
+    return (
+        select(queries.c.query_index, Chunk, hits.c.score)
+        .select_from(queries)
+        .join(hits, true())
+        .join(Chunk, Chunk.id == hits.c.chunk_id)
+        .options(load_only(*_RESULT_COLUMNS))
+        .order_by(queries.c.query_index, hits.c.score.desc())
+    )
+
+
+def hybrid_search_statement(
+    query_text: str,
+    query_embedding: List[float],
+    user_id: Optional[int],
+    document_ids: Optional[List[int]],
+    top_k: int,
+    similarity_threshold: Optional[float],
+    candidates: int,
+    rrf_k: int,
+    text_search_config: str,
+):
+    """Vector and full-text search fused with RRF in one statement, selecting ``(Chunk, score)`` rows."""
+    filters = []
+    if user_id is not None:
+        filters.append(Chunk.user_id == user_id)
+    if document_ids:
+        filters.append(Chunk.document_id.in_(document_ids))
+    
+    # Vector arm: nearest neighbours, ranked after the LIMIT so the ANN index is used
+    distance = Chunk.embedding.op(distance_operator(), return_type=Float)(query_embedding)
+    vector_filters = list(filters)
+    if similarity_threshold is not None:
+        vector_filters.append(similarity_expression(distance) >= similarity_threshold)
+    vector_top = (
+        select(Chunk.id.label("id"), distance.label("distance"))
+        .where(*vector_filters)
+        .order_by(distance)
+        .limit(candidates)
+        .subquery("vector_top")
+    )
+    vector_hits = select(
+        vector_top.c.id,
+        func.row_number().over(order_by=vector_top.c.distance).label("rank"),
+    )
+    
+    # Lexical arm: GIN-indexed tsvector match ranked by ts_rank_cd
+    ts_query = func.websearch_to_tsquery(text_search_config, query_text)
+    lexical_score = func.ts_rank_cd(Chunk.content_tsv, ts_query)
+    lexical_top = (
+        select(Chunk.id.label("id"), lexical_score.label("lexical_score"))
+        .where(Chunk.content_tsv.op("@@")(ts_query), *filters)
+        .order_by(lexical_score.desc())
+        .limit(candidates)
+        .subquery("lexical_top")
+    )
+    lexical_hits = select(
+        lexical_top.c.id,
+        func.row_number().over(order_by=lexical_top.c.lexical_score.desc()).label("rank"),
+    )
+    
+    # Reciprocal rank fusion over both arms
+    fused = union_all(vector_hits, lexical_hits).subquery("fused")
+    rrf_score = func.sum(1.0 / (rrf_k + fused.c.rank))
+    ranked = (
+        select(fused.c.id.label("id"), rrf_score.label("score"))
+        .group_by(fused.c.id)
+        .order_by(rrf_score.desc())
+        .limit(top_k)
+        .subquery("ranked")
+    )
+    
+    return (
+        select(Chunk, ranked.c.score)
+        .join(ranked, ranked.c.id == Chunk.id)
+        .options(load_only(*_RESULT_COLUMNS))
+        .order_by(ranked.c.score.desc())
+    )
+
+
+def lexical_ids_statement(
+    query_text: str,
+    user_id: int,
+    document_ids: Optional[List[int]],
+    limit: int,
+    text_search_config: str,
+):
+    """IDs of the best full-text matches, for fusing with NumPy vector hits."""
+    ts_query = func.websearch_to_tsquery(text_search_config, query_text)
+    lexical_score = func.ts_rank_cd(Chunk.content_tsv, ts_query)
+    stmt = select(Chunk.id).where(Chunk.user_id == user_id, Chunk.content_tsv.op("@@")(ts_query))
+    if document_ids:
+        stmt = stmt.where(Chunk.document_id.in_(document_ids))
+    return stmt.order_by(lexical_score.desc()).limit(limit)
+
+
+def chunks_by_id_statement(chunk_ids: List[int]):
+    """Load result chunks by ID, without their embedding."""
+    return select(Chunk).options(load_only(*_RESULT_COLUMNS)).where(Chunk.id.in_(chunk_ids))
+
+
+def order_hits(hits: List[Tuple[int, float]], chunks: Iterable[Chunk]) -> List[Tuple[Chunk, float]]:
+    """Pair ``(chunk_id, score)`` hits with their loaded chunks, keeping hit order."""
+    by_id = {chunk.id: chunk for chunk in chunks}
+    return [(by_id[chunk_id], score) for chunk_id, score in hits if chunk_id in by_id]
+
+
+def diversify_results(
+    query_embedding: List[float],
+    results: List[Tuple[Chunk, float]],
+    embeddings: Dict[int, List[float]],
+    top_k: int,
+    lambda_mult: float,
+) -> List[Tuple[Chunk, float]]:
+    """Re-select ``top_k`` candidates with MMR, then merge adjacent chunks."""
+    if len(results) > top_k:
+        results = [(chunk, score) for chunk, score in results if chunk.id in embeddings]
+        selected = mmr_select(
+            query_embedding,
+            [embeddings[chunk.id] for chunk, _ in results],
+            k=top_k,
+            lambda_mult=lambda_mult,
+        )
+        results = [results[i] for i in selected]
+    return merge_adjacent_chunks(results)
 
 
 class EmbeddingService:
@@ -20,15 +272,42 @@ class EmbeddingService:
         """Initialize embedding service."""
         self.db = db
         self.settings = get_settings()
+        # Used for chunking and for the token_count stored with each chunk
+        self.estimate_tokens = get_token_estimator(self.settings.chunk_token_estimator)
         
-        if genai is None:
-            raise ImportError("google-generativeai is required. Install with: pip install google-generativeai")
+        # Imported and configured on first use
+        self.genai = get_genai()
         
         if not self.settings.gemini_api_key:
             raise ValueError("GEMINI_API_KEY not configured")
         
-        # Configure Gemini client
-        genai.configure(api_key=self.settings.gemini_api_key)
+        self.cache = EmbeddingCache(
+            db,
+            max_entries=self.settings.embedding_cache_max_entries,
+            evict_interval_seconds=self.settings.embedding_cache_evict_interval_seconds,
+        )
+
+    def _with_retries(self, call: Callable):
+        """
+        Run an embedding API call, retrying transient failures.
+        
+        Rate limits, timeouts and 5xx responses are retried up to
+        ``embedding_max_retries`` times with jittered exponential backoff.
+        """
+        attempt = 0
+        while True:
+            try:
+                return call()
+            except transient_errors() as e:
+                attempt += 1
+                if attempt > self.settings.embedding_max_retries:
+                    raise
+                delay = min(
+                    self.settings.embedding_retry_max_delay_seconds,
+                    self.settings.embedding_retry_base_delay_seconds * 2 ** (attempt - 1),
+                ) * random.uniform(0.5, 1.0)
+                logger.warning(f"Embedding request failed ({str(e)}); retry {attempt} in {delay:.1f}s")
+                time.sleep(delay)
 
     def generate_embedding(self, text: str) -> List[float]:
         """
@@ -41,21 +320,171 @@ class EmbeddingService:
             raise ValueError("GEMINI_API_KEY not configured")
         
         try:
-            result = genai.embed_content(
-                model=self.settings.gemini_embedding_model,
-                content=text,
+            result = self._with_retries(
+                lambda: self.genai.embed_content(
+                    model=self.settings.gemini_embedding_model,
+                    content=text,
+                )
             )
             return result['embedding']
         except Exception as e:
             raise ValueError(f"Failed to generate embedding: {str(e)}")
 
-    def embed_document(self, document_id: int, text: str) -> int:
+    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for a batch of texts in a single API request.
+        
+        Returns:
+            List of embedding vectors, in the same order as ``texts``
+        """
+        if not self.settings.gemini_api_key:
+            raise ValueError("GEMINI_API_KEY not configured")
+        
+        if not texts:
+            return []
+        
+        try:
+            result = self._with_retries(
+                lambda: self.genai.embed_content(
+                    model=self.settings.gemini_embedding_model,
+                    content=texts,
+                )
+            )
+            embeddings = result['embedding']
+        except Exception as e:
+            raise ValueError(f"Failed to generate embeddings: {str(e)}")
+        
+        if len(embeddings) != len(texts):
+            raise ValueError(
+                f"Embedding API returned {len(embeddings)} vectors for {len(texts)} texts"
+            )
+        return embeddings
+
+    def embed_texts(
+        self,
+        texts: List[str],
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> List[List[float]]:
+        """
+        Embed many texts, serving repeats from the embedding cache.
+        
+        Only texts whose ``(model, normalized text hash)`` is not cached are
+        sent to the embedding API; their results are then added to the cache.
+        
+        Args:
+            texts: Texts to embed
+            on_progress: Called with ``(embedded, total)`` as batches complete
+        
+        Returns:
+            List of embedding vectors, in the same order as ``texts``
+        """
+        if not self.settings.embedding_cache_enabled:
+            return self._embed_batches(
+                texts, on_progress and (lambda done: on_progress(done, len(texts)))
+            )
+        
+        model = self.settings.gemini_embedding_model
+        hashes = [text_hash(t) for t in texts]
+        embeddings = self.cache.get_many(model, hashes)
+        
+        # Deduplicate misses so repeated chunks are only embedded once
+        missing = {}
+        for key, chunk_text in zip(hashes, texts):
+            if key not in embeddings and key not in missing:
+                missing[key] = chunk_text
+        
+        cached_count = sum(1 for key in hashes if key in embeddings)
+        if on_progress:
+            on_progress(cached_count, len(texts))
+        
+        if missing:
+            fresh = dict(zip(
+                missing.keys(),
+                self._embed_batches(
+                    list(missing.values()),
+                    on_progress and (lambda done: on_progress(cached_count + done, len(texts))),
+                ),
+            ))
+            self.cache.put_many(model, fresh)
+            embeddings.update(fresh)
+        
+        return [embeddings[key] for key in hashes]
+
+    def _embed_batches(
+        self,
+        texts: List[str],
+        on_progress: Optional[Callable[[int], None]] = None,
+    ) -> List[List[float]]:
+        """
+        Embed many texts using batched requests run concurrently.
+        
+        Texts are grouped into batches of ``embedding_batch_size`` and up to
+        ``embedding_max_concurrency`` batches are in flight at once.
+        ``on_progress`` is called with the number of texts embedded so far.
+        
+        Returns:
+            List of embedding vectors, in the same order as ``texts``
+        """
+        batch_size = max(1, self.settings.embedding_batch_size)
+        batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+        workers = min(max(1, self.settings.embedding_max_concurrency), len(batches))
+        
+        if workers <= 1:
+            batch_results = (self.generate_embeddings(batch) for batch in batches)
+            executor = None
+        else:
+            # Executor.map yields results in submission order, so chunk order is kept
+            executor = ThreadPoolExecutor(max_workers=workers)
+            batch_results = executor.map(self.generate_embeddings, batches)
+        
+        results = []
+        done = 0
+        try:
+            for batch_embeddings in batch_results:
+                results.append(batch_embeddings)
+                done += len(batch_embeddings)
+                if on_progress:
+                    on_progress(done)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+        
+        return [embedding for batch in results for embedding in batch]
+
+    def chunk_text(self, text: Union[str, Iterable[str]]) -> Iterator[str]:
+        """Lazily split text (or a stream of text pieces) into chunks using the configured token budget."""
+        pieces = [text] if isinstance(text, str) else text
+        return iter_token_chunks(
+            pieces,
+            max_tokens=self.settings.chunk_max_tokens,
+            overlap_tokens=self.settings.chunk_overlap_tokens,
+            estimator=self.estimate_tokens,
+        )
+
+    def embed_document(
+        self,
+        document_id: int,
+        text: Union[str, Iterable[str]],
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> int:
         """
         Process document text and create embeddings for chunks.
         
+        ``text`` may be the full text or a stream of text pieces (e.g. pages
+        from ``iter_text_from_file``). Chunks are produced lazily and each
+        batch of ``embedding_batch_size`` chunks is sent for embedding as soon
+        as it is full, with up to ``embedding_max_concurrency`` batches in
+        flight, so embedding overlaps parsing.
+        
+        Each batch is committed as a checkpoint together with
+        ``Document.chunks_committed``. If ingestion fails part way, calling
+        this again with the same text resumes after the last committed chunk
+        instead of re-embedding the whole document.
+        
         Args:
             document_id: ID of the document
-            text: Full text content
+            text: Full text content, or an iterable of text pieces
+            on_progress: Called with ``(chunks_embedded, chunks_seen)``
         
         Returns:
             Number of chunks created
@@ -64,69 +493,265 @@ class EmbeddingService:
         document = self.db.query(Document).filter(Document.id == document_id).first()
         if not document:
             raise ValueError(f"Document {document_id} not found")
+        user_id = document.user_id
         
-        # Split into chunks
-        chunks = split_into_chunks(text, chunk_size=512, overlap=50)
-        
-        # Create Chunk records with embeddings
-        chunk_records = []
-        for idx, chunk_text in enumerate(chunks):
-            # Generate embedding
-            embedding = self.generate_embedding(chunk_text)
-            
-            # Create chunk record
-            chunk_record = Chunk(
-                document_id=document_id,
-                chunk_index=idx,
-                content=chunk_text,
-                token_count=estimate_tokens(chunk_text),
-                embedding=embedding,
-                embedding_model=self.settings.gemini_embedding_model,
+        # Committed rows are the source of truth for where to resume
+        resume_from = (
+            self.db.query(func.coalesce(func.max(Chunk.chunk_index) + 1, 0))
+            .filter(Chunk.document_id == document_id)
+            .scalar()
+        )
+        document.ingest_status = "processing"
+        document.chunks_committed = resume_from
+        self.db.commit()
+        
+        # Chunking is deterministic, so already committed chunks are skipped
+        chunk_stream = islice(self.chunk_text(text), resume_from, None)
+        
+        batch_size = max(1, self.settings.embedding_batch_size)
+        max_in_flight = max(1, self.settings.embedding_max_concurrency)
+        executor = ThreadPoolExecutor(max_workers=max_in_flight) if max_in_flight > 1 else None
+        
+        pending = deque()
+        chunks_seen = resume_from
+        chunks_stored = resume_from
+        
+        def store_oldest() -> None:
+            nonlocal chunks_stored
+            batch_ids, batch_vectors = self._store_chunk_batch(
+                pending.popleft(), document_id, user_id, chunks_stored
             )
-            chunk_records.append(chunk_record)
-            self.db.add(chunk_record)
+            chunks_stored += len(batch_ids)
+            # Checkpoint: the batch and the progress marker commit together
+            document.chunks_committed = chunks_stored
+            bump_corpus_version(self.db, user_id)
+            self.db.commit()
+            if self.settings.vector_backend == "numpy":
+                get_vector_store().add(user_id, document_id, batch_ids, batch_vectors)
+            if on_progress:
+                on_progress(chunks_stored, chunks_seen)
         
-        # Update document chunk count
-        document.total_chunks = len(chunks)
+        try:
+            for batch in _batched(chunk_stream, batch_size):
+                chunks_seen += len(batch)
+                pending.append(self._submit_chunk_batch(batch, executor))
+                if len(pending) >= max_in_flight:
+                    store_oldest()
+            while pending:
+                store_oldest()
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
         
-        # Commit all changes
+        # Update document chunk count and mark it complete
+        document.total_chunks = chunks_stored
+        document.ingest_status = "completed"
         self.db.commit()
         
-        return len(chunks)
+        if on_progress:
+            on_progress(chunks_stored, chunks_stored)
+        
+        return chunks_stored
+
+    def _submit_chunk_batch(self, batch: List[str], executor: Optional[ThreadPoolExecutor]) -> tuple:
+        """Resolve a batch against the cache and start embedding the misses."""
+        if self.settings.embedding_cache_enabled:
+            keys = [text_hash(t) for t in batch]
+            embeddings = self.cache.get_many(self.settings.gemini_embedding_model, keys)
+        else:
+            keys = list(range(len(batch)))
+            embeddings = {}
+        
+        missing = {}
+        for key, chunk_text in zip(keys, batch):
+            if key not in embeddings and key not in missing:
+                missing[key] = chunk_text
+        
+        if executor is not None and missing:
+            future = executor.submit(self.generate_embeddings, list(missing.values()))
+        else:
+            future = Future()
+            future.set_result(self.generate_embeddings(list(missing.values())))
+        return batch, keys, embeddings, list(missing.keys()), future
+
+    def _store_chunk_batch(
+        self, submitted: tuple, document_id: int, user_id: int, start_index: int
+    ) -> Tuple[List[int], List[List[float]]]:
+        """Wait for a batch's embeddings, cache them and write its chunk rows."""
+        batch, keys, embeddings, missing_keys, future = submitted
+        fresh = dict(zip(missing_keys, future.result()))
+        if fresh and self.settings.embedding_cache_enabled:
+            self.cache.put_many(self.settings.gemini_embedding_model, fresh)
+        embeddings.update(fresh)
+        
+        batch_vectors = [embeddings[key] for key in keys]
+        rows = [
+            ChunkRow(
+                document_id=document_id,
+                user_id=user_id,
+                chunk_index=start_index + offset,
+                content=chunk_text,
+                token_count=self.estimate_tokens(chunk_text),
+                embedding=embedding,
+                embedding_model=self.settings.gemini_embedding_model,
+            )
+            for offset, (chunk_text, embedding) in enumerate(zip(batch, batch_vectors))
+        ]
+        # Rows go straight to the table, so they don't accumulate in the session
+        return ChunkWriter(self.db).write(rows), batch_vectors
 
-    def search_similar_chunks(
+    def update_document(
         self,
-        query_text: str,
-        document_ids: Optional[List[int]] = None,
-        top_k: int = 5,
-        similarity_threshold: float = 0.5,
-    ) -> List[Chunk]:
+        document_id: int,
+        text: Union[str, Iterable[str]],
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> Dict[str, int]:
         """
-        Search for chunks similar to query using vector similarity.
+        Re-index a new version of a document, re-embedding only what changed.
+        
+        The new text is chunked and each chunk is matched to an existing
+        chunk of the document by content hash. Matched rows are kept (and
+        renumbered), so their embeddings are reused; only unmatched chunks
+        are embedded. Removal, renumbering and insertion are committed in one
+        transaction.
         
         Args:
-            query_text: Query text
-            document_ids: Filter by document IDs
-            top_k: Number of top results to return
-            similarity_threshold: Minimum similarity score (0-1)
+            document_id: ID of the document to update
+            text: New full text content, or an iterable of text pieces
+            on_progress: Called with ``(chunks_done, chunks_total)``
         
         Returns:
-            List of similar chunks
+            Counts of ``chunks_total``, ``chunks_reused``, ``chunks_embedded``
+            and ``chunks_removed``
         """
-        # Generate query embedding
-        query_embedding = self.generate_embedding(query_text)
+        document = self.db.query(Document).filter(Document.id == document_id).first()
+        if not document:
+            raise ValueError(f"Document {document_id} not found")
+        user_id = document.user_id
         
-        # Search in database using vector similarity
-        # Note: PostgreSQL pgvector allows using <-> operator for L2 distance
-        query = self.db.query(Chunk).order_by(
-            Chunk.embedding.op('<->')(query_embedding)
+        new_chunks = list(self.chunk_text(text))
+        
+        # Old chunk IDs by content hash; duplicates are matched in order
+        old_by_hash: Dict[str, deque] = {}
+        old_rows = (
+            self.db.query(Chunk.id, Chunk.chunk_index, Chunk.content)
+            .filter(Chunk.document_id == document_id)
+            .order_by(Chunk.chunk_index)
+            .all()
         )
+        for row in old_rows:
+            old_by_hash.setdefault(text_hash(row.content), deque()).append(row)
+        
+        kept = []  # (old row, new chunk_index, new content)
+        added = []  # (new chunk_index, content)
+        for index, chunk_text in enumerate(new_chunks):
+            matches = old_by_hash.get(text_hash(chunk_text))
+            if matches:
+                kept.append((matches.popleft(), index, chunk_text))
+            else:
+                added.append((index, chunk_text))
         
-        # Filter by documents if specified
-        if document_ids:
-            query = query.filter(Chunk.document_id.in_(document_ids))
+        kept_ids = {row.id for row, _, _ in kept}
+        removed_ids = [row.id for row in old_rows if row.id not in kept_ids]
         
-        # Get top k results
-        chunks = query.limit(top_k).all()
+        def report(done: int, _total: int) -> None:
+            if on_progress:
+                on_progress(len(kept) + done, len(new_chunks))
         
-        return chunks
+        report(0, len(added))
+        added_embeddings = self.embed_texts([chunk_text for _, chunk_text in added], report) if added else []
+        
+        # Apply the diff in one transaction
+        if removed_ids:
+            self.db.query(Chunk).filter(Chunk.id.in_(removed_ids)).delete(synchronize_session=False)
+        renumbered = [
+            {"chunk_id": row.id, "chunk_index": index}
+            for row, index, _ in kept
+            if row.chunk_index != index
+        ]
+        if renumbered:
+            self.db.execute(
+                update(Chunk.__table__)
+                .where(Chunk.__table__.c.id == bindparam("chunk_id"))
+                .values(chunk_index=bindparam("chunk_index")),
+                renumbered,
+            )
+        # Whitespace-only edits hash the same; keep the stored text current
+        rewritten = [
+            {"chunk_id": row.id, "content": content, "token_count": self.estimate_tokens(content)}
+            for row, _, content in kept
+            if row.content != content
+        ]
+        if rewritten:
+            self.db.execute(
+                update(Chunk.__table__)
+                .where(Chunk.__table__.c.id == bindparam("chunk_id"))
+                .values(content=bindparam("content"), token_count=bindparam("token_count")),
+                rewritten,
+            )
+        ChunkWriter(self.db).write(
+            [
+                ChunkRow(
+                    document_id=document_id,
+                    user_id=user_id,
+                    chunk_index=index,
+                    content=chunk_text,
+                    token_count=self.estimate_tokens(chunk_text),
+                    embedding=embedding,
+                    embedding_model=self.settings.gemini_embedding_model,
+                )
+                for (index, chunk_text), embedding in zip(added, added_embeddings)
+            ]
+        )
+        document.total_chunks = len(new_chunks)
+        document.chunks_committed = len(new_chunks)
+        document.ingest_status = "completed"
+        document.updated_at = datetime.utcnow()
+        bump_corpus_version(self.db, user_id)
+        self.db.commit()
+        
+        if self.settings.vector_backend == "numpy":
+            self._resync_document_vectors(user_id, document_id)
+        
+        if on_progress:
+            on_progress(len(new_chunks), len(new_chunks))
+        
+        return {
+            "chunks_total": len(new_chunks),
+            "chunks_reused": len(kept),
+            "chunks_embedded": len(added),
+            "chunks_removed": len(removed_ids),
+        }
+
+    def _resync_document_vectors(self, user_id: int, document_id: int) -> None:
+        """Replace a document's rows in the NumPy vector store with its current chunks."""
+        rows = (
+            self.db.query(Chunk.id, Chunk.embedding)
+            .filter(Chunk.document_id == document_id, Chunk.embedding.isnot(None))
+            .order_by(Chunk.id)
+            .all()
+        )
+        store = get_vector_store()
+        store.remove_document(user_id, document_id)
+        store.add(user_id, document_id, [row.id for row in rows], [row.embedding for row in rows])
+
+    def sync_vector_store(self, user_id: int) -> int:
+        """
+        Rebuild a user's NumPy vector matrix from the chunks in Postgres.
+        
+        Returns:
+            Number of chunk embeddings written
+        """
+        rows = (
+            self.db.query(Chunk.id, Chunk.document_id, Chunk.embedding)
+            .filter(Chunk.user_id == user_id, Chunk.embedding.isnot(None))
+            .order_by(Chunk.id)
+            .all()
+        )
+        get_vector_store().replace_user(
+            user_id,
+            chunk_ids=[row.id for row in rows],
+            document_ids=[row.document_id for row in rows],
+            embeddings=[row.embedding for row in rows],
+        )
+        return len(rows)
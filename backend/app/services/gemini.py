@@ -0,0 +1,67 @@
+"""Lazily imported, process-wide Google Gemini clients."""
+import threading
+from functools import lru_cache
+from typing import Tuple, Type
+
+from app.core.config import get_settings
+
+_genai = None
+_genai_lock = threading.Lock()
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def get_genai():
+    """
+    Import and configure ``google.generativeai`` on first use.
+
+    The SDK (with grpc and protobuf) is one of the slowest imports in the
+    API process, so it is only loaded once an embedding or LLM call needs it.
+    """
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                try:
+                    import google.generativeai as genai
+                except ImportError:
+                    raise ImportError("google-generativeai is required. Install with: pip install google-generativeai")
+
+                genai.configure(api_key=get_settings().gemini_api_key)
+                _genai = genai
+    return _genai
+
+
+def get_llm():
+    """
+    Get the process-wide ``GenerativeModel`` for ``gemini_llm_model``.
+
+    The model object holds the SDK's gRPC clients, so sharing it keeps
+    their connections open across requests instead of reconnecting for
+    every answer. Concurrent calls on it are safe.
+    """
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                _llm = get_genai().GenerativeModel(get_settings().gemini_llm_model)
+    return _llm
+
+
+@lru_cache()
+def transient_errors() -> Tuple[Type[BaseException], ...]:
+    """Exceptions from Gemini calls worth retrying: rate limits, timeouts and 5xx."""
+    try:
+        from google.api_core import exceptions as google_exceptions
+    except ImportError:
+        return (ConnectionError, TimeoutError)
+
+    return (
+        google_exceptions.TooManyRequests,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.InternalServerError,
+        ConnectionError,
+        TimeoutError,
+    )
@@ -0,0 +1,456 @@
+"""Postgres-backed document ingestion queue and worker pool."""
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, or_
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.models import IngestionJob
+from app.services.base import BaseService
+from app.services.document_service import DocumentService
+from app.services.embedding_service import EmbeddingService
+from app.services.parse_pool import get_parse_pool
+from app.services.vector_index import VectorIndexService
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+JOB_OPERATIONS = ("ingest", "update")
+SPOOL_BLOCK_SIZE = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 hex digest of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(SPOOL_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the ingestion queue has reached its configured depth."""
+
+
+class IngestionQueue(BaseService):
+    """Service for enqueueing, claiming and tracking ingestion jobs."""
+
+    def __init__(self, db):
+        """Initialize queue service."""
+        super().__init__(db)
+        self.settings = get_settings()
+
+    def _spool_path(self, filename: str) -> Path:
+        """A fresh spool file path keeping ``filename``'s extension."""
+        spool_dir = Path(self.settings.ingest_spool_dir)
+        spool_dir.mkdir(parents=True, exist_ok=True)
+        return spool_dir / f"{uuid.uuid4().hex}{Path(filename).suffix.lower()}"
+
+    async def spool_upload(self, upload) -> Tuple[str, int, str]:
+        """
+        Stream an uploaded file to the spool directory block by block.
+
+        Returns:
+            Tuple of (spool path, file size in bytes, SHA-256 hex digest)
+        """
+        path = self._spool_path(upload.filename)
+
+        size = 0
+        digest = hashlib.sha256()
+        try:
+            with open(path, "wb") as f:
+                while True:
+                    block = await upload.read(SPOOL_BLOCK_SIZE)
+                    if not block:
+                        break
+                    f.write(block)
+                    digest.update(block)
+                    size += len(block)
+        except Exception:
+            path.unlink(missing_ok=True)
+            raise
+        return str(path), size, digest.hexdigest()
+
+    def spool_bytes(self, filename: str, content: bytes) -> Tuple[str, int, str]:
+        """
+        Write an in-memory file (e.g. a zip member) to the spool directory.
+
+        Returns:
+            Tuple of (spool path, file size in bytes, SHA-256 hex digest)
+        """
+        path = self._spool_path(filename)
+        try:
+            path.write_bytes(content)
+        except Exception:
+            path.unlink(missing_ok=True)
+            raise
+        return str(path), len(content), hashlib.sha256(content).hexdigest()
+
+    def depth(self) -> int:
+        """Number of jobs waiting or in progress."""
+        return (
+            self.db.query(func.count(IngestionJob.id))
+            .filter(IngestionJob.status.in_(ACTIVE_STATUSES))
+            .scalar()
+        )
+
+    def ensure_capacity(self, count: int = 1) -> None:
+        """Raise QueueFullError if ``count`` more jobs would exceed the queue depth."""
+        if self.depth() + count > self.settings.ingest_queue_max_depth:
+            raise QueueFullError("Ingestion queue is full, try again later")
+
+    def enqueue(
+        self,
+        user_id: int,
+        document_id: int,
+        filename: str,
+        spool_path: str,
+        operation: str = "ingest",
+    ) -> IngestionJob:
+        """Create a queued job for a spooled upload.
+
+        ``operation`` is ``"ingest"`` for a new document or ``"update"`` to
+        re-index a new version of an existing one.
+        """
+        if operation not in JOB_OPERATIONS:
+            raise ValueError(f"Unsupported ingestion operation: {operation}")
+        job = IngestionJob(
+            user_id=user_id,
+            document_id=document_id,
+            filename=filename,
+            spool_path=spool_path,
+            operation=operation,
+            status="queued",
+        )
+        self.db.add(job)
+        return self.commit_and_refresh(job)
+
+    def get_job(self, job_id: int) -> Optional[IngestionJob]:
+        """Get job by ID."""
+        return self.db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+
+    def claim_next(self) -> Optional[int]:
+        """
+        Atomically claim the oldest queued job that is not backing off.
+
+        ``FOR UPDATE SKIP LOCKED`` lets any number of workers, in any number
+        of processes, poll the same table without handing out a job twice.
+        """
+        job = (
+            self.db.query(IngestionJob)
+            .filter(
+                IngestionJob.status == "queued",
+                or_(IngestionJob.available_at.is_(None), IngestionJob.available_at <= datetime.utcnow()),
+            )
+            .order_by(IngestionJob.id)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if job is None:
+            self.db.rollback()
+            return None
+
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        job.heartbeat_at = job.started_at
+        job.attempts = (job.attempts or 0) + 1
+        self.db.commit()
+        return job.id
+
+    def heartbeat(self, job_id: int) -> None:
+        """Record that a running job's worker is still alive."""
+        self.db.query(IngestionJob).filter(
+            IngestionJob.id == job_id, IngestionJob.status == "running"
+        ).update({IngestionJob.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+        self.db.commit()
+
+    def requeue_stale(self) -> int:
+        """
+        Put running jobs whose worker stopped sending heartbeats (e.g. after a
+        crash) back in the queue.
+
+        A job is only considered stale once its heartbeat is older than
+        ``ingest_job_stale_seconds``, so a slow but live job is never handed
+        to a second worker. Every claim counts as an attempt; a job that has
+        used up ``ingest_max_attempts`` is failed instead of requeued.
+
+        Returns:
+            Number of jobs requeued
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.settings.ingest_job_stale_seconds)
+        stale = (
+            self.db.query(IngestionJob)
+            .filter(
+                IngestionJob.status == "running",
+                func.coalesce(IngestionJob.heartbeat_at, IngestionJob.updated_at) < cutoff,
+            )
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+        requeued = 0
+        exhausted: List[IngestionJob] = []
+        for job in stale:
+            if (job.attempts or 0) >= self.settings.ingest_max_attempts:
+                job.status = "failed"
+                job.error = "Worker stopped responding"
+                job.finished_at = datetime.utcnow()
+                exhausted.append(job)
+            else:
+                job.status = "queued"
+                requeued += 1
+        self.db.commit()
+
+        for job in exhausted:
+            logger.error(f"Ingestion job {job.id} failed: worker stopped responding after {job.attempts} attempt(s)")
+            _discard_failed_job(self.db, job.operation, job.document_id, job.spool_path)
+        if requeued:
+            logger.warning(f"Requeued {requeued} stale ingestion job(s)")
+        return requeued
+
+    def retry_later(self, job_id: int, error: str) -> bool:
+        """
+        Requeue a failed job with exponential backoff.
+
+        Returns:
+            False if the job has used up ``ingest_max_attempts``
+        """
+        job = self.get_job(job_id)
+        if job is None or (job.attempts or 0) >= self.settings.ingest_max_attempts:
+            return False
+
+        delay = self.settings.ingest_retry_base_delay_seconds * 2 ** max(0, (job.attempts or 1) - 1)
+        job.status = "queued"
+        job.error = error
+        job.available_at = datetime.utcnow() + timedelta(seconds=delay)
+        self.db.commit()
+        logger.warning(f"Ingestion job {job_id} failed (attempt {job.attempts}); retrying in {delay:.0f}s")
+        return True
+
+    def update_progress(self, job_id: int, chunks_embedded: int, chunks_total: int) -> None:
+        """Record embedding progress for a job."""
+        self.db.query(IngestionJob).filter(IngestionJob.id == job_id).update(
+            {
+                IngestionJob.chunks_embedded: chunks_embedded,
+                IngestionJob.chunks_total: chunks_total,
+                IngestionJob.updated_at: datetime.utcnow(),
+            },
+            synchronize_session=False,
+        )
+        self.db.commit()
+
+    def finish(self, job_id: int, status: str, error: Optional[str] = None) -> None:
+        """Mark a job completed or failed."""
+        self.db.query(IngestionJob).filter(IngestionJob.id == job_id).update(
+            {
+                IngestionJob.status: status,
+                IngestionJob.error: error,
+                IngestionJob.finished_at: datetime.utcnow(),
+            },
+            synchronize_session=False,
+        )
+        self.db.commit()
+
+
+def _discard_failed_job(db, operation: str, document_id: Optional[int], spool_path: str) -> None:
+    """
+    Clean up after a job that is out of attempts.
+
+    Embeddings already paid for stay in the embedding cache, so re-uploading
+    doesn't pay for them again. A failed update leaves the previous version
+    in place.
+    """
+    if document_id is not None and operation == "ingest":
+        DocumentService(db).delete_document(document_id)
+    if os.path.exists(spool_path):
+        os.remove(spool_path)
+
+
+def _send_heartbeats(job_id: int, stop: threading.Event, interval: float) -> None:
+    """Touch a running job's heartbeat until ``stop`` is set."""
+    while not stop.wait(interval):
+        db = SessionLocal()
+        try:
+            IngestionQueue(db).heartbeat(job_id)
+        except Exception as e:
+            logger.warning(f"Failed to record heartbeat for ingestion job {job_id}: {str(e)}")
+        finally:
+            db.close()
+
+
+def process_job(job_id: int) -> None:
+    """Parse and embed one claimed job's document, recording progress and outcome."""
+    stop_heartbeat = threading.Event()
+    heartbeat = threading.Thread(
+        target=_send_heartbeats,
+        args=(job_id, stop_heartbeat, get_settings().ingest_heartbeat_interval_seconds),
+        name=f"ingest-heartbeat-{job_id}",
+        daemon=True,
+    )
+    heartbeat.start()
+
+    db = SessionLocal()
+    progress_db = SessionLocal()
+    try:
+        _process_job(db, progress_db, job_id)
+    finally:
+        stop_heartbeat.set()
+        heartbeat.join()
+        progress_db.close()
+        db.close()
+
+
+def _process_job(db, progress_db, job_id: int) -> None:
+    queue = IngestionQueue(db)
+    job = queue.get_job(job_id)
+    if job is None:
+        return
+
+    document_id, user_id, spool_path = job.document_id, job.user_id, job.spool_path
+    operation = job.operation
+    # The spool file is kept while the job may still be retried
+    keep_spool = False
+    try:
+        if document_id is None:
+            raise ValueError("Document was deleted before ingestion")
+
+        if operation == "ingest":
+            document = DocumentService(db).get_document(document_id)
+            if document is None:
+                raise ValueError("Document was deleted before ingestion")
+            # A previous attempt may have finished before the process died
+            if document.ingest_status == "completed":
+                queue.finish(job_id, "completed")
+                return
+            # A fresh document whose file was already processed: clone it
+            if not document.chunks_committed and _clone_duplicate(db, queue, job_id, document_id):
+                return
+
+        # Pages are parsed in worker processes as embed_document consumes them
+        text_stream = get_parse_pool().iter_text(job.filename, spool_path)
+
+        def on_progress(done: int, total: int) -> None:
+            IngestionQueue(progress_db).update_progress(job_id, done, total)
+
+        if operation == "update":
+            # Committed together with the re-indexed chunks
+            document = DocumentService(db).get_document(document_id)
+            document.filename = job.filename
+            document.file_size = os.path.getsize(spool_path)
+            document.content_hash = file_sha256(spool_path)
+            counts = EmbeddingService(db).update_document(
+                document_id, text_stream, on_progress=on_progress
+            )
+            queue.finish(job_id, "completed")
+            logger.info(f"Updated document {document_id} (job {job_id}): {counts}")
+        else:
+            # Resumes after the last checkpoint if an earlier attempt failed
+            chunk_count = EmbeddingService(db).embed_document(
+                document_id, text_stream, on_progress=on_progress
+            )
+            queue.finish(job_id, "completed")
+            logger.info(f"Created {chunk_count} chunks for document {document_id} (job {job_id})")
+    except Exception as e:
+        logger.error(f"Ingestion job {job_id} failed: {str(e)}")
+        db.rollback()
+        # Committed checkpoints are kept; the retry resumes from them
+        if document_id is not None and queue.retry_later(job_id, str(e)):
+            keep_spool = True
+            return
+        _discard_failed_job(db, operation, document_id, spool_path)
+        queue.finish(job_id, "failed", str(e))
+        return
+    finally:
+        if not keep_spool and os.path.exists(spool_path):
+            os.remove(spool_path)
+
+    try:
+        # Give large tenants their own partial ANN index
+        VectorIndexService(db).ensure_tenant_index(user_id)
+    except Exception as e:
+        logger.error(f"Failed to build tenant index for user {user_id}: {str(e)}")
+
+
+def _clone_duplicate(db, queue: IngestionQueue, job_id: int, document_id: int) -> bool:
+    """Short-circuit a job whose file was already processed by cloning its chunks."""
+    documents = DocumentService(db)
+    document = documents.get_document(document_id)
+    if document is None or not document.content_hash:
+        return False
+    source = documents.find_duplicate(document.user_id, document.content_hash, exclude_id=document_id)
+    if source is None:
+        return False
+
+    chunk_count = documents.clone_chunks(source, document)
+    queue.update_progress(job_id, chunk_count, chunk_count)
+    queue.finish(job_id, "completed")
+    logger.info(
+        f"Cloned {chunk_count} chunks from duplicate document {source.id} "
+        f"into document {document_id} (job {job_id})"
+    )
+    return True
+
+
+class IngestionWorkerPool:
+    """Threads that poll the ingestion queue and process jobs."""
+
+    def __init__(self, workers: int, poll_interval: float):
+        """Initialize pool; call ``start`` to launch the workers."""
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        """Start polling; idle workers also requeue jobs orphaned by a dead process."""
+        if self.workers <= 0:
+            return
+
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"ingest-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.workers} ingestion worker(s)")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Signal workers to stop after their current job and wait for them."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _claim(self, requeue: bool) -> Optional[int]:
+        db = SessionLocal()
+        try:
+            queue = IngestionQueue(db)
+            if requeue:
+                queue.requeue_stale()
+            return queue.claim_next()
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        requeue = True
+        while not self._stop.is_set():
+            try:
+                job_id = self._claim(requeue)
+            except Exception as e:
+                logger.error(f"Failed to poll ingestion queue: {str(e)}")
+                job_id = None
+
+            if job_id is None:
+                # Only look for orphaned jobs while idle
+                requeue = True
+                self._stop.wait(self.poll_interval)
+                continue
+
+            requeue = False
+            process_job(job_id)
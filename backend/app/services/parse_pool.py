@@ -0,0 +1,369 @@
+"""Process-pool document parsing, with PDFs split across workers by page range."""
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from app.core.config import get_settings
+from app.services.document_parser import (
+    extract_text_from_file,
+    get_docx_document,
+    get_pdf_reader,
+    iter_text_from_file,
+)
+
+logger = logging.getLogger(__name__)
+
+# Recycle worker processes periodically; pypdf caches grow with every file
+MAX_TASKS_PER_CHILD = 200
+# Slack on top of the in-worker timeouts before a worker is considered stuck
+TIMEOUT_GRACE_SECONDS = 5.0
+# How often a waiting caller checks whether its task has started or overrun
+POLL_INTERVAL_SECONDS = 0.5
+
+# Worker side: where tasks report ``(task id, worker pid)`` as they start
+_task_starts = None
+
+
+def _init_worker(task_starts) -> None:
+    global _task_starts
+    _task_starts = task_starts
+
+
+def _run_task(task_id: int, fn: Callable, *args):
+    """Worker: report that a task has started, then run it."""
+    if _task_starts is not None:
+        _task_starts.put((task_id, os.getpid()))
+    return fn(*args)
+
+
+class ParseTimeoutError(Exception):
+    """Raised inside a worker when a page or file exceeds its time budget."""
+
+
+def _raise_timeout(signum, frame):
+    raise ParseTimeoutError()
+
+
+class _Alarm:
+    """Interrupt the worker's main thread after ``seconds`` (no-op without SIGALRM)."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.enabled = hasattr(signal, "setitimer") and seconds > 0
+
+    def __enter__(self):
+        if self.enabled:
+            self.previous = signal.signal(signal.SIGALRM, _raise_timeout)
+            signal.setitimer(signal.ITIMER_REAL, self.seconds)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.enabled:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self.previous)
+        return False
+
+
+def _count_pdf_pages(path: str, timeout: float) -> int:
+    """Worker: open a PDF and count its pages."""
+    with _Alarm(timeout):
+        return len(get_pdf_reader()(path).pages)
+
+
+def _extract_pdf_pages(path: str, start: int, stop: int, page_timeout: float) -> Tuple[List[str], List[int]]:
+    """
+    Worker: extract the text of pages ``[start, stop)``.
+
+    A page that runs past ``page_timeout`` is replaced by an empty page
+    rather than failing the document.
+
+    Returns:
+        Tuple of (page texts, numbers of pages that timed out)
+    """
+    reader = get_pdf_reader()(path)
+    pages, timed_out = [], []
+    for number in range(start, stop):
+        try:
+            with _Alarm(page_timeout):
+                text = reader.pages[number].extract_text() or ""
+        except ParseTimeoutError:
+            timed_out.append(number)
+            text = ""
+        pages.append(text + "\n")
+    return pages, timed_out
+
+
+def _extract_docx_paragraphs(path: str, timeout: float) -> List[str]:
+    """Worker: extract a DOCX's paragraphs."""
+    with _Alarm(timeout):
+        return [paragraph.text + "\n" for paragraph in get_docx_document()(path).paragraphs]
+
+
+def _extract_text(filename: str, content: bytes, timeout: float) -> str:
+    """Worker: extract a whole file's text."""
+    with _Alarm(timeout):
+        return extract_text_from_file(filename, content)
+
+
+class _Task(NamedTuple):
+    """A submitted parse task, with what is needed to submit it again."""
+
+    executor: ProcessPoolExecutor
+    future: Future
+    task_id: int
+    fn: Callable
+    args: tuple
+
+
+class _WorkerStuck(Exception):
+    """A task ran past its backstop timeout without the worker reacting."""
+
+
+class ParsePool:
+    """
+    Parses PDF and DOCX files in worker processes.
+
+    Parsing is CPU-bound and holds the GIL, so running it on threads inside
+    the API process stalls request handling. PDFs are cut into page ranges
+    that are parsed on several workers at once and yielded back in order.
+
+    Backstop timeouts count from when a worker picks a task up, not from
+    submission, so time spent queued behind other files never counts
+    against a parse. A stuck worker is terminated on its own; tasks of
+    other files that the restart interrupts are submitted again.
+    """
+
+    def __init__(self, workers: int, pages_per_task: int, page_timeout: float, file_timeout: float, max_pages: int):
+        """Initialize pool; worker processes are started on first use."""
+        self.workers = workers
+        self.pages_per_task = max(1, pages_per_task)
+        self.page_timeout = page_timeout
+        self.file_timeout = file_timeout
+        self.max_pages = max_pages
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._task_ids = itertools.count()
+        self._task_starts = None
+        # Task id -> (worker pid, monotonic start time), or None while queued
+        self._started: Dict[int, Optional[Tuple[int, float]]] = {}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that runs worker threads is unsafe
+                context = multiprocessing.get_context("spawn")
+                if self._task_starts is None:
+                    self._task_starts = context.Queue()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=context,
+                    max_tasks_per_child=MAX_TASKS_PER_CHILD,
+                    initializer=_init_worker,
+                    initargs=(self._task_starts,),
+                )
+            return self._executor
+
+    def _reset(self, executor: ProcessPoolExecutor) -> None:
+        """Discard a broken pool so later tasks get fresh workers."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _submit(self, fn, *args) -> _Task:
+        task_id = next(self._task_ids)
+        with self._lock:
+            self._started[task_id] = None
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_run_task, task_id, fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed) while parsing an earlier file
+            self._reset(executor)
+            executor = self._get_executor()
+            future = executor.submit(_run_task, task_id, fn, *args)
+        return _Task(executor, future, task_id, fn, args)
+
+    def _forget(self, task: _Task) -> None:
+        with self._lock:
+            self._started.pop(task.task_id, None)
+
+    def _start_of(self, task: _Task) -> Optional[Tuple[int, float]]:
+        """The task's ``(worker pid, start time)`` once a worker has picked it up."""
+        with self._lock:
+            while self._task_starts is not None:
+                try:
+                    task_id, pid = self._task_starts.get_nowait()
+                except queue.Empty:
+                    break
+                # Tasks whose caller already gave up are not tracked
+                if task_id in self._started:
+                    self._started[task_id] = (pid, time.monotonic())
+            return self._started.get(task.task_id)
+
+    def _wait(self, task: _Task, timeout: float):
+        """Wait for a task, allowing it ``timeout`` seconds from when it started."""
+        while True:
+            start = self._start_of(task)
+            wait = POLL_INTERVAL_SECONDS
+            if start is not None:
+                remaining = start[1] + timeout - time.monotonic()
+                if remaining <= 0 and not task.future.done():
+                    raise _WorkerStuck(start[0])
+                wait = max(0.0, min(wait, remaining))
+            try:
+                return task.future.result(timeout=wait)
+            except FutureTimeoutError:
+                continue
+
+    def _result(self, task: _Task, timeout: float, filename: str, kind: str):
+        """Wait for a worker result, mapping failures onto ``ValueError``."""
+        try:
+            for attempt in range(2):
+                try:
+                    return self._wait(task, timeout)
+                except (BrokenProcessPool, CancelledError) as e:
+                    # Another task's stuck worker was terminated, or a worker died:
+                    # parse again once on fresh workers
+                    self._reset(task.executor)
+                    if attempt:
+                        raise ValueError(f"Failed to extract {kind}: {str(e)}")
+                    self._forget(task)
+                    task = self._submit(task.fn, *task.args)
+        except ParseTimeoutError:
+            raise ValueError(f"Timed out parsing {filename}")
+        except _WorkerStuck as stuck:
+            (pid,) = stuck.args
+            logger.error(f"Parse worker {pid} unresponsive on {filename}; terminating it")
+            # A worker stuck in C code never sees SIGALRM, so terminate it outright
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+            self._reset(task.executor)
+            raise ValueError(f"Timed out parsing {filename}")
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Failed to extract {kind}: {str(e)}")
+        finally:
+            self._forget(task)
+
+    def iter_text(self, filename: str, path: str) -> Iterator[str]:
+        """
+        Yield a file's text incrementally, parsing in worker processes.
+
+        Yields the same pieces as ``iter_text_from_file``. TXT files are only
+        decoded, so they are read in the calling thread.
+        """
+        filename_lower = filename.lower()
+        if self.workers <= 0 or filename_lower.endswith(".txt"):
+            return iter_text_from_file(filename, path)
+        if filename_lower.endswith(".pdf"):
+            return self._iter_pdf(filename, path)
+        if filename_lower.endswith(".docx"):
+            return self._iter_docx(filename, path)
+        raise ValueError(f"Unsupported file format: {filename}")
+
+    def extract_text(self, filename: str, content: bytes) -> str:
+        """Extract a whole file's text from memory in a worker process."""
+        if self.workers <= 0 or filename.lower().endswith(".txt"):
+            return extract_text_from_file(filename, content)
+        return self._result(
+            self._submit(_extract_text, filename, content, self.file_timeout),
+            self.file_timeout + TIMEOUT_GRACE_SECONDS,
+            filename,
+            Path(filename).suffix.lstrip(".").upper(),
+        )
+
+    def _iter_pdf(self, filename: str, path: str) -> Iterator[str]:
+        page_count = self._result(
+            self._submit(_count_pdf_pages, path, self.file_timeout),
+            self.file_timeout + TIMEOUT_GRACE_SECONDS,
+            filename,
+            "PDF",
+        )
+        if page_count > self.max_pages:
+            raise ValueError(f"PDF has {page_count} pages, more than the limit of {self.max_pages}")
+
+        ranges = deque(
+            (start, min(start + self.pages_per_task, page_count))
+            for start in range(0, page_count, self.pages_per_task)
+        )
+        # Bound in-flight work so parsed pages don't pile up ahead of the consumer
+        in_flight = deque()
+        try:
+            while ranges or in_flight:
+                while ranges and len(in_flight) < self.workers * 2:
+                    start, stop = ranges.popleft()
+                    submitted = self._submit(_extract_pdf_pages, path, start, stop, self.page_timeout)
+                    in_flight.append((stop - start, submitted))
+
+                page_span, submitted = in_flight.popleft()
+                # Per-page timeouts are enforced in the worker; this is the backstop
+                pages, timed_out = self._result(
+                    submitted,
+                    self.page_timeout * page_span + TIMEOUT_GRACE_SECONDS,
+                    filename,
+                    "PDF",
+                )
+                if timed_out:
+                    logger.warning(f"Skipped pages {timed_out} of {filename}: exceeded {self.page_timeout}s")
+                yield from pages
+        finally:
+            for _, task in in_flight:
+                task.future.cancel()
+                self._forget(task)
+
+    def _iter_docx(self, filename: str, path: str) -> Iterator[str]:
+        yield from self._result(
+            self._submit(_extract_docx_paragraphs, path, self.file_timeout),
+            self.file_timeout + TIMEOUT_GRACE_SECONDS,
+            filename,
+            "DOCX",
+        )
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+_pool: Optional[ParsePool] = None
+_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> ParsePool:
+    """Get the process-wide parse pool."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                settings = get_settings()
+                _pool = ParsePool(
+                    workers=settings.parse_workers,
+                    pages_per_task=settings.parse_pages_per_task,
+                    page_timeout=settings.parse_page_timeout_seconds,
+                    file_timeout=settings.parse_file_timeout_seconds,
+                    max_pages=settings.parse_max_pages,
+                )
+    return _pool
+
+
+def shutdown_parse_pool() -> None:
+    """Stop the parse pool's worker processes, if they were started."""
+    if _pool is not None:
+        _pool.shutdown()
@@ -1,17 +1,44 @@
 """Text processing utilities for document embedding."""
 import re
-from typing import List
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s\.\,\!\?\-]')
 
 
 def clean_text(text: str) -> str:
     """Clean and normalize text."""
     # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text)
+    text = _WHITESPACE_RE.sub(' ', text)
     # Remove special characters but keep basic punctuation
-    text = re.sub(r'[^\w\s\.\,\!\?\-]', '', text)
+    text = _SPECIAL_CHARS_RE.sub('', text)
     return text.strip()
 
 
+def iter_clean_text(pieces: Iterable[str]) -> Iterator[str]:
+    """
+    Clean a stream of text pieces, yielding the same text ``clean_text``
+    would produce for their concatenation (minus trailing whitespace,
+    which the consumer strips once the stream ends).
+    """
+    previous_ended_in_space = False
+    started = False
+    for piece in pieces:
+        if not piece:
+            continue
+        collapsed = _WHITESPACE_RE.sub(' ', piece)
+        # Whitespace runs spanning two pieces collapse to a single space
+        if previous_ended_in_space and collapsed.startswith(' '):
+            collapsed = collapsed[1:]
+        previous_ended_in_space = piece[-1].isspace()
+        cleaned = _SPECIAL_CHARS_RE.sub('', collapsed)
+        if not started:
+            cleaned = cleaned.lstrip()
+            started = bool(cleaned)
+        if cleaned:
+            yield cleaned
+
+
 def split_into_sentences(text: str) -> List[str]:
     """Split text into sentences."""
     # Simple sentence splitting on periods, question marks, exclamation marks
@@ -25,7 +52,10 @@ def split_into_chunks(
     overlap: int = 50,
 ) -> List[str]:
     """
-    Split text into overlapping chunks.
+    Split text into overlapping fixed-size character windows.
+    
+    Ingestion uses the sentence-aligned ``iter_token_chunks``; this is kept
+    for comparison and for callers that need character windows.
     
     Args:
         text: Input text to chunk
@@ -35,24 +65,247 @@ def split_into_chunks(
     Returns:
         List of text chunks
     """
-    text = clean_text(text)
-    chunks = []
+    return list(iter_chunks([text], chunk_size=chunk_size, overlap=overlap))
+
+
+def iter_chunks(
+    pieces: Iterable[str],
+    chunk_size: int = 512,
+    overlap: int = 50,
+) -> Iterator[str]:
+    """
+    Lazily split a stream of text pieces into overlapping chunks.
+    
+    Produces exactly the chunks ``split_into_chunks`` would for the joined
+    text, but only buffers about one chunk plus one piece at a time, so
+    chunks are available before the whole document has been read.
     
-    for i in range(0, len(text), chunk_size - overlap):
-        chunk = text[i : i + chunk_size]
+    Args:
+        pieces: Text pieces, e.g. pages or paragraphs from a parser
+        chunk_size: Target size of each chunk in characters
+        overlap: Number of overlapping characters between chunks
+    
+    Yields:
+        Text chunks
+    """
+    step = chunk_size - overlap
+    buffer = ""
+    offset = 0  # Absolute position of buffer[0] in the cleaned text
+    start = 0  # Absolute position of the next chunk
+    
+    for cleaned in iter_clean_text(pieces):
+        buffer += cleaned
+        # Trailing whitespace may still be stripped, so only text up to the
+        # last non-space character is known to be final
+        known_end = offset + len(buffer.rstrip())
+        while start + chunk_size < known_end:
+            chunk = buffer[start - offset : start - offset + chunk_size]
+            if chunk.strip():
+                yield chunk
+            start += step
+        buffer = buffer[start - offset :]
+        offset = start
+    
+    buffer = buffer.rstrip()
+    end = offset + len(buffer)
+    while start < end:
+        chunk = buffer[start - offset : start - offset + chunk_size]
         if chunk.strip():
-            chunks.append(chunk)
-        
-        if i + chunk_size >= len(text):
+            yield chunk
+        if start + chunk_size >= end:
             break
+        start += step
+
+
+# Token estimators map text to an approximate Gemini token count
+TokenEstimator = Callable[[str], int]
+
+# Punctuation marks that are tokens of their own, as a deletion table
+_DROP_PUNCTUATION = str.maketrans('', '', ".,!?-;:")
+# Characters per sub-word piece for long words
+_WORD_PIECE_CHARS = 6
+
+
+def estimate_tokens_by_chars(text: str) -> int:
+    """Approximation: ~4 characters = 1 token."""
+    return len(text) // 4
+
+
+def estimate_tokens_by_words(text: str) -> int:
+    """
+    Approximation closer to subword tokenizers: one token per punctuation
+    mark and short word, plus one per extra ~6 characters of longer words.
     
-    return chunks
+    Built from ``str.split``/``str.translate`` so it stays cheap enough to
+    run on every sentence during chunking.
+    """
+    words = text.split()
+    punctuation = len(text) - len(text.translate(_DROP_PUNCTUATION))
+    long_word_pieces = sum([(len(w) - 1) // _WORD_PIECE_CHARS for w in words if len(w) > _WORD_PIECE_CHARS + 1])
+    return len(words) + punctuation + long_word_pieces
+
+
+TOKEN_ESTIMATORS = {
+    "chars": estimate_tokens_by_chars,
+    "words": estimate_tokens_by_words,
+}
+
+
+def get_token_estimator(name: str = "words") -> TokenEstimator:
+    """Look up a token estimator by name."""
+    if name not in TOKEN_ESTIMATORS:
+        raise ValueError(f"Unsupported token estimator: {name}")
+    return TOKEN_ESTIMATORS[name]
 
 
 def estimate_tokens(text: str) -> int:
     """
     Rough estimate of token count for Gemini models.
     
-    Approximation: ~4 characters = 1 token
+    Uses the word-based estimator; see ``TOKEN_ESTIMATORS``.
     """
-    return len(text) // 4
+    return estimate_tokens_by_words(text)
+
+
+# Sentence ends (. ! ? then whitespace) and paragraph breaks (blank lines),
+# captured so ``split`` returns alternating sentences and separators
+_BOUNDARY_RE = re.compile(r'([.!?]\s+|\n[^\S\n]*\n\s*)')
+
+
+def iter_sentences(pieces: Iterable[str], max_chars: int = 2000) -> Iterator[Tuple[str, bool]]:
+    """
+    Split a stream of raw text pieces into cleaned sentences.
+    
+    Each character is scanned once: only text after the last boundary is
+    carried into the next piece, and a run longer than ``max_chars`` with no
+    boundary is cut at a space so the carry stays bounded.
+    
+    Yields:
+        ``(sentence, ends_paragraph)`` pairs
+    """
+    carry = ""
+    for piece in pieces:
+        if not piece:
+            continue
+        # Special characters never affect boundaries, so strip the whole piece at once
+        parts = _BOUNDARY_RE.split(carry + _SPECIAL_CHARS_RE.sub('', piece))
+        # Whitespace at the end may continue into the next piece
+        tail = 3 if len(parts) > 1 and not parts[-1] else 1
+        for i in range(0, len(parts) - tail, 2):
+            separator = parts[i + 1]
+            # Sentence-ending punctuation is matched as part of the separator
+            sentence = parts[i] + separator[0] if separator[0] in ".!?" else parts[i]
+            sentence = " ".join(sentence.split())
+            if sentence:
+                yield sentence, separator.count("\n") >= 2
+        carry = "".join(parts[-tail:])
+        
+        while len(carry) > max_chars:
+            cut = carry.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            sentence = " ".join(carry[:cut].split())
+            if sentence:
+                yield sentence, False
+            carry = carry[cut:]
+    
+    sentence = " ".join(carry.split())
+    if sentence:
+        yield sentence, True
+
+
+def iter_token_chunks(
+    pieces: Iterable[str],
+    max_tokens: int = 128,
+    overlap_tokens: int = 16,
+    estimator: Optional[TokenEstimator] = None,
+) -> Iterator[str]:
+    """
+    Lazily split a stream of text pieces into sentence-aligned chunks.
+    
+    Sentences are packed greedily until the next one would exceed
+    ``max_tokens``. A chunk also ends at a paragraph break once it is at
+    least half full. The next chunk starts with the trailing sentences of
+    the previous one, up to ``overlap_tokens``. Sentences longer than the
+    budget are split between words. Every sentence is tokenized once, so
+    the whole pass is linear in the input size.
+    
+    Args:
+        pieces: Text pieces, e.g. pages or paragraphs from a parser
+        max_tokens: Token budget per chunk
+        overlap_tokens: Token budget for sentences repeated between chunks
+        estimator: Token estimator; defaults to ``estimate_tokens``
+    
+    Yields:
+        Text chunks
+    """
+    estimator = estimator or estimate_tokens
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+    current: List[Tuple[str, int]] = []
+    current_tokens = 0
+    has_new = False  # Whether ``current`` holds more than carried overlap
+    
+    def emit() -> Iterator[str]:
+        nonlocal current, current_tokens, has_new
+        has_new = False
+        yield " ".join(sentence for sentence, _ in current)
+        # Carry trailing sentences as overlap into the next chunk
+        carried: List[Tuple[str, int]] = []
+        carried_tokens = 0
+        for sentence, tokens in reversed(current):
+            if carried_tokens + tokens > overlap_tokens:
+                break
+            carried.append((sentence, tokens))
+            carried_tokens += tokens
+        carried.reverse()
+        # A chunk made only of overlap would repeat forever
+        if len(carried) == len(current):
+            carried, carried_tokens = [], 0
+        current, current_tokens = carried, carried_tokens
+    
+    for sentence, ends_paragraph in iter_sentences(pieces, max_chars=max_tokens * 16):
+        tokens = estimator(sentence)
+        parts = _split_long_sentence(sentence, max_tokens, estimator) if tokens > max_tokens else [(sentence, tokens)]
+        for part, part_tokens in parts:
+            if current and current_tokens + part_tokens > max_tokens:
+                yield from emit()
+                if current and current_tokens + part_tokens > max_tokens:
+                    current, current_tokens = [], 0
+            current.append((part, part_tokens))
+            current_tokens += part_tokens
+            has_new = True
+        if ends_paragraph and current_tokens >= max_tokens // 2:
+            yield from emit()
+            # Paragraph breaks are natural boundaries; don't overlap across them
+            current, current_tokens = [], 0
+    
+    if has_new:
+        yield " ".join(sentence for sentence, _ in current)
+
+
+def _split_long_sentence(sentence: str, max_tokens: int, estimator: TokenEstimator) -> List[Tuple[str, int]]:
+    """Split an over-budget sentence into word runs that fit the budget."""
+    parts = []
+    words: List[str] = []
+    tokens = 0
+    for word in sentence.split(" "):
+        word_tokens = max(1, estimator(word))
+        if word_tokens > max_tokens:
+            # Keep the words before it in order
+            if words:
+                parts.append((" ".join(words), tokens))
+                words, tokens = [], 0
+            # A single over-budget "word" (e.g. a URL or base64 blob) is cut evenly
+            pieces = -(-word_tokens // max_tokens)
+            step = -(-len(word) // pieces)
+            for start in range(0, len(word), step):
+                part = word[start : start + step]
+                parts.append((part, estimator(part)))
+            continue
+        if words and tokens + word_tokens > max_tokens:
+            parts.append((" ".join(words), tokens))
+            words, tokens = [], 0
+        words.append(word)
+        tokens += word_tokens
+    if words:
+        parts.append((" ".join(words), tokens))
+    return parts
@@ -0,0 +1,293 @@
+"""ANN index management for ``chunks.embedding`` (pgvector HNSW / IVFFlat)."""
+import logging
+import threading
+from typing import Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.services.base import BaseService
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "ix_chunks_embedding"
+INDEX_TYPES = ("hnsw", "ivfflat")
+
+# Distance metric -> (query operator, index operator class)
+DISTANCE_METRICS = {
+    "l2": ("<->", "vector_l2_ops"),
+    "cosine": ("<=>", "vector_cosine_ops"),
+    "inner_product": ("<#>", "vector_ip_ops"),
+}
+
+
+def distance_operator() -> str:
+    """Get the pgvector operator matching the configured distance metric."""
+    metric = get_settings().vector_distance_metric
+    if metric not in DISTANCE_METRICS:
+        raise ValueError(f"Unsupported vector distance metric: {metric}")
+    return DISTANCE_METRICS[metric][0]
+
+
+def similarity_expression(distance):
+    """
+    Convert a distance expression into a similarity score (higher is closer).
+
+    Gemini embeddings are unit-normalized, so L2 distance maps onto cosine
+    similarity as ``1 - d^2 / 2``.
+    """
+    metric = get_settings().vector_distance_metric
+    if metric == "cosine":
+        return 1 - distance
+    if metric == "inner_product":
+        # pgvector's <#> returns the negative inner product
+        return -distance
+    return 1 - distance * distance / 2
+
+
+def tenant_index_name(user_id: int) -> str:
+    """Name of the per-user partial ANN index."""
+    return f"{INDEX_NAME}_user_{int(user_id)}"
+
+
+def _create_index_sql(index_name: str, index_type: str, user_id: Optional[int] = None) -> str:
+    """Build the CREATE INDEX statement for the given ANN index type.
+
+    With ``user_id`` the index is partial, covering only that tenant's rows.
+    """
+    settings = get_settings()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unsupported vector index type: {index_type}")
+    if settings.vector_distance_metric not in DISTANCE_METRICS:
+        raise ValueError(f"Unsupported vector distance metric: {settings.vector_distance_metric}")
+
+    opclass = DISTANCE_METRICS[settings.vector_distance_metric][1]
+    if index_type == "hnsw":
+        params = f"m = {int(settings.hnsw_m)}, ef_construction = {int(settings.hnsw_ef_construction)}"
+    else:
+        params = f"lists = {int(settings.ivfflat_lists)}"
+
+    where = f" WHERE user_id = {int(user_id)}" if user_id is not None else ""
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+        f"ON chunks USING {index_type} (embedding {opclass}) WITH ({params}){where}"
+    )
+
+
+def ensure_vector_index(engine) -> None:
+    """Create the configured ANN index on ``chunks.embedding`` if missing."""
+    index_type = get_settings().vector_index_type
+    if index_type == "none":
+        return
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(_create_index_sql(INDEX_NAME, index_type)))
+
+
+def ensure_vector_index_in_background(engine) -> threading.Thread:
+    """
+    Build the ANN index on a daemon thread so API startup doesn't wait for it.
+
+    Searches fall back to exact scans until the concurrent build finishes.
+    """
+
+    def build():
+        try:
+            ensure_vector_index(engine)
+            logger.info(f"Ensured vector index {INDEX_NAME}")
+        except Exception as e:
+            logger.error(f"Failed to build vector index {INDEX_NAME}: {str(e)}")
+
+    thread = threading.Thread(target=build, name="vector-index-build", daemon=True)
+    thread.start()
+    return thread
+
+
+def backfill_chunk_user_ids(engine) -> int:
+    """Copy the owning user onto chunks ingested before ``chunks.user_id`` existed."""
+    with engine.begin() as conn:
+        result = conn.execute(
+            text(
+                """
+                UPDATE chunks SET user_id = documents.user_id
+                FROM documents
+                WHERE chunks.document_id = documents.id AND chunks.user_id IS NULL
+                """
+            )
+        )
+    return result.rowcount
+
+
+def search_params_statement(
+    ef_search: Optional[int] = None, probes: Optional[int] = None
+) -> Optional[Tuple[TextClause, dict]]:
+    """
+    ``set_config`` statement and parameters for the index's recall knob.
+
+    Returns:
+        None if the configured index type has no query-time knob
+    """
+    settings = get_settings()
+    if settings.vector_index_type == "hnsw":
+        value = ef_search or settings.hnsw_ef_search
+        return text("SELECT set_config('hnsw.ef_search', :value, true)"), {"value": str(int(value))}
+    if settings.vector_index_type == "ivfflat":
+        value = probes or settings.ivfflat_probes
+        return text("SELECT set_config('ivfflat.probes', :value, true)"), {"value": str(int(value))}
+    return None
+
+
+class VectorIndexService(BaseService):
+    """Service for building and inspecting the chunk embedding ANN index."""
+
+    def __init__(self, db):
+        """Initialize vector index service."""
+        super().__init__(db)
+        self.settings = get_settings()
+
+    def rebuild_index(self, index_type: Optional[str] = None) -> None:
+        """
+        Rebuild the ANN index and any per-user partial indexes without blocking writes.
+
+        Each replacement index is built concurrently under a temporary name,
+        then swapped in for the existing one in a single transaction, so
+        searches always see one valid index.
+        """
+        index_type = index_type or self.settings.vector_index_type
+        engine = self.db.get_bind()
+
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            self._swap_build(engine, conn, INDEX_NAME, index_type)
+            for user_id in self._tenant_index_users():
+                self._swap_build(engine, conn, tenant_index_name(user_id), index_type, user_id)
+
+        logger.info(f"Rebuilt {index_type} index {INDEX_NAME}")
+
+    @staticmethod
+    def _swap_build(engine, conn, index_name: str, index_type: str, user_id: Optional[int] = None) -> None:
+        """Build ``index_name`` afresh and swap it in.
+
+        ``conn`` is an autocommit connection for the concurrent DDL; the two
+        renames run in their own transaction on ``engine``, and the old index
+        is only dropped once the new one has taken its name.
+        """
+        new_name = f"{index_name}_new"
+        old_name = f"{index_name}_old"
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {new_name}"))
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {old_name}"))
+        conn.execute(text(_create_index_sql(new_name, index_type, user_id)))
+        with engine.begin() as swap:
+            swap.execute(text(f"ALTER INDEX IF EXISTS {index_name} RENAME TO {old_name}"))
+            swap.execute(text(f"ALTER INDEX {new_name} RENAME TO {index_name}"))
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {old_name}"))
+
+    def _tenant_index_users(self) -> list:
+        """User IDs that currently have a partial ANN index."""
+        prefix = tenant_index_name(0)[:-1]
+        rows = self.db.execute(
+            text("SELECT indexname FROM pg_indexes WHERE tablename = 'chunks' AND indexname LIKE :pattern"),
+            {"pattern": f"{prefix}%"},
+        ).scalars().all()
+        return [int(name[len(prefix):]) for name in rows if name[len(prefix):].isdigit()]
+
+    def ensure_tenant_index(self, user_id: int, force: bool = False) -> bool:
+        """
+        Build a partial ANN index over one user's chunks once they are large enough.
+
+        Tenant-scoped searches filter on ``user_id = <id>``, which lets the
+        planner pick this index and walk only that tenant's rows.
+
+        Returns:
+            True if the index exists or was created
+        """
+        index_type = self.settings.vector_index_type
+        if index_type == "none":
+            return False
+
+        if not force:
+            count = self.db.execute(
+                text("SELECT count(*) FROM chunks WHERE user_id = :user_id"),
+                {"user_id": user_id},
+            ).scalar()
+            if count < self.settings.tenant_index_min_chunks:
+                return False
+
+        engine = self.db.get_bind()
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(_create_index_sql(tenant_index_name(user_id), index_type, user_id)))
+
+        logger.info(f"Ensured tenant index {tenant_index_name(user_id)}")
+        return True
+
+    def index_status(self) -> dict:
+        """Report the ANN index definition, validity, size and build progress."""
+        index_row = self.db.execute(
+            text(
+                """
+                SELECT c.relname, am.amname, i.indisvalid, i.indisready,
+                       pg_relation_size(c.oid) AS size_bytes
+                FROM pg_class c
+                JOIN pg_index i ON i.indexrelid = c.oid
+                JOIN pg_am am ON am.oid = c.relam
+                WHERE c.relname IN (:name, :new_name)
+                """
+            ),
+            {"name": INDEX_NAME, "new_name": f"{INDEX_NAME}_new"},
+        ).mappings().all()
+
+        progress_row = self.db.execute(
+            text(
+                """
+                SELECT phase, blocks_done, blocks_total, tuples_done, tuples_total
+                FROM pg_stat_progress_create_index
+                WHERE relid = 'chunks'::regclass
+                """
+            )
+        ).mappings().first()
+
+        tenant_rows = self.db.execute(
+            text(
+                """
+                SELECT c.relname, i.indisvalid, pg_relation_size(c.oid) AS size_bytes
+                FROM pg_class c
+                JOIN pg_index i ON i.indexrelid = c.oid
+                WHERE c.relname LIKE :pattern
+                """
+            ),
+            {"pattern": f"{INDEX_NAME}_user_%"},
+        ).mappings().all()
+
+        indexes = {row["relname"]: row for row in index_row}
+        current = indexes.get(INDEX_NAME)
+        return {
+            "index_name": INDEX_NAME,
+            "configured_type": self.settings.vector_index_type,
+            "distance_metric": self.settings.vector_distance_metric,
+            "exists": current is not None,
+            "index_type": current["amname"] if current else None,
+            "valid": bool(current and current["indisvalid"] and current["indisready"]),
+            "size_bytes": current["size_bytes"] if current else 0,
+            "rebuilding": f"{INDEX_NAME}_new" in indexes or progress_row is not None,
+            "build_progress": dict(progress_row) if progress_row else None,
+            "tenant_indexes": [
+                {
+                    "index_name": row["relname"],
+                    "valid": row["indisvalid"],
+                    "size_bytes": row["size_bytes"],
+                }
+                for row in tenant_rows
+            ],
+        }
+
+
+def ensure_tenant_index_task(user_id: int, force: bool = False) -> None:
+    """Background task: ensure a tenant's partial ANN index using its own session."""
+    db = SessionLocal()
+    try:
+        VectorIndexService(db).ensure_tenant_index(user_id, force=force)
+    except Exception as e:
+        logger.error(f"Failed to build tenant index for user {user_id}: {str(e)}")
+    finally:
+        db.close()
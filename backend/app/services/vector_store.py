@@ -0,0 +1,213 @@
+"""In-process NumPy vector search over memory-mapped per-user matrices."""
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+EMBEDDING_DIM = 768
+
+
+class NumpyVectorStore:
+    """Brute-force vector search over per-user embedding matrices.
+
+    Each user has two files under ``base_dir/user_<id>/``:
+
+    - ``vectors.bin``: contiguous ``(n, dim)`` matrix of float32/float16
+    - ``ids.bin``: ``(n, 2)`` int64 matrix of ``(chunk_id, document_id)``
+
+    Both are memory-mapped for search, appended to on ingest and compacted
+    when a document is deleted. A ``synced`` marker is written once the
+    matrix has been built from all of the user's chunks in Postgres; until
+    then ingest leaves the user alone, so turning the backend on for an
+    existing corpus never yields a matrix holding only the newest documents.
+    """
+
+    def __init__(self, base_dir: str, dtype: str = "float32", metric: str = "l2"):
+        """Initialize store rooted at ``base_dir``."""
+        if np is None:
+            raise ImportError("numpy is required for the numpy vector backend. Install with: pip install numpy")
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported vector dtype: {dtype}")
+
+        self.base_dir = Path(base_dir)
+        self.dtype = np.dtype(dtype)
+        self.metric = metric
+        self._locks: Dict[int, threading.RLock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, user_id: int) -> threading.RLock:
+        with self._locks_guard:
+            return self._locks.setdefault(user_id, threading.RLock())
+
+    def _paths(self, user_id: int) -> Tuple[Path, Path]:
+        user_dir = self.base_dir / f"user_{user_id}"
+        return user_dir / "vectors.bin", user_dir / "ids.bin"
+
+    def _synced_path(self, user_id: int) -> Path:
+        return self.base_dir / f"user_{user_id}" / "synced"
+
+    def has_user(self, user_id: int) -> bool:
+        """Whether the user's matrix has been fully built from Postgres."""
+        vectors_path, ids_path = self._paths(user_id)
+        return vectors_path.exists() and ids_path.exists() and self._synced_path(user_id).exists()
+
+    def _open(self, user_id: int):
+        """Memory-map the user's vectors and ids, or return empty arrays."""
+        vectors_path, ids_path = self._paths(user_id)
+        row_bytes = EMBEDDING_DIM * self.dtype.itemsize
+        n = min(
+            vectors_path.stat().st_size // row_bytes if vectors_path.exists() else 0,
+            ids_path.stat().st_size // 16 if ids_path.exists() else 0,
+        )
+        if n == 0:
+            return np.empty((0, EMBEDDING_DIM), dtype=self.dtype), np.empty((0, 2), dtype=np.int64)
+
+        vectors = np.memmap(vectors_path, dtype=self.dtype, mode="r", shape=(n, EMBEDDING_DIM))
+        ids = np.memmap(ids_path, dtype=np.int64, mode="r", shape=(n, 2))
+        return vectors, ids
+
+    def add(
+        self,
+        user_id: int,
+        document_id: int,
+        chunk_ids: Sequence[int],
+        embeddings: Sequence[Sequence[float]],
+    ) -> None:
+        """
+        Append a document's chunk embeddings to the user's matrix.
+
+        Skipped until the user's matrix has been synced: the first search
+        builds it from Postgres, including this document.
+        """
+        if not chunk_ids:
+            return
+
+        vectors = np.asarray(embeddings, dtype=self.dtype).reshape(-1, EMBEDDING_DIM)
+        ids = np.empty((len(chunk_ids), 2), dtype=np.int64)
+        ids[:, 0] = chunk_ids
+        ids[:, 1] = document_id
+
+        vectors_path, ids_path = self._paths(user_id)
+        with self._lock(user_id):
+            if not self.has_user(user_id):
+                return
+            # Trim any partially written tail so both files stay row-aligned
+            current, _ = self._open(user_id)
+            for path, row_bytes in ((vectors_path, EMBEDDING_DIM * self.dtype.itemsize), (ids_path, 16)):
+                if path.exists() and path.stat().st_size != len(current) * row_bytes:
+                    os.truncate(path, len(current) * row_bytes)
+            with open(vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(ids_path, "ab") as f:
+                f.write(ids.tobytes())
+
+    def remove_document(self, user_id: int, document_id: int) -> int:
+        """Remove a document's rows by rewriting the user's files."""
+        with self._lock(user_id):
+            vectors, ids = self._open(user_id)
+            keep = ids[:, 1] != document_id
+            removed = int(len(ids) - keep.sum())
+            if removed:
+                self._write(user_id, np.asarray(vectors[keep]), np.asarray(ids[keep]))
+            return removed
+
+    def replace_user(self, user_id: int, chunk_ids, document_ids, embeddings) -> None:
+        """Overwrite the user's matrix, e.g. when rebuilding from Postgres."""
+        ids = np.column_stack(
+            [np.asarray(chunk_ids, dtype=np.int64), np.asarray(document_ids, dtype=np.int64)]
+        ).reshape(-1, 2)
+        vectors = np.asarray(embeddings, dtype=self.dtype).reshape(-1, EMBEDDING_DIM)
+        with self._lock(user_id):
+            self._write(user_id, vectors, ids)
+            self._synced_path(user_id).touch()
+
+    def _write(self, user_id: int, vectors, ids) -> None:
+        vectors_path, ids_path = self._paths(user_id)
+        vectors_path.parent.mkdir(parents=True, exist_ok=True)
+        for path, data in ((vectors_path, vectors), (ids_path, ids)):
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(np.ascontiguousarray(data).tobytes())
+            os.replace(tmp_path, path)
+
+    def search(
+        self,
+        user_id: int,
+        query_embedding: Sequence[float],
+        top_k: int = 5,
+        document_ids: Optional[List[int]] = None,
+        similarity_threshold: Optional[float] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Find the ``top_k`` most similar chunks for a user.
+
+        Returns:
+            List of ``(chunk_id, score)`` pairs, most similar first. Scores use
+            the same similarity scale as the pgvector backend.
+        """
+        with self._lock(user_id):
+            vectors, ids = self._open(user_id)
+        if len(ids) == 0 or top_k <= 0:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        # float16 matrices are upcast so the product runs through BLAS
+        matrix = vectors if vectors.dtype == np.float32 else vectors.astype(np.float32)
+        dots = matrix @ query
+
+        if self.metric == "inner_product":
+            scores = dots
+        elif self.metric == "cosine":
+            norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+            scores = dots / np.maximum(norms, 1e-12)
+        else:
+            # 1 - ||a - b||^2 / 2, matching the pgvector similarity expression
+            sq_dist = np.einsum("ij,ij->i", matrix, matrix) + query @ query - 2 * dots
+            scores = 1 - np.maximum(sq_dist, 0) / 2
+
+        mask = np.ones(len(scores), dtype=bool)
+        if document_ids:
+            mask &= np.isin(ids[:, 1], document_ids)
+        if similarity_threshold is not None:
+            mask &= scores >= similarity_threshold
+
+        candidates = np.flatnonzero(mask)
+        if len(candidates) == 0:
+            return []
+
+        k = min(top_k, len(candidates))
+        candidate_scores = scores[candidates]
+        top = np.argpartition(-candidate_scores, k - 1)[:k]
+        top = top[np.argsort(-candidate_scores[top])]
+
+        rows = candidates[top]
+        return [(int(ids[row, 0]), float(scores[row])) for row in rows]
+
+
+_store: Optional[NumpyVectorStore] = None
+_store_lock = threading.Lock()
+
+
+def get_vector_store() -> NumpyVectorStore:
+    """Get the process-wide NumPy vector store."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                settings = get_settings()
+                _store = NumpyVectorStore(
+                    base_dir=settings.numpy_vector_dir,
+                    dtype=settings.numpy_vector_dtype,
+                    metric=settings.vector_distance_metric,
+                )
+    return _store
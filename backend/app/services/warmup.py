@@ -0,0 +1,86 @@
+"""Startup warm-up: open pooled connections and Gemini clients before the first request."""
+import asyncio
+import logging
+import time
+
+from sqlalchemy import text
+
+from app.core.config import get_settings
+from app.core.database import async_engine, engine
+from app.services.async_embedding_service import embed_content
+from app.services.gemini import get_llm
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_sync_pool(connections: int) -> None:
+    """Open ``connections`` sync connections at once so the pool keeps them."""
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            conn.close()
+
+
+async def _warm_async_pool(connections: int) -> None:
+    """Open ``connections`` async connections at once so the pool keeps them."""
+    opened = await asyncio.gather(*(async_engine.connect() for _ in range(connections)), return_exceptions=True)
+    try:
+        for conn in opened:
+            if isinstance(conn, BaseException):
+                raise conn
+            await conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            if not isinstance(conn, BaseException):
+                await conn.close()
+
+
+async def warm_db_pools(connections: int) -> None:
+    """Pre-open database connections for the sync and async pools."""
+    results = await asyncio.gather(
+        asyncio.to_thread(_warm_sync_pool, min(connections, engine.pool.size())),
+        _warm_async_pool(min(connections, async_engine.pool.size())),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+
+async def warm_gemini() -> None:
+    """
+    Load the Gemini SDK, create the shared LLM client and make one
+    embedding call, so the first query doesn't pay for the import, the
+    channel setup and the TLS handshake.
+    """
+    settings = get_settings()
+    get_llm()
+    await embed_content(settings.gemini_embedding_model, ["warm-up"])
+
+
+async def warm_up() -> None:
+    """
+    Warm database pools and Gemini clients concurrently.
+
+    Failures are logged rather than raised: a cold start is slower, not
+    broken, and the API must still come up when Gemini is unreachable.
+    """
+    settings = get_settings()
+    start = time.perf_counter()
+
+    tasks = {}
+    if settings.db_pool_warm_connections > 0:
+        tasks["database pools"] = warm_db_pools(settings.db_pool_warm_connections)
+    if settings.gemini_api_key:
+        tasks["Gemini clients"] = warm_gemini()
+
+    results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    for name, result in zip(tasks, results):
+        if isinstance(result, BaseException):
+            logger.warning(f"Warm-up of {name} failed: {str(result)}")
+    logger.info(f"Warm-up finished in {(time.perf_counter() - start) * 1000:.0f}ms")
@@ -0,0 +1,72 @@
+"""Compare chunk insert throughput: ORM objects vs multi-row INSERT vs binary COPY.
+
+Needs a reachable DATABASE_URL. Rows are written inside a transaction that is
+rolled back, so the database is left unchanged (apart from sequence values).
+
+    python -m benchmarks.bench_chunk_insert --rows 20000 --batch-size 100
+"""
+import argparse
+import random
+import time
+
+from app.core.database import SessionLocal
+from app.models import Document, User
+from app.services.chunk_writer import CHUNK_INSERT_METHODS, ChunkRow, ChunkWriter
+
+EMBEDDING_DIM = 768
+
+
+def make_rows(document_id: int, user_id: int, count: int):
+    rng = random.Random(0)
+    return [
+        ChunkRow(
+            document_id=document_id,
+            user_id=user_id,
+            chunk_index=i,
+            content=f"chunk {i} " + "lorem ipsum dolor sit amet " * 18,
+            token_count=128,
+            embedding=[rng.uniform(-1, 1) for _ in range(EMBEDDING_DIM)],
+            embedding_model="benchmark",
+        )
+        for i in range(count)
+    ]
+
+
+def run(method: str, rows_count: int, batch_size: int) -> float:
+    db = SessionLocal()
+    try:
+        user = User(email=f"bench-{time.time_ns()}@example.com", username=f"bench-{time.time_ns()}")
+        db.add(user)
+        db.flush()
+        document = Document(user_id=user.id, filename="bench.txt")
+        db.add(document)
+        db.flush()
+        rows = make_rows(document.id, user.id, rows_count)
+
+        writer = ChunkWriter(db, method=method)
+        started = time.perf_counter()
+        for start in range(0, len(rows), batch_size):
+            writer.write(rows[start : start + batch_size])
+        db.flush()
+        elapsed = time.perf_counter() - started
+    finally:
+        db.rollback()
+        db.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--methods", nargs="+", default=list(CHUNK_INSERT_METHODS), choices=CHUNK_INSERT_METHODS)
+    args = parser.parse_args()
+
+    print(f"{'method':<12} {'seconds':>8} {'rows/s':>10}")
+    for method in args.methods:
+        elapsed = run(method, args.rows, args.batch_size)
+        print(f"{method:<12} {elapsed:>8.2f} {args.rows / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Micro-benchmark: character-window split_into_chunks vs token-aware iter_token_chunks.
+
+Runs on synthetic multi-megabyte text; no database or API key needed.
+
+    python -m benchmarks.bench_chunker --megabytes 4 --repeat 3
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.services.text_processor import (
+    estimate_tokens,
+    iter_token_chunks,
+    split_into_chunks,
+)
+
+WORDS = (
+    "the of and to in is that for it as with was on be by this are from at or an "
+    "retrieval embedding document vector index query chunk sentence paragraph token "
+    "postgres latency throughput concurrency approximately configuration international"
+).split()
+
+
+def make_text(megabytes: float, seed: int = 0) -> str:
+    """Paragraphs of random sentences, roughly ``megabytes`` MB long."""
+    rng = random.Random(seed)
+    target = int(megabytes * 1024 * 1024)
+    paragraphs, size = [], 0
+    while size < target:
+        sentences = []
+        for _ in range(rng.randint(2, 8)):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(5, 30))]
+            sentences.append(" ".join(words).capitalize() + rng.choice(".!?"))
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+
+def pieces_of(text: str, size: int = 64 * 1024):
+    return (text[i : i + size] for i in range(0, len(text), size))
+
+
+def measure(name: str, chunker, text: str, repeat: int) -> None:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunks = chunker(text)
+        timings.append(time.perf_counter() - started)
+
+    best = min(timings)
+    tokens = [estimate_tokens(chunk) for chunk in chunks]
+    # A chunk starting mid-word begins right after a letter in the source
+    split_words = sum(1 for chunk in chunks if chunk[:1].isalnum() and chunk[:1].islower())
+    print(
+        f"{name:<28} {best:>7.3f}s {len(text) / best / 1e6:>8.1f} MB/s "
+        f"{len(chunks):>8} chunks  tokens mean {statistics.mean(tokens):6.1f} "
+        f"max {max(tokens):4d}  mid-word starts {split_words / len(chunks):6.1%}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megabytes", type=float, default=4.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-tokens", type=int, default=128)
+    parser.add_argument("--overlap-tokens", type=int, default=16)
+    args = parser.parse_args()
+
+    text = make_text(args.megabytes)
+    print(f"Input: {len(text) / 1e6:.1f} MB")
+    measure("split_into_chunks", lambda t: split_into_chunks(t, chunk_size=512, overlap=50), text, args.repeat)
+    measure(
+        "iter_token_chunks",
+        lambda t: list(iter_token_chunks([t], args.max_tokens, args.overlap_tokens)),
+        text,
+        args.repeat,
+    )
+    measure(
+        "iter_token_chunks (stream)",
+        lambda t: list(iter_token_chunks(pieces_of(t), args.max_tokens, args.overlap_tokens)),
+        text,
+        args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
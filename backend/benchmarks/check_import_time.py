@@ -0,0 +1,147 @@
+"""Import-time budget for the API process.
+
+Imports ``main`` in a fresh interpreter under ``python -X importtime``,
+prints the slowest modules and exits non-zero if the total import time is
+over budget, so a heavy dependency creeping back into startup fails CI:
+
+    python -m benchmarks.check_import_time --budget-ms 2500 --top 15
+
+Importing ``main`` must not touch the database or the network.
+``tests/test_import_time.py`` runs the same checks in the test suite.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# "import time:  self [us] | cumulative | imported package"
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+# Modules that must stay out of startup; they are imported on first use
+LAZY_MODULES = ("google.generativeai", "pypdf", "docx", "numpy")
+
+# Unavoidable importers of a lazy module: pgvector's column type needs numpy
+ALLOWED_IMPORTERS = {"numpy": ("pgvector",)}
+
+
+class ImportRecord(NamedTuple):
+    """One line of ``-X importtime`` output."""
+
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> List[ImportRecord]:
+    """Parse ``-X importtime`` output, in the order it was printed."""
+    records = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_time, cumulative, indent, name = match.groups()
+            records.append(ImportRecord(name, int(self_time), int(cumulative), len(indent) // 2))
+    return records
+
+
+def eager_imports(records: List[ImportRecord]) -> List[str]:
+    """
+    Lazy modules imported at startup by anything but their allowed importers.
+
+    A module is printed after everything it imports, so a module's importer
+    is the next line with a smaller depth.
+    """
+    eager = []
+    for index, record in enumerate(records):
+        if record.name not in LAZY_MODULES:
+            continue
+        importers = []
+        depth = record.depth
+        for later in records[index + 1:]:
+            if later.depth < depth:
+                importers.append(later.name)
+                depth = later.depth
+        allowed = ALLOWED_IMPORTERS.get(record.name, ())
+        if not any(name.split(".")[0] in allowed for name in importers):
+            eager.append(record.name)
+    return eager
+
+
+def run_importtime(module: str) -> str:
+    """Import ``module`` in a fresh interpreter with ``-X importtime``; returns its stderr."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return result.stderr
+
+
+def measure(module: str) -> Tuple[float, Dict[str, int], Dict[str, int], List[str]]:
+    """
+    Import ``module`` in a subprocess with ``-X importtime``.
+
+    Returns:
+        Tuple of (total milliseconds, self time per module in microseconds,
+        cumulative time of top-level imports in microseconds, lazy modules
+        imported eagerly)
+    """
+    records = parse_importtime(run_importtime(module))
+    self_us = {record.name: record.self_us for record in records}
+    # Cumulative times of the top-level imports sum to the total
+    top_level_us = {record.name: record.cumulative_us for record in records if record.depth == 0}
+    return sum(top_level_us.values()) / 1000, self_us, top_level_us, eager_imports(records)
+
+
+def main():
+    """Print an import-time report and enforce the budget."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=float(os.environ.get("IMPORT_TIME_BUDGET_MS", 2500)),
+        help="Fail if the median total import time exceeds this (env: IMPORT_TIME_BUDGET_MS)",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    totals: List[float] = []
+    for _ in range(args.repeat):
+        total_ms, self_us, top_level_us, eager = measure(args.module)
+        totals.append(total_ms)
+    total_ms = statistics.median(totals)
+
+    print(f"import {args.module}: {total_ms:.0f} ms (median of {args.repeat}), budget {args.budget_ms:.0f} ms")
+    print(f"\n{'cumulative ms':>14}  top-level import")
+    for name, us in sorted(top_level_us.items(), key=lambda item: item[1], reverse=True)[: args.top]:
+        print(f"{us / 1000:>14.1f}  {name}")
+    print(f"\n{'self ms':>14}  module")
+    for name, us in sorted(self_us.items(), key=lambda item: item[1], reverse=True)[: args.top]:
+        print(f"{us / 1000:>14.1f}  {name}")
+
+    failures = []
+    if eager:
+        failures.append(f"imported at startup but should be lazy: {', '.join(eager)}")
+    if total_ms > args.budget_ms:
+        failures.append(f"{total_ms:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+    if failures:
+        for failure in failures:
+            print(f"\nFAIL: {failure}")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Bulk ingest a directory tree or zip archive for one user.
+
+    python bulk_ingest.py --user-id 1 ./corpus
+    python bulk_ingest.py --user-id 1 corpus.zip --embed-workers 8
+"""
+import argparse
+import logging
+import os
+import sys
+import zipfile
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal, init_db
+from app.models import User
+from app.services.bulk_ingest import BulkIngestPipeline, iter_directory_files, iter_zip_files
+from app.services.parse_pool import shutdown_parse_pool
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Run the bulk ingest pipeline and print throughput stats."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="Directory or .zip archive to ingest")
+    parser.add_argument("--user-id", type=int, required=True, help="Owner of the ingested documents")
+    parser.add_argument("--parse-workers", type=int)
+    parser.add_argument("--chunk-workers", type=int)
+    parser.add_argument("--embed-workers", type=int)
+    parser.add_argument("--insert-workers", type=int)
+    parser.add_argument("--queue-size", type=int)
+    args = parser.parse_args()
+
+    settings = get_settings()
+    if settings.db_init_on_startup:
+        init_db()
+
+    db = SessionLocal()
+    try:
+        if db.query(User.id).filter(User.id == args.user_id).first() is None:
+            parser.error(f"User {args.user_id} not found")
+    finally:
+        db.close()
+
+    if os.path.isdir(args.path):
+        files = iter_directory_files(args.path, settings.bulk_max_file_bytes)
+    elif zipfile.is_zipfile(args.path):
+        files = iter_zip_files(args.path, settings.bulk_max_file_bytes)
+    else:
+        parser.error(f"{args.path} is neither a directory nor a zip archive")
+
+    pipeline = BulkIngestPipeline(
+        args.user_id,
+        parse_workers=args.parse_workers,
+        chunk_workers=args.chunk_workers,
+        embed_workers=args.embed_workers,
+        insert_workers=args.insert_workers,
+        queue_size=args.queue_size,
+    )
+    try:
+        stats = pipeline.run(files)
+    finally:
+        shutdown_parse_pool()
+
+    for error in stats.errors:
+        print(f"FAILED {error}", file=sys.stderr)
+    print(stats.summary())
+    sys.exit(1 if stats.files_failed and not stats.files_ingested else 0)
+
+
+if __name__ == "__main__":
+    main()
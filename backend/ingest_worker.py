@@ -0,0 +1,43 @@
+"""Standalone ingestion worker process.
+
+Run alongside the API (with INGEST_WORKERS=0 on the API side) to process
+uploads in a separate process:
+
+    python ingest_worker.py
+"""
+import logging
+import signal
+import threading
+
+from app.core.config import get_settings
+from app.core.database import init_db
+from app.services.ingestion_queue import IngestionWorkerPool
+from app.services.parse_pool import shutdown_parse_pool
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Run ingestion workers until SIGINT/SIGTERM."""
+    settings = get_settings()
+    if settings.db_init_on_startup:
+        init_db()
+
+    pool = IngestionWorkerPool(
+        workers=max(1, settings.ingest_workers),
+        poll_interval=settings.ingest_poll_interval_seconds,
+    )
+    stopped = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stopped.set())
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+
+    pool.start()
+    stopped.wait()
+    logger.info("Stopping ingestion workers...")
+    pool.stop()
+    shutdown_parse_pool()
+
+
+if __name__ == "__main__":
+    main()
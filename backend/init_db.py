@@ -0,0 +1,22 @@
+"""Create database tables and indexes.
+
+Run once per deploy, before starting the API with DB_INIT_ON_STARTUP=False:
+
+    python init_db.py
+"""
+import logging
+
+from app.core.database import init_db
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Wait for the database, then create missing tables and indexes."""
+    init_db()
+    logger.info("Database initialized")
+
+
+if __name__ == "__main__":
+    main()
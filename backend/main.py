@@ -1,12 +1,17 @@
 """Main FastAPI application entry point."""
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api import api_router
 from app.core.config import get_settings
-from app.core.database import Base, engine
+from app.core.database import async_engine, init_db
+from app.services.ingestion_queue import IngestionWorkerPool
+from app.services.parse_pool import shutdown_parse_pool
+from app.services.warmup import warm_up
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -14,8 +19,37 @@ logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Background document ingestion workers
+ingestion_workers = IngestionWorkerPool(
+    workers=settings.ingest_workers,
+    poll_interval=settings.ingest_poll_interval_seconds,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Prepare the process before it serves traffic, and tear it down after.
+
+    Tables are created (when enabled), database pools and the shared
+    Gemini clients are warmed so the first request after a deploy is not
+    a cold one, then the ingestion workers start polling.
+    """
+    if settings.db_init_on_startup:
+        # The ANN index can take minutes to build; don't hold up startup for it
+        await asyncio.to_thread(init_db, False)
+    if settings.warmup_on_startup:
+        await warm_up()
+    ingestion_workers.start()
+
+    yield
+
+    # Let ingestion workers finish their current job
+    await asyncio.to_thread(ingestion_workers.stop)
+    shutdown_parse_pool()
+    # Close the async query path's pooled connections
+    await async_engine.dispose()
+
 
 # Create FastAPI app instance
 app = FastAPI(
@@ -23,6 +57,7 @@ app = FastAPI(
     description="A personal knowledge search engine using Light RAG",
     version="0.1.0",
     debug=settings.debug,
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
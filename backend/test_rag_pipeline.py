@@ -1,6 +1,7 @@
 """Test script for RAG pipeline."""
 import requests
 import json
+import time
 from pathlib import Path
 
 # Configuration
@@ -103,12 +104,24 @@ Benefits:
             files=files
         )
     
-    assert response.status_code == 200
-    doc_data = response.json()
-    doc_id = doc_data["id"]
-    chunk_count = doc_data["total_chunks"]
+    assert response.status_code == 202
+    job = response.json()
+    doc_id = job["document_id"]
+    print(f"⏳ Document queued - Job ID: {job['id']}, Document ID: {doc_id}")
+    
+    # Wait for the ingestion worker to finish
+    for _ in range(120):
+        response = requests.get(f"{API_BASE_URL}/documents/jobs/{job['id']}")
+        assert response.status_code == 200
+        job = response.json()
+        if job["status"] in ("completed", "failed"):
+            break
+        time.sleep(1)
+    
+    assert job["status"] == "completed", f"Ingestion job ended as {job['status']}: {job['error']}"
+    chunk_count = job["chunks_total"]
     
-    print(f"✅ Document uploaded - ID: {doc_id}, Chunks: {chunk_count}")
+    print(f"✅ Document processed - ID: {doc_id}, Chunks: {chunk_count}")
     return doc_id, chunk_count
 
 
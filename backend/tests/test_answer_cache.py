@@ -0,0 +1,100 @@
+"""Semantic answer cache lookups, eviction and corpus-version invalidation."""
+from app.services.answer_cache import SemanticAnswerCache
+
+SCOPE = (None, 5, None, None, None, None, None)
+QUERY = [1.0, 0.0, 0.0]
+NEAR_QUERY = [0.999, 0.02, 0.0]
+OTHER_QUERY = [0.0, 1.0, 0.0]
+
+
+def answer(text):
+    return {"response": text, "retrieved_chunks": [], "chunk_count": 0}
+
+
+def make_cache(max_entries=10):
+    return SemanticAnswerCache(max_entries=max_entries, max_distance=0.05)
+
+
+def test_hit_for_a_near_identical_query():
+    cache = make_cache()
+    cache.put(1, 0, SCOPE, QUERY, answer("cached"))
+
+    assert cache.get(1, 0, SCOPE, NEAR_QUERY) == answer("cached")
+    assert cache.stats()["hits"] == 1
+
+
+def test_miss_for_a_different_query_scope_or_user():
+    cache = make_cache()
+    cache.put(1, 0, SCOPE, QUERY, answer("cached"))
+
+    assert cache.get(1, 0, SCOPE, OTHER_QUERY) is None
+    assert cache.get(1, 0, (None, 10, None, None, None, None, None), QUERY) is None
+    assert cache.get(2, 0, SCOPE, QUERY) is None
+    assert cache.stats()["misses"] == 3
+
+
+def test_hit_returns_a_copy():
+    cache = make_cache()
+    cache.put(1, 0, SCOPE, QUERY, answer("cached"))
+
+    cache.get(1, 0, SCOPE, QUERY)["response"] = "changed"
+
+    assert cache.get(1, 0, SCOPE, QUERY)["response"] == "cached"
+
+
+def test_newer_corpus_version_invalidates_the_users_entries():
+    cache = make_cache()
+    cache.put(1, 0, SCOPE, QUERY, answer("old"))
+    cache.put(2, 0, SCOPE, QUERY, answer("other user"))
+
+    assert cache.get(1, 1, SCOPE, QUERY) is None
+
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["invalidations"] == 1
+    assert cache.get(2, 0, SCOPE, QUERY) == answer("other user")
+
+
+def test_answer_for_an_older_corpus_version_is_not_stored():
+    cache = make_cache()
+    cache.put(1, 2, SCOPE, QUERY, answer("current"))
+
+    cache.put(1, 1, SCOPE, OTHER_QUERY, answer("stale"))
+
+    assert cache.stats()["entries"] == 1
+    assert cache.get(1, 1, SCOPE, OTHER_QUERY) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = make_cache(max_entries=2)
+    cache.put(1, 0, SCOPE, QUERY, answer("first"))
+    cache.put(1, 0, SCOPE, OTHER_QUERY, answer("second"))
+    cache.get(1, 0, SCOPE, QUERY)
+
+    cache.put(1, 0, SCOPE, [0.0, 0.0, 1.0], answer("third"))
+
+    assert cache.get(1, 0, SCOPE, QUERY) == answer("first")
+    assert cache.get(1, 0, SCOPE, OTHER_QUERY) is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_versions_are_forgotten_with_the_users_last_entry():
+    cache = make_cache(max_entries=2)
+    for user_id in range(100):
+        cache.get(user_id, 3, SCOPE, QUERY)
+        cache.put(user_id, 3, SCOPE, QUERY, answer(str(user_id)))
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["users"] == 2
+
+    cache.get(99, 4, SCOPE, QUERY)
+    assert cache.stats()["users"] == 1
+
+
+def test_disabled_when_max_entries_is_zero():
+    cache = make_cache(max_entries=0)
+    cache.put(1, 0, SCOPE, QUERY, answer("cached"))
+
+    assert cache.get(1, 0, SCOPE, QUERY) is None
+    assert cache.stats()["users"] == 0
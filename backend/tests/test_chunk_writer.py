@@ -0,0 +1,95 @@
+"""Binary COPY encoding of chunk rows."""
+import struct
+from datetime import datetime
+
+from app.services import chunk_writer
+from app.services.chunk_writer import COPY_COLUMNS, ChunkRow, encode_copy_binary
+
+HEADER = b"PGCOPY\n\xff\r\n\x00" + b"\x00" * 8
+CREATED_AT = datetime(2024, 1, 2, 3, 4, 5, 6)
+
+
+def read_rows(data):
+    """Parse a binary COPY stream into lists of raw field bytes (None for NULL)."""
+    assert data.startswith(HEADER)
+    offset = len(HEADER)
+    rows = []
+    while True:
+        (field_count,) = struct.unpack_from(">h", data, offset)
+        offset += 2
+        if field_count == -1:
+            break
+        fields = []
+        for _ in range(field_count):
+            (length,) = struct.unpack_from(">i", data, offset)
+            offset += 4
+            if length == -1:
+                fields.append(None)
+                continue
+            fields.append(data[offset:offset + length])
+            offset += length
+        rows.append(fields)
+    assert offset == len(data)
+    return rows
+
+
+def test_encodes_one_field_per_column():
+    row = ChunkRow(
+        document_id=7,
+        user_id=3,
+        chunk_index=2,
+        content="héllo",
+        token_count=12,
+        embedding=[1.0, -0.5],
+        embedding_model="models/embedding-001",
+    )
+
+    (fields,) = read_rows(encode_copy_binary([42], [row], CREATED_AT))
+
+    assert len(fields) == len(COPY_COLUMNS)
+    values = dict(zip(COPY_COLUMNS, fields))
+    assert struct.unpack(">i", values["id"]) == (42,)
+    assert struct.unpack(">i", values["document_id"]) == (7,)
+    assert struct.unpack(">i", values["user_id"]) == (3,)
+    assert struct.unpack(">i", values["chunk_index"]) == (2,)
+    assert values["content"] == "héllo".encode("utf-8")
+    assert struct.unpack(">i", values["token_count"]) == (12,)
+    assert values["embedding_model"] == b"models/embedding-001"
+
+    # pgvector: int16 dimensions, int16 unused, then big-endian float4s
+    assert struct.unpack(">hhff", values["embedding"]) == (2, 0, 1.0, -0.5)
+
+    # Microseconds since 2000-01-01
+    (micros,) = struct.unpack(">q", values["created_at"])
+    assert micros == int((CREATED_AT - datetime(2000, 1, 1)).total_seconds()) * 1_000_000 + 6
+
+
+def test_encodes_nulls_and_multiple_rows():
+    rows = [
+        ChunkRow(1, None, 0, "a", None, None, "m"),
+        ChunkRow(1, None, 1, "", None, None, "m"),
+    ]
+
+    first, second = read_rows(encode_copy_binary([10, 11], rows, CREATED_AT))
+
+    for fields in (first, second):
+        values = dict(zip(COPY_COLUMNS, fields))
+        assert values["user_id"] is None
+        assert values["token_count"] is None
+        assert values["embedding"] is None
+    assert struct.unpack(">i", second[0]) == (11,)
+    # Empty text is a zero-length field, not NULL
+    assert second[COPY_COLUMNS.index("content")] == b""
+
+
+def test_empty_batch_is_header_and_trailer():
+    assert encode_copy_binary([], [], CREATED_AT) == HEADER + struct.pack(">h", -1)
+
+
+def test_vector_encoding_matches_without_numpy(monkeypatch):
+    row = ChunkRow(1, 1, 0, "x", 1, [0.25, 3.5, -1.0], "m")
+    with_numpy = encode_copy_binary([1], [row], CREATED_AT)
+
+    monkeypatch.setattr(chunk_writer, "np", None)
+
+    assert encode_copy_binary([1], [row], CREATED_AT) == with_numpy
@@ -0,0 +1,94 @@
+"""Token-budgeted packing of retrieved chunks into the prompt context."""
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.services.context_packing import format_passage, pack_context
+from app.services.text_processor import estimate_tokens, estimate_tokens_by_chars
+
+
+def chunk(id, document_id, chunk_index, content):
+    return SimpleNamespace(
+        id=id,
+        document_id=document_id,
+        chunk_index=chunk_index,
+        content=content,
+        token_count=None,
+        created_at=datetime(2024, 1, 1),
+    )
+
+
+def words(prefix, count):
+    return " ".join(f"{prefix}{i}" for i in range(count))
+
+
+# Three passages of 47 estimated tokens each, 7 of them for the source label
+ALPHA = chunk(1, 1, 0, words("alpha", 40))
+BETA = chunk(2, 2, 0, words("beta", 40))
+GAMMA = chunk(3, 3, 0, words("gamma", 40))
+RESULTS = [(BETA, 0.8), (GAMMA, 0.7), (ALPHA, 0.9)]
+
+
+def test_no_budget_keeps_every_passage_best_first():
+    packed = pack_context(RESULTS, max_tokens=None)
+
+    assert [c.id for c, _ in packed.passages] == [1, 2, 3]
+    assert packed.context == "\n\n".join(format_passage(c) for c in (ALPHA, BETA, GAMMA))
+    assert packed.token_count == 3 * 47
+    assert not packed.truncated
+
+
+def test_budget_truncates_the_first_passage_that_does_not_fit():
+    packed = pack_context(RESULTS, max_tokens=140)
+
+    assert [c.id for c, _ in packed.passages] == [1, 2, 3]
+    assert packed.truncated
+    assert packed.token_count <= 140
+    # Cut between words, keeping the start of the passage
+    last_block = packed.context.split("\n\n")[-1]
+    assert last_block.startswith(format_passage(GAMMA, "gamma0 gamma1"))
+    assert GAMMA.content.startswith(last_block.split(":\n", 1)[1] + " ")
+    assert packed.token_count == estimate_tokens(packed.context)
+
+
+def test_truncation_with_the_chars_estimator_stays_within_budget():
+    short_words = chunk(5, 5, 0, " ".join(["a", "bb", "ccc"] * 200))
+    results = [(ALPHA, 0.9), (short_words, 0.8)]
+
+    for max_tokens in (150, 200, 300):
+        packed = pack_context(results, max_tokens=max_tokens, estimator=estimate_tokens_by_chars)
+
+        assert packed.truncated
+        assert len(packed.passages) == 2
+        assert packed.token_count <= max_tokens
+        assert estimate_tokens_by_chars(packed.context.split("\n\n")[-1]) == packed.token_count - (
+            estimate_tokens_by_chars(format_passage(ALPHA))
+        )
+
+
+def test_budget_drops_a_passage_too_small_to_be_useful():
+    packed = pack_context(RESULTS, max_tokens=120)
+
+    assert [c.id for c, _ in packed.passages] == [1, 2]
+    assert packed.truncated
+    assert packed.token_count == 2 * 47
+    assert "gamma" not in packed.context
+
+
+def test_exact_fit_is_not_truncated():
+    packed = pack_context(RESULTS, max_tokens=3 * 47)
+
+    assert len(packed.passages) == 3
+    assert not packed.truncated
+
+
+def test_passage_contained_in_a_better_one_is_dropped():
+    duplicate = chunk(4, 9, 0, "beta10 beta11   beta12")
+
+    packed = pack_context([(BETA, 0.8), (duplicate, 0.95)], max_tokens=None)
+
+    # The better-scoring copy is kept first; the longer passage still adds text
+    assert [c.id for c, _ in packed.passages] == [4, 2]
+
+    packed = pack_context([(BETA, 0.95), (duplicate, 0.8)], max_tokens=None)
+
+    assert [c.id for c, _ in packed.passages] == [2]
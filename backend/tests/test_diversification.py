@@ -0,0 +1,79 @@
+"""MMR selection and adjacent-chunk merging."""
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.services.diversification import MergedChunk, merge_adjacent_chunks, mmr_select
+
+
+def chunk(id, document_id, chunk_index, content):
+    return SimpleNamespace(
+        id=id,
+        document_id=document_id,
+        chunk_index=chunk_index,
+        content=content,
+        token_count=None,
+        created_at=datetime(2024, 1, 1),
+    )
+
+
+def test_mmr_pure_relevance_orders_by_similarity():
+    candidates = [[0.0, 1.0], [1.0, 0.0], [0.8, 0.6]]
+
+    assert mmr_select([1.0, 0.0], candidates, k=3, lambda_mult=1.0) == [1, 2, 0]
+
+
+def test_mmr_skips_near_duplicates():
+    candidates = [[0.9, 0.436], [0.88, 0.475], [0.8, -0.6]]
+
+    # The near-copy of the first pick loses to a less relevant but different candidate
+    assert mmr_select([1.0, 0.0], candidates, k=2, lambda_mult=0.5) == [0, 2]
+
+
+def test_mmr_handles_k_larger_than_candidates():
+    assert mmr_select([1.0, 0.0], [[1.0, 0.0]], k=5) == [0]
+    assert mmr_select([1.0, 0.0], [], k=5) == []
+
+
+def test_merge_strips_overlap_between_adjacent_chunks():
+    first = chunk(1, 10, 0, "Alpha one is here. Beta two follows.")
+    second = chunk(2, 10, 1, "Beta two follows. Gamma three ends it.")
+
+    (merged, score), = merge_adjacent_chunks([(second, 0.9), (first, 0.7)])
+
+    assert isinstance(merged, MergedChunk)
+    assert merged.content == "Alpha one is here. Beta two follows. Gamma three ends it."
+    assert merged.chunk_ids == [1, 2]
+    assert merged.chunk_index == 0
+    assert score == 0.9
+
+
+def test_merge_keeps_short_coincidental_matches():
+    first = chunk(1, 10, 0, "It ends with a")
+    second = chunk(2, 10, 1, "apple pie.")
+
+    (merged, _), = merge_adjacent_chunks([(first, 0.5), (second, 0.4)])
+
+    # "a" is a prefix of "apple" but not a word-aligned overlap
+    assert merged.content == "It ends with a apple pie."
+
+
+def test_merge_leaves_gaps_and_other_documents_apart():
+    results = [
+        (chunk(1, 10, 0, "first"), 0.9),
+        (chunk(2, 10, 2, "third"), 0.8),
+        (chunk(3, 11, 1, "other"), 0.7),
+    ]
+
+    assert merge_adjacent_chunks(results) == results
+
+
+def test_merge_is_idempotent_on_merged_passages():
+    first = chunk(1, 10, 0, "Alpha one. Beta two.")
+    second = chunk(2, 10, 1, "Beta two. Gamma three.")
+    merged = merge_adjacent_chunks([(first, 0.9), (second, 0.8)])
+
+    again = merge_adjacent_chunks(merged + [(second, 0.8)])
+
+    assert len(again) == 1
+    assert again[0][0].content == merged[0][0].content
+    assert again[0][0].chunk_ids == [1, 2]
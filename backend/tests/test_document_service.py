@@ -0,0 +1,44 @@
+"""Persistent document dedup counters."""
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from app.services.document_service import _record_dedup, get_dedup_stats
+
+
+class RecordingSession:
+    def __init__(self, row=None):
+        self.statements = []
+        self.row = row
+
+    def execute(self, statement):
+        self.statements.append(statement)
+
+    def query(self, model):
+        row = self.row
+        return SimpleNamespace(filter=lambda *args: SimpleNamespace(first=lambda: row))
+
+
+def test_record_dedup_upserts_the_shared_counter_row():
+    db = RecordingSession()
+
+    _record_dedup(db, chunks=3, tokens=40)
+
+    (statement,) = db.statements
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert sql.startswith("INSERT INTO dedup_stats")
+    assert "ON CONFLICT (id) DO UPDATE" in sql
+    assert "chunks = (dedup_stats.chunks + excluded.chunks)" in sql
+    assert "tokens = (dedup_stats.tokens + excluded.tokens)" in sql
+    assert statement.compile().params["chunks"] == 3
+
+
+def test_dedup_stats_read_the_counter_row():
+    row = SimpleNamespace(documents=2, chunks=9, tokens=120)
+
+    assert get_dedup_stats(RecordingSession(row)) == {
+        "documents_deduplicated": 2,
+        "chunks_reused": 9,
+        "embedding_tokens_saved": 120,
+    }
+    assert get_dedup_stats(RecordingSession())["documents_deduplicated"] == 0
@@ -0,0 +1,50 @@
+"""Embedding cache writes check the table size only periodically."""
+from app.services import embedding_cache
+from app.services.embedding_cache import EmbeddingCache
+
+
+class CountingSession:
+    def __init__(self, total=0):
+        self.total = total
+        self.inserts = 0
+        self.counts = 0
+
+    def execute(self, statement):
+        self.inserts += 1
+
+    def query(self, *entities):
+        self.counts += 1
+        return self
+
+    def scalar(self):
+        return self.total
+
+
+def test_repeated_puts_count_the_table_once_per_interval(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(embedding_cache.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(embedding_cache, "_last_evict_check", None)
+    db = CountingSession()
+    cache = EmbeddingCache(db, max_entries=10, evict_interval_seconds=60)
+
+    for i in range(5):
+        cache.put_many("model", {f"hash{i}": [0.0]})
+
+    assert db.inserts == 5
+    assert db.counts == 1
+
+    clock[0] += 60
+    cache.put_many("model", {"hash5": [0.0]})
+
+    assert db.counts == 2
+
+
+def test_zero_interval_checks_on_every_put(monkeypatch):
+    monkeypatch.setattr(embedding_cache, "_last_evict_check", None)
+    db = CountingSession()
+    cache = EmbeddingCache(db, max_entries=10)
+
+    for i in range(3):
+        cache.put_many("model", {f"hash{i}": [0.0]})
+
+    assert db.counts == 3
@@ -0,0 +1,31 @@
+"""Startup import budget for the API process; see benchmarks/check_import_time.py."""
+import os
+
+from benchmarks.check_import_time import eager_imports, measure, parse_importtime
+
+BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", 2500))
+
+
+def test_import_main_is_within_budget_and_keeps_heavy_modules_lazy():
+    total_ms, _, _, eager = measure("main")
+
+    assert not eager, f"imported at startup but should be lazy: {', '.join(eager)}"
+    assert total_ms <= BUDGET_MS, f"import main took {total_ms:.0f} ms, budget {BUDGET_MS:.0f} ms"
+
+
+def test_lazy_module_imported_by_app_code_is_reported():
+    stderr = "\n".join(
+        [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       100 |        100 |     numpy",
+            "import time:        10 |        110 |   pgvector.utils",
+            "import time:        10 |        120 | pgvector",
+            "import time:       100 |        100 |   docx",
+            "import time:       200 |        200 |     numpy",
+            "import time:        10 |        310 |   app.services.parsers",
+            "import time:        10 |        420 | app",
+        ]
+    )
+
+    # numpy under pgvector is allowed; docx and numpy under app code are not
+    assert eager_imports(parse_importtime(stderr)) == ["docx", "numpy"]
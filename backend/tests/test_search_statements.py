@@ -0,0 +1,44 @@
+"""SQL compilation of the shared retrieval statements."""
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from app.services.embedding_service import batch_vector_search_statement
+
+
+def compile_sql(statement, dialect=None) -> str:
+    return str(statement.compile(dialect=dialect or postgresql.dialect()))
+
+
+def test_batch_statement_compiles():
+    sql = compile_sql(
+        batch_vector_search_statement(
+            [[0.1] * 768, [0.2] * 768],
+            user_id=7,
+            document_ids=[1, 2],
+            top_k=3,
+            similarity_threshold=0.5,
+        )
+    )
+
+    assert "JOIN LATERAL" in sql
+    assert "FROM (VALUES" in sql
+
+
+def test_batch_hits_select_their_own_chunks():
+    sql = compile_sql(batch_vector_search_statement([[0.1] * 768], 7, None, 3, None))
+
+    # The outer chunks join must not be auto-correlated into the LATERAL subquery
+    hits = sql.split("JOIN LATERAL", 1)[1].split(") AS hits", 1)[0]
+    assert "FROM chunks" in hits
+    assert "queries.embedding" in hits
+    assert "LIMIT" in hits
+
+
+def test_batch_query_vectors_are_cast_to_vector():
+    statement = batch_vector_search_statement([[0.1] * 768, [0.2] * 768], 7, None, 3, None)
+
+    # Uncast, Postgres types the VALUES column as text and ``vector <-> text`` has no operator
+    for dialect in (postgresql.dialect(), asyncpg.dialect()):
+        sql = compile_sql(statement, dialect)
+        assert sql.count("AS VECTOR(768))") == 2, sql
+
@@ -0,0 +1,63 @@
+"""Streaming sentence-aligned chunking."""
+import pytest
+
+from app.services.text_processor import estimate_tokens_by_words, iter_token_chunks
+
+TEXT = (
+    "The quarterly report covers revenue, costs and hiring. Revenue grew by twelve percent! "
+    "Costs were flat?  Hiring slowed in the second half.\n\n"
+    "A new paragraph starts here. It mentions internationalization and other extraordinarily "
+    "long words. Short one. Another short one.\n  \n"
+    "Final paragraph: no trailing punctuation at all"
+)
+
+
+def chunks(pieces, **kwargs):
+    return list(iter_token_chunks(pieces, **kwargs))
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16, 61])
+def test_streamed_pieces_chunk_like_the_whole_text(size):
+    pieces = [TEXT[i:i + size] for i in range(0, len(TEXT), size)]
+
+    assert chunks(pieces, max_tokens=20, overlap_tokens=6) == chunks([TEXT], max_tokens=20, overlap_tokens=6)
+
+
+def test_every_split_point_chunks_like_the_whole_text():
+    whole = chunks([TEXT], max_tokens=16, overlap_tokens=4)
+
+    for cut in range(len(TEXT) + 1):
+        assert chunks([TEXT[:cut], "", TEXT[cut:]], max_tokens=16, overlap_tokens=4) == whole, cut
+
+
+def test_chunks_respect_the_budget():
+    result = chunks([TEXT], max_tokens=20, overlap_tokens=6)
+
+    assert len(result) > 1
+    assert all(estimate_tokens_by_words(chunk) <= 20 for chunk in result)
+
+
+def test_trailing_sentences_carry_over_as_overlap():
+    with_overlap = chunks([TEXT], max_tokens=20, overlap_tokens=8)
+    without_overlap = chunks([TEXT], max_tokens=20, overlap_tokens=0)
+
+    assert with_overlap[0].endswith("Revenue grew by twelve percent!")
+    assert with_overlap[1].startswith("Revenue grew by twelve percent! Costs were flat?")
+    assert without_overlap[1].startswith("Costs were flat?")
+
+
+def test_over_budget_word_keeps_its_place_in_the_sentence():
+    # Over budget on its own, but short enough to stay one sentence
+    blob = "x" * 2000
+    sentence = f"alpha beta gamma {blob} delta epsilon."
+
+    result = chunks([sentence], max_tokens=200, overlap_tokens=0)
+
+    assert result[0].startswith("alpha beta gamma x")
+    assert result[-1].endswith("x delta epsilon.")
+    assert "".join(result).replace(" ", "") == sentence.replace(" ", "")
+
+
+def test_empty_input_yields_nothing():
+    assert chunks([]) == []
+    assert chunks(["", "   \n\n  "]) == []
@@ -0,0 +1,56 @@
+"""NumPy vector store: search and the transition from an unsynced corpus."""
+import numpy as np
+
+from app.services.vector_store import EMBEDDING_DIM, NumpyVectorStore
+
+
+def vector(*values):
+    embedding = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    embedding[: len(values)] = values
+    return embedding / np.linalg.norm(embedding)
+
+
+def make_store(tmp_path):
+    return NumpyVectorStore(str(tmp_path), metric="cosine")
+
+
+def test_ingest_before_the_first_sync_leaves_the_user_unsynced(tmp_path):
+    store = make_store(tmp_path)
+
+    # The backend was just enabled; document 1 already lives in Postgres only
+    store.add(7, 2, [20], [vector(0, 1)])
+
+    assert not store.has_user(7)
+    assert store.search(7, vector(0, 1)) == []
+
+
+def test_first_sync_includes_existing_chunks_then_ingest_appends(tmp_path):
+    store = make_store(tmp_path)
+    store.add(7, 2, [20], [vector(0, 1)])
+
+    # What the first search does: rebuild from every chunk in Postgres
+    store.replace_user(7, chunk_ids=[10, 20], document_ids=[1, 2], embeddings=[vector(1, 0), vector(0, 1)])
+    store.add(7, 3, [30], [vector(1, 1)])
+
+    assert store.has_user(7)
+    assert [chunk_id for chunk_id, _ in store.search(7, vector(1, 0), top_k=3)] == [10, 30, 20]
+
+
+def test_files_without_a_synced_marker_are_rebuilt(tmp_path):
+    store = make_store(tmp_path)
+    store.replace_user(7, chunk_ids=[10], document_ids=[1], embeddings=[vector(1, 0)])
+
+    # Matrices written before the marker existed may hold only new documents
+    (tmp_path / "user_7" / "synced").unlink()
+
+    assert not store.has_user(7)
+
+
+def test_remove_document_keeps_the_user_synced(tmp_path):
+    store = make_store(tmp_path)
+    store.replace_user(7, chunk_ids=[10, 20], document_ids=[1, 2], embeddings=[vector(1, 0), vector(0, 1)])
+
+    assert store.remove_document(7, 1) == 1
+
+    assert store.has_user(7)
+    assert [chunk_id for chunk_id, _ in store.search(7, vector(1, 0), top_k=5)] == [20]